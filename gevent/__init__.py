@@ -42,6 +42,7 @@ initpkg(
         getcurrent = "gevent.hub:getcurrent",
         GreenletExit = "gevent.hub:GreenletExit",
         spawn_raw = "gevent.hub:spawn_raw",
+        spawn_pooled = "gevent.hub:spawn_pooled",
         sleep = "gevent.hub:sleep",
         kill = "gevent.hub:kill",
         signal = "gevent.hub:signal",
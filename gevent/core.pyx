@@ -36,8 +36,11 @@ __license__ = 'BSD'
 __url__ = 'http://monkey.org/~dugsong/pyevent/'
 __version__ = '0.4+'
 
-__all__ = ['event', 'read_event', 'write_event', 'timer', 'signal', 'active_event',
-           'init', 'dispatch', 'loop', 'get_version', 'get_method', 'get_header_version']
+__all__ = ['event', 'read_event', 'write_event', 'fd_watcher', 'timer', 'signal', 'active_event',
+           'callback', 'callback_queue', 'queued_call', 'ready_queue', 'async_queue', 'timer_wheel', 'wheel_timer',
+           'now', 'monotonic', 'walltime', 'enable_stats', 'disable_stats', 'get_stats', 'track_callbacks',
+           'get_current_callback', 'Loop', 'get_loop', 'init', 'dispatch', 'loop', 'get_version', 'get_method',
+           'get_header_version']
 # note, that .pxi files append stuff to __all__
 
 import sys
@@ -50,8 +53,12 @@ cdef extern from "sys/types.h":
     ctypedef unsigned char u_char
 
 cdef extern from "Python.h":
+    ctypedef struct PyObject
     void   Py_INCREF(object o)
     void   Py_DECREF(object o)
+    void   Py_XDECREF(PyObject* o)
+    void*  PyMem_Malloc(size_t n)
+    void   PyMem_Free(void* p)
     object PyString_FromStringAndSize(char *v, int len)
     object PyString_FromString(char *v)
     int    PyObject_AsCharBuffer(object obj, char **buffer, int *buffer_len)
@@ -80,17 +87,23 @@ cdef extern from "libevent.h":
         short ev_events
         int   ev_flags
         void *ev_arg
+        event_base* ev_base
 
     void* event_init()
+    event_base* event_base_new()
+    void event_base_free(event_base *base)
+    int event_base_set(event_base *base, event_t *ev)
     int event_reinit(void *base)
     char* event_get_version()
     char* event_get_method()
+    char* event_base_get_method(event_base *base)
     void event_set(event_t *ev, int fd, short event, event_handler handler, void *arg)
     void evtimer_set(event_t *ev, event_handler handler, void *arg)
     int  event_add(event_t *ev, timeval *tv)
     int  event_del(event_t *ev)
     int  event_dispatch() nogil
     int  event_loop(int loop) nogil
+    int  event_base_loop(event_base *base, int loop) nogil
     int  event_pending(event_t *ev, short, timeval *tv)
     void event_active(event_t *ev, int res, short ncalls)
 
@@ -103,6 +116,7 @@ cdef extern from "libevent.h":
     int C_EV_WRITE "EV_WRITE"
     int C_EV_SIGNAL "EV_SIGNAL"
     int C_EV_PERSIST "EV_PERSIST"
+    int C_EV_ET "EV_ET"
 
     int EVLIST_TIMEOUT
     int EVLIST_INSERTED
@@ -116,6 +130,7 @@ EV_READ = C_EV_READ
 EV_WRITE = C_EV_WRITE
 EV_SIGNAL = C_EV_SIGNAL
 EV_PERSIST = C_EV_PERSIST
+EV_ET = C_EV_ET  # 0 if edge-triggered events are not supported
 
 cdef extern from "string.h":
     char* strerror(int errnum)
@@ -126,10 +141,209 @@ cdef extern from "errno.h":
 
 cdef extern from "libevent.h":
     event_base* current_base
+    event_base* gevent_thread_base
+    void* gevent_thread_loop
+    void (*gevent_thread_exit_callback)(void *loop)
+    int gevent_thread_exit_init()
+    void gevent_thread_exit_set(void *loop)
+    double gevent_monotonic() nogil
+    double gevent_walltime()
+    int gevent_wakeup_open(int *fds)
+    void gevent_wakeup_signal(int *fds)
+    void gevent_wakeup_drain(int *fds)
+    void gevent_wakeup_close(int *fds)
+
+
+    # the clock readings cached for the current pass of the event loop of the calling thread;
+    # reset by dispatch() and loop()
+    double _loop_time "gevent_loop_time"
+    double _loop_walltime "gevent_loop_walltime"
+    int _loop_time_valid "gevent_loop_time_valid"
+
+
+cdef void _update_loop_time():
+    global _loop_time, _loop_walltime, _loop_time_valid
+    _loop_time = gevent_monotonic()
+    _loop_walltime = gevent_walltime()
+    _loop_time_valid = 1
+
+
+cdef inline double _now():
+    if not _loop_time_valid:
+        _update_loop_time()
+    return _loop_time
+
+
+def now():
+    """Return the value of a monotonic clock (in seconds) cached for the current iteration of the event loop.
+
+    The clock is read at most once per loop iteration, so this is cheaper than :func:`time.time`
+    and is not affected by the changes of the system time. Use it to measure timeouts, not to tell
+    the time of day.
+    """
+    if not _loop_time_valid:
+        _update_loop_time()
+    return _loop_time
+
+
+def monotonic():
+    """Return the current value of the monotonic clock used by :func:`now`, bypassing the cache.
+
+    Unlike :func:`now`, this does not depend on the event loop of the calling thread.
+    """
+    return gevent_monotonic()
+
+
+def walltime():
+    """Return the wall-clock time (like :func:`time.time`) cached for the current iteration of the event loop."""
+    if not _loop_time_valid:
+        _update_loop_time()
+    return _loop_walltime
+
+
+# instrumentation of the event loop, see enable_stats() and track_callbacks();
+# when both are disabled the handlers only check _instrumented
+cdef struct _loop_iteration:
+    double started
+    double polling
+    double running
+    long events
+    double longest
+
+cdef int _instrumented = 0
+cdef int _tracking_callbacks = 0
+cdef _loop_iteration* _stats = NULL
+cdef unsigned int _stats_size = 0
+cdef unsigned int _stats_count = 0
+cdef unsigned int _stats_next = 0
+cdef _loop_iteration _iteration
+cdef double _callback_started = 0.0
+cdef unsigned long _callback_serial = 0
+
+
+cdef void _iteration_begin() nogil:
+    _iteration.started = gevent_monotonic()
+    _iteration.polling = -1.0
+    _iteration.running = 0.0
+    _iteration.events = 0
+    _iteration.longest = 0.0
+
+
+cdef void _iteration_end() nogil:
+    global _stats_count, _stats_next
+    if _stats == NULL or _iteration.started == 0.0:
+        return
+    if _iteration.polling < 0.0:
+        # nothing was run, the whole iteration was spent polling
+        _iteration.polling = gevent_monotonic() - _iteration.started
+    _stats[_stats_next] = _iteration
+    _stats_next += 1
+    if _stats_next == _stats_size:
+        _stats_next = 0
+    if _stats_count < _stats_size:
+        _stats_count += 1
+
+
+cdef inline double _callback_enter():
+    global _callback_started, _callback_serial
+    cdef double now
+    if not _instrumented or gevent_thread_base != current_base:
+        return 0.0
+    now = gevent_monotonic()
+    if _iteration.polling < 0.0 and _iteration.started != 0.0:
+        _iteration.polling = now - _iteration.started
+    _callback_started = now
+    _callback_serial += 1
+    return now
+
+
+cdef inline void _callback_exit(double started):
+    global _callback_started
+    cdef double duration
+    if started == 0.0:
+        return
+    duration = gevent_monotonic() - started
+    _iteration.running += duration
+    _iteration.events += 1
+    if duration > _iteration.longest:
+        _iteration.longest = duration
+    _callback_started = 0.0
+
+
+def enable_stats(unsigned int size=1024):
+    """Start recording the statistics of the event loop iterations, keeping the last *size* of them.
+
+    See :func:`get_stats`.
+    """
+    global _stats, _stats_size, _stats_count, _stats_next, _instrumented
+    if size == 0:
+        raise ValueError('Invalid value for size, must be positive: %r' % (size, ))
+    cdef _loop_iteration* stats = <_loop_iteration*>PyMem_Malloc(size * sizeof(_loop_iteration))
+    if stats == NULL:
+        raise MemoryError
+    if _stats != NULL:
+        PyMem_Free(_stats)
+    _stats = stats
+    _stats_size = size
+    _stats_count = 0
+    _stats_next = 0
+    _iteration.started = 0.0
+    _instrumented = 1
+
+
+def disable_stats():
+    """Stop recording the statistics and discard them."""
+    global _stats, _stats_size, _stats_count, _stats_next, _instrumented
+    if _stats != NULL:
+        PyMem_Free(_stats)
+        _stats = NULL
+    _stats_size = 0
+    _stats_count = 0
+    _stats_next = 0
+    _instrumented = _tracking_callbacks
+
+
+def get_stats():
+    """Return the statistics of the recorded iterations of the event loop, oldest first.
+
+    Each item is a tuple ``(started, polling, running, events, longest)``: the :func:`now` value
+    when the iteration started, the seconds spent waiting for events, the seconds spent in the
+    callbacks, the number of events processed and the duration of the longest callback. A callback
+    that switches to a greenlet includes the time the greenlet ran before switching back.
+    Return an empty list if the statistics are not enabled.
+    """
+    cdef unsigned int index
+    cdef _loop_iteration* item
+    result = []
+    for index from 0 <= index < _stats_count:
+        item = &_stats[(_stats_next + _stats_size - _stats_count + index) % _stats_size]
+        result.append((item.started, item.polling, item.running, item.events, item.longest))
+    return result
+
+
+def track_callbacks(flag):
+    """Enable or disable :func:`get_current_callback` (which is needed by a blocking watchdog)."""
+    global _tracking_callbacks, _instrumented
+    _tracking_callbacks = bool(flag)
+    _instrumented = _tracking_callbacks or _stats != NULL
+
+
+def get_current_callback():
+    """Return ``(serial, started)`` for the callback being executed by the event loop or None.
+
+    *serial* is incremented for each callback and *started* is the monotonic time when the callback
+    was started. Only available if enabled by :func:`track_callbacks` or :func:`enable_stats`.
+    May be called from any thread.
+    """
+    cdef double started = _callback_started
+    if started == 0.0:
+        return None
+    return (_callback_serial, started)
 
 
 cdef void __event_handler(int fd, short evtype, void *arg) with gil:
     cdef event self = <event>arg
+    cdef double started = _callback_enter()
     try:
         self.callback(self, evtype)
     except:
@@ -140,10 +354,231 @@ cdef void __event_handler(int fd, short evtype, void *arg) with gil:
             traceback.print_exc()
         sys.exc_clear()
     finally:
+        _callback_exit(started)
         if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
             self._delref()
 
 
+cdef class event
+
+
+# the base that the events of the destroyed loops are moved to; it is never dispatched
+cdef event_base* _destroyed_base = NULL
+
+
+cdef class Loop:
+    """An event loop, a wrapper for libevent's ``event_base``.
+
+    Every thread runs its own loop, see :func:`get_loop`. The events are bound to the loop of the thread
+    that created them and must only be used in that thread. The thread that imported this module uses
+    the default loop, which is the only one that handles signals and evdns requests and is the only one
+    instrumented by :func:`enable_stats` and :func:`track_callbacks`.
+
+    The loop of any other thread is destroyed (see :meth:`destroy`) when its thread exits, even if
+    the thread leaves greenlets or pending events behind.
+    """
+    cdef event_base* _ptr
+    cdef int _default
+    # the events bound to the loop, linked through event._loop_prev and event._loop_next;
+    # each of them holds a reference to the loop
+    cdef void* _events
+
+    def __init__(self):
+        if self._ptr == NULL:
+            self._ptr = event_base_new()
+            if self._ptr == NULL:
+                raise MemoryError
+
+    def __dealloc__(self):
+        # the events keep the loop alive, so none of them is bound to it at this point
+        if self._ptr != NULL and not self._default:
+            event_base_free(self._ptr)
+        self._ptr = NULL
+
+    property default:
+        """True for the default loop."""
+
+        def __get__(self):
+            return bool(self._default)
+
+    property destroyed:
+        """True if :meth:`destroy` has been called."""
+
+        def __get__(self):
+            return self._ptr == NULL
+
+    def __repr__(self):
+        if self._default:
+            default = ' default'
+        else:
+            default = ''
+        if self._ptr == NULL:
+            return '<%s at %s destroyed>' % (type(self).__name__, hex(id(self)))
+        return '<%s at %s%s method=%s>' % (type(self).__name__, hex(id(self)), default, self.get_method())
+
+    cdef _check_thread(self):
+        if self._ptr == NULL:
+            raise RuntimeError('%r has been destroyed' % (self, ))
+        if self._ptr != gevent_thread_base:
+            raise RuntimeError('%r can only be run by the thread that owns it' % (self, ))
+
+    cdef _link(self, event ev):
+        Py_INCREF(self)
+        ev._loop = <void*>self
+        ev._loop_prev = NULL
+        ev._loop_next = self._events
+        if self._events != NULL:
+            (<event>self._events)._loop_prev = <void*>ev
+        self._events = <void*>ev
+
+    cdef _unlink(self, event ev):
+        if ev._loop_prev == NULL:
+            self._events = ev._loop_next
+        else:
+            (<event>ev._loop_prev)._loop_next = ev._loop_next
+        if ev._loop_next != NULL:
+            (<event>ev._loop_next)._loop_prev = ev._loop_prev
+        ev._loop = NULL
+        ev._loop_prev = NULL
+        ev._loop_next = NULL
+        Py_DECREF(self)
+
+    def destroy(self):
+        """Delete all the events of the loop and free its ``event_base``.
+
+        The pending events drop the references they hold to themselves and are moved to a base that is
+        never dispatched, so using them afterwards is safe but has no effect. If the loop is the one of
+        the calling thread, the next :func:`get_loop` call creates a new loop. The loop must not be
+        dispatched afterwards. The default loop cannot be destroyed.
+        """
+        global _destroyed_base, gevent_thread_base, gevent_thread_loop
+        cdef event ev
+        cdef list events = []
+        if self._default:
+            raise RuntimeError('The default loop cannot be destroyed')
+        if gevent_thread_loop == <void*>self:
+            gevent_thread_loop = NULL
+            gevent_thread_base = NULL
+            gevent_thread_exit_set(NULL)
+            Py_DECREF(self)  # the reference held by the thread
+        if self._ptr == NULL:
+            return
+        if _destroyed_base == NULL:
+            _destroyed_base = event_base_new()
+            if _destroyed_base == NULL:
+                raise MemoryError
+        while self._events != NULL:
+            ev = <event>self._events
+            self._unlink(ev)
+            ev._detach()
+            events.append(ev)
+        # only release the events now: a callback or an argument may be the last reference to another event
+        for ev in events:
+            ev._delref()
+        ev = None
+        del events[:]
+        event_base_free(self._ptr)
+        self._ptr = NULL
+
+    def dispatch(self):
+        """Dispatch all events on the event queue.
+        Returns 0 on success, and 1 if no events are registered.
+        May raise IOError.
+        """
+        global _loop_time_valid
+        cdef int ret
+        cdef event_base* base = self._ptr
+        cdef int instrumented = self._default
+        self._check_thread()
+        with nogil:
+            # run the loop one pass at a time, so that the cached time is refreshed on every iteration
+            while True:
+                _loop_time_valid = 0
+                if _instrumented and instrumented:
+                    _iteration_begin()
+                ret = event_base_loop(base, EVLOOP_ONCE)
+                if _instrumented and instrumented:
+                    _iteration_end()
+                if ret != 0:
+                    break
+        if ret < 0:
+            raise IOError(errno, strerror(errno))
+        return ret
+
+    def loop(self, nonblock=False):
+        """Dispatch all pending events on queue in a single pass.
+        Returns 0 on success, and 1 if no events are registered.
+        May raise IOError.
+        """
+        global _loop_time_valid
+        cdef int flags, ret
+        cdef event_base* base = self._ptr
+        cdef int instrumented = self._default
+        self._check_thread()
+        flags = EVLOOP_ONCE
+        if nonblock:
+            flags = EVLOOP_ONCE|EVLOOP_NONBLOCK
+        _loop_time_valid = 0
+        with nogil:
+            if _instrumented and instrumented:
+                _iteration_begin()
+            ret = event_base_loop(base, flags)
+            if _instrumented and instrumented:
+                _iteration_end()
+        if ret < 0:
+            raise IOError(errno, strerror(errno))
+        return ret
+
+    def get_method(self):
+        """Wrapper for :meth:`event_base_get_method`"""
+        if self._ptr == NULL:
+            raise RuntimeError('%r has been destroyed' % (self, ))
+        return event_base_get_method(self._ptr)
+
+
+cdef Loop _default_loop
+
+
+cdef void _thread_exit(void* ptr) with gil:
+    # called by the thread-exit hook of libevent.h with the loop of the exiting thread;
+    # thread._local cannot be used for that, since a greenlet keeps its thread's state alive
+    cdef Loop loop = <Loop>ptr
+    try:
+        loop.destroy()
+    except:
+        traceback.print_exc()
+        sys.exc_clear()
+
+
+def get_loop():
+    """Return the event loop of the calling thread, creating it if needed."""
+    return _current_loop()
+
+
+cdef Loop _current_loop():
+    global gevent_thread_base, gevent_thread_loop
+    cdef Loop loop
+    if gevent_thread_loop != NULL:
+        loop = <Loop>gevent_thread_loop
+        if loop._ptr != NULL:
+            return loop
+        # destroyed by another thread; this releases the reference held by the calling thread
+        loop.destroy()
+    loop = Loop()
+    # the reference is held by the thread and released by destroy(), which is called when the thread exits
+    Py_INCREF(loop)
+    gevent_thread_loop = <void*>loop
+    gevent_thread_base = loop._ptr
+    gevent_thread_exit_set(<void*>loop)
+    return loop
+
+
+cdef event_base* _current_base() except NULL:
+    if gevent_thread_base == NULL:
+        _current_loop()
+    return gevent_thread_base
+
+
 cdef class event:
     """Create a new event object with a user callback.
 
@@ -156,6 +591,9 @@ cdef class event:
     cdef public object callback
     cdef public object arg
     cdef int _incref # 1 if we already INCREFed this object once (because libevent references it)
+    cdef void* _loop # the Loop the event is bound to (a strong reference, see Loop._link)
+    cdef void* _loop_prev
+    cdef void* _loop_next
 
     def __init__(self, short evtype, int handle, callback, arg=None):
         self.callback = callback
@@ -166,6 +604,24 @@ cdef class event:
             evtimer_set(&self.ev, __event_handler, c_self)
         else:
             event_set(&self.ev, handle, evtype, __event_handler, c_self)
+        self._bind()
+
+    def __dealloc__(self):
+        if self._loop != NULL:
+            (<Loop>self._loop)._unlink(self)
+
+    cdef _detach(self):
+        # called by Loop.destroy(): move the event to a base that is never dispatched
+        if event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            event_del(&self.ev)
+        event_base_set(_destroyed_base, &self.ev)
+
+    cdef _bind(self):
+        # bind the event to the loop of the calling thread
+        cdef Loop loop = _current_loop()
+        event_base_set(loop._ptr, &self.ev)
+        if self._loop == NULL:
+            loop._link(self)
 
     cdef _addref(self):
         if self._incref <= 0:
@@ -333,8 +789,278 @@ class readwrite_event(event):
         self.add(timeout)
 
 
+cdef void __fd_watcher_handler(int fd, short evtype, void *arg) with gil:
+    cdef fd_watcher self = <fd_watcher>arg
+    cdef double started = _callback_enter()
+    try:
+        self._run(evtype)
+    finally:
+        _callback_exit(started)
+        if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            self._delref()
+
+
+cdef class fd_watcher(event):
+    """Wait for a file descriptor to become readable or writable using a single libevent event.
+
+    - *handle*   -- a file descriptor or a socket
+    - *callback* -- user callback with ``(watcher, evtype, arg)`` prototype, where *arg* is the object
+      passed to :meth:`start` and *evtype* is EV_READ, EV_WRITE or EV_TIMEOUT
+
+    - *persist*  -- keep the descriptor registered between the waits (see below)
+
+    At most one waiter for reading and one for writing can be registered at a time; a waiter
+    started with ``EV_READ|EV_WRITE`` occupies both. A waiter is removed before its callback is
+    called. By default the event is only added to libevent while there are waiters, for the union
+    of their directions and with the nearest of their timeouts.
+
+    A persistent watcher registers the descriptor once, for both directions, as an edge-triggered
+    event (EV_PERSIST|EV_ET), so starting and finishing a wait does not make any system calls. Since
+    an edge is only reported once, the watcher remembers it in :attr:`readable` or :attr:`writable`;
+    :meth:`start` must only be called after the operation has failed with EAGAIN. Persistent
+    watchers require libevent 2 (:data:`EV_ET` is not zero). The descriptor stays registered until
+    :meth:`cancel` is called or the watcher is garbage collected.
+    """
+    cdef object _read_arg
+    cdef object _write_arg
+    cdef double _read_deadline
+    cdef double _write_deadline
+    cdef short _waiting
+    cdef short _ready
+    cdef int _joint
+    cdef int _persist
+
+    def __init__(self, int handle, callback, persist=False):
+        if persist and not C_EV_ET:
+            raise ValueError('Persistent watchers require edge-triggered events, which this libevent does not support')
+        self.callback = callback
+        self._incref = 0
+        self._waiting = 0
+        self._ready = 0
+        self._joint = 0
+        self._persist = persist
+        if persist:
+            event_set(&self.ev, handle, C_EV_READ|C_EV_WRITE|C_EV_PERSIST|C_EV_ET, __fd_watcher_handler, <void*>self)
+        else:
+            event_set(&self.ev, handle, 0, __fd_watcher_handler, <void*>self)
+        self._bind()
+
+    def __dealloc__(self):
+        # a persistent watcher stays registered without holding a reference to itself
+        if event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_TIMEOUT, NULL):
+            event_del(&self.ev)
+
+    property persist:
+
+        def __get__(self):
+            return bool(self._persist)
+
+    property readable:
+        """Return True if a persistent watcher has seen the descriptor become readable since the last wait for reading."""
+
+        def __get__(self):
+            return self._ready & C_EV_READ != 0
+
+    property writable:
+        """Return True if a persistent watcher has seen the descriptor become writable since the last wait for writing."""
+
+        def __get__(self):
+            return self._ready & C_EV_WRITE != 0
+
+    property reading:
+        """Return True if there is a waiter for reading."""
+
+        def __get__(self):
+            return self._waiting & C_EV_READ != 0
+
+    property writing:
+        """Return True if there is a waiter for writing."""
+
+        def __get__(self):
+            return self._waiting & C_EV_WRITE != 0
+
+    property read_arg:
+
+        def __get__(self):
+            return self._read_arg
+
+    property write_arg:
+
+        def __get__(self):
+            return self._write_arg
+
+    def start(self, short evtype, arg, timeout=None):
+        """Register a waiter for *evtype* (EV_READ, EV_WRITE or both).
+
+        The callback is called with *arg* once the descriptor is ready or after *timeout* seconds.
+        """
+        cdef double deadline = -1.0
+        evtype = evtype & (C_EV_READ|C_EV_WRITE)
+        if not evtype:
+            raise ValueError('Invalid value for evtype, must be EV_READ, EV_WRITE or both: %r' % (evtype, ))
+        if self._waiting & evtype:
+            raise ValueError('Already waiting for %s on fd=%s: %r' % (evtype, self.ev.ev_fd, (self._read_arg, self._write_arg)))
+        if timeout is not None:
+            deadline = <double>timeout
+            if deadline < 0.0:
+                raise ValueError('Invalid value for timeout, must be a non-negative number or None: %r' % (timeout, ))
+            deadline = _now() + deadline
+        if evtype & C_EV_READ:
+            self._read_arg = arg
+            self._read_deadline = deadline
+        if evtype & C_EV_WRITE:
+            self._write_arg = arg
+            self._write_deadline = deadline
+        self._joint = evtype == C_EV_READ|C_EV_WRITE
+        self._waiting = self._waiting | evtype
+        # the caller got EAGAIN, so the edges seen before are stale
+        self._ready = self._ready & ~evtype
+        self._update()
+
+    def stop(self, short evtype=C_EV_READ|C_EV_WRITE):
+        """Remove the waiters for *evtype* if there are any."""
+        if self._joint and evtype & self._waiting:
+            evtype = C_EV_READ|C_EV_WRITE
+        evtype = evtype & self._waiting
+        if evtype:
+            self._clear(evtype)
+            self._update()
+
+    def cancel(self):
+        """Remove all waiters. A persistent watcher also stops watching the descriptor."""
+        self.stop()
+        if self._persist:
+            self._unregister()
+
+    cdef _unregister(self):
+        cdef event_base* base = self.ev.ev_base
+        # event_set() also forgets the timeout that libevent keeps re-arming for a persistent event
+        if event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_TIMEOUT, NULL):
+            event_del(&self.ev)
+        event_set(&self.ev, self.ev.ev_fd, C_EV_READ|C_EV_WRITE|C_EV_PERSIST|C_EV_ET, __fd_watcher_handler, <void*>self)
+        event_base_set(base, &self.ev)
+        self._ready = 0
+
+    cdef _clear(self, short evtype):
+        if evtype & C_EV_READ:
+            self._read_arg = None
+        if evtype & C_EV_WRITE:
+            self._write_arg = None
+        self._waiting = self._waiting & ~evtype
+        if not self._waiting:
+            self._joint = 0
+
+    cdef _update(self):
+        # re-register the event for the current waiters
+        global errno
+        cdef timeval tv
+        cdef double deadline = -1.0
+        cdef int pending = event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_TIMEOUT, NULL)
+        cdef int result = 0
+        cdef event_base* base
+        if self._waiting & C_EV_READ:
+            deadline = self._read_deadline
+        if self._waiting & C_EV_WRITE and self._write_deadline >= 0.0:
+            if deadline < 0.0 or self._write_deadline < deadline:
+                deadline = self._write_deadline
+        if deadline >= 0.0:
+            deadline = deadline - _now()
+            if deadline < 0.0:
+                deadline = 0.0
+            tv.tv_sec = <long>deadline
+            tv.tv_usec = <unsigned int>((deadline - <double>tv.tv_sec) * 1000000.0)
+        errno = 0
+        if self._persist:
+            # the descriptor is registered once; re-adding a registered event only updates its timeout.
+            # A timeout left from a finished wait is not removed here, it is dropped when it expires.
+            if deadline >= 0.0:
+                result = event_add(&self.ev, &tv)
+            elif not event_pending(&self.ev, C_EV_READ|C_EV_WRITE, NULL):
+                result = event_add(&self.ev, NULL)
+            if result < 0:
+                self._delref()
+            elif self._waiting:
+                self._addref()
+            else:
+                self._delref()
+        else:
+            if pending:
+                event_del(&self.ev)
+            if not self._waiting:
+                if pending:
+                    self._delref()
+                return
+            base = self.ev.ev_base
+            event_set(&self.ev, self.ev.ev_fd, self._waiting, __fd_watcher_handler, <void*>self)
+            event_base_set(base, &self.ev)
+            if deadline < 0.0:
+                result = event_add(&self.ev, NULL)
+            else:
+                result = event_add(&self.ev, &tv)
+            if result < 0:
+                if pending:
+                    self._delref()
+            else:
+                self._addref()
+        if result < 0:
+            if errno:
+                raise IOError(errno, strerror(errno))
+            raise IOError("event_add(fileno=%s) returned %s" % (self.fd, result))
+
+    cdef _run(self, short evtype):
+        cdef short fired
+        cdef double now
+        cdef int joint = self._joint
+        if evtype & C_EV_TIMEOUT:
+            now = _now()
+            fired = 0
+            if self._waiting & C_EV_READ and 0.0 <= self._read_deadline <= now:
+                fired = C_EV_READ
+            if self._waiting & C_EV_WRITE and 0.0 <= self._write_deadline <= now:
+                fired = fired | C_EV_WRITE
+            evtype = C_EV_TIMEOUT
+            if self._persist:
+                # libevent re-arms the timeout of a persistent event; drop it, _update() sets a new one if needed
+                self._unregister()
+        else:
+            self._ready = self._ready | (evtype & (C_EV_READ|C_EV_WRITE))
+            fired = evtype & self._waiting
+        if fired and joint:
+            fired = C_EV_READ|C_EV_WRITE
+        read_arg = self._read_arg
+        write_arg = self._write_arg
+        self._clear(fired)
+        self._update()
+        if fired and joint:
+            self._call(evtype, read_arg)
+            return
+        if fired & C_EV_READ:
+            self._call(evtype & (C_EV_READ|C_EV_TIMEOUT), read_arg)
+        if fired & C_EV_WRITE:
+            self._call(evtype & (C_EV_WRITE|C_EV_TIMEOUT), write_arg)
+
+    cdef _call(self, short evtype, arg):
+        try:
+            self.callback(self, evtype, arg)
+        except:
+            traceback.print_exc()
+            try:
+                sys.stderr.write('Failed to execute callback for %s\n\n' % (self, ))
+            except:
+                traceback.print_exc()
+            sys.exc_clear()
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '<%s at %s fd=%s reading=%r writing=%r cb=%s>' % (type(self).__name__, hex(id(self)), self.fd,
+                                                                 self._read_arg, self._write_arg, self.callback)
+
+
 cdef void __simple_handler(int fd, short evtype, void *arg) with gil:
     cdef event self = <event>arg
+    cdef double started = _callback_enter()
     try:
         args, kwargs = self.arg
         self.callback(*args, **kwargs)
@@ -346,6 +1072,7 @@ cdef void __simple_handler(int fd, short evtype, void *arg) with gil:
             traceback.print_exc()
         sys.exc_clear()
     finally:
+        _callback_exit(started)
         if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
             self._delref()
 
@@ -357,6 +1084,7 @@ cdef class timer(event):
         self.callback = callback
         self.arg = (args, kwargs)
         evtimer_set(&self.ev, __simple_handler, <void*>self)
+        self._bind()
         self.add(seconds)
 
 
@@ -367,6 +1095,7 @@ cdef class signal(event):
         self.callback = callback
         self.arg = (args, kwargs)
         event_set(&self.ev, signalnum, C_EV_SIGNAL|C_EV_PERSIST, __simple_handler, <void*>self)
+        self._bind()
         self.add()
 
 
@@ -377,6 +1106,7 @@ cdef class active_event(event):
         self.callback = callback
         self.arg = (args, kwargs)
         evtimer_set(&self.ev, __simple_handler, <void*>self)
+        self._bind()
         self._addref()
         event_active(&self.ev, C_EV_TIMEOUT, 1)
 
@@ -384,38 +1114,570 @@ cdef class active_event(event):
         raise NotImplementedError
 
 
+cdef class callback(event):
+    """A re-armable event that runs the callback in the current loop iteration.
+
+    Unlike :class:`active_event`, the instance is not scheduled upon creation: call :meth:`start`
+    to schedule it. Once the callback has been executed or cancelled, :meth:`start` can be called
+    again; the same libevent event is re-activated instead of allocating a new one.
+    """
+
+    def __init__(self, callback, *args, **kwargs):
+        self.callback = callback
+        self.arg = (args, kwargs)
+        evtimer_set(&self.ev, __simple_handler, <void*>self)
+        self._bind()
+
+    def start(self):
+        """Schedule the callback to run in the current loop iteration. Do nothing if it's already scheduled."""
+        if not event_pending(&self.ev, C_EV_TIMEOUT|C_EV_SIGNAL|C_EV_READ|C_EV_WRITE, NULL):
+            self._addref()
+            event_active(&self.ev, C_EV_TIMEOUT, 1)
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+
+cdef class queued_call:
+    """A callback scheduled with :meth:`callback_queue.append`."""
+    cdef public object callback
+    cdef public object args
+
+    property pending:
+        """Return True if the callback has not been executed or cancelled yet."""
+
+        def __get__(self):
+            return self.callback is not None
+
+    def cancel(self):
+        """Remove the callback from the queue."""
+        self.callback = None
+        self.args = None
+
+    def __repr__(self):
+        if self.callback is None:
+            return '<%s at %s>' % (type(self).__name__, hex(id(self)))
+        return '<%s at %s pending callback=%r args=%r>' % (type(self).__name__, hex(id(self)), self.callback, self.args)
+
+
+cdef void __callback_queue_handler(int fd, short evtype, void *arg) with gil:
+    cdef callback_queue self = <callback_queue>arg
+    cdef double started = _callback_enter()
+    try:
+        self._run()
+    finally:
+        _callback_exit(started)
+        if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            self._delref()
+
+
+cdef class callback_queue(event):
+    """A FIFO of callbacks executed in order by a single libevent event.
+
+    Appending to an idle queue activates the event, so the callbacks are executed in the current
+    loop iteration, in one pass, without allocating a libevent event per callback.
+
+    - *budget* -- the maximum number of callbacks appended while the queue is being run that are
+      executed in the same pass; the rest is postponed until the next loop iteration, so that polling
+      for I/O is not starved by the callbacks that keep scheduling new ones. The callbacks that were
+      queued when the pass started are always executed. Zero or negative value means no limit.
+    """
+    cdef PyObject** _items
+    cdef unsigned int _head
+    cdef unsigned int _count
+    cdef unsigned int _capacity
+    cdef public int budget
+
+    def __init__(self, int budget=1000):
+        self.budget = budget
+        evtimer_set(&self.ev, __callback_queue_handler, <void*>self)
+        self._bind()
+
+    def __dealloc__(self):
+        cdef unsigned int index
+        while self._count > 0:
+            index = self._head
+            self._head = (self._head + 1) & (self._capacity - 1)
+            self._count -= 1
+            Py_XDECREF(self._items[index])
+        if self._items != NULL:
+            PyMem_Free(self._items)
+            self._items = NULL
+
+    def __len__(self):
+        return self._count
+
+    cdef _grow(self):
+        cdef unsigned int capacity = self._capacity * 2
+        cdef unsigned int index
+        if capacity == 0:
+            capacity = 64
+        cdef PyObject** items = <PyObject**>PyMem_Malloc(capacity * sizeof(PyObject*))
+        if items == NULL:
+            raise MemoryError
+        for index from 0 <= index < self._count:
+            items[index] = self._items[(self._head + index) & (self._capacity - 1)]
+        if self._items != NULL:
+            PyMem_Free(self._items)
+        self._items = items
+        self._head = 0
+        self._capacity = capacity
+
+    def append(self, callback, tuple args):
+        """Schedule *callback* to be called with *args* (a tuple). Return a :class:`queued_call` instance."""
+        cdef queued_call item = queued_call()
+        item.callback = callback
+        item.args = args
+        if self._count == self._capacity:
+            self._grow()
+        Py_INCREF(item)
+        self._items[(self._head + self._count) & (self._capacity - 1)] = <PyObject*>item
+        self._count += 1
+        if not event_pending(&self.ev, C_EV_TIMEOUT, NULL):
+            self._addref()
+            event_active(&self.ev, C_EV_TIMEOUT, 1)
+        return item
+
+    cdef _run(self):
+        cdef unsigned int limit = self._count + self.budget
+        cdef unsigned int executed = 0
+        cdef queued_call item
+        cdef timeval tv
+        while self._count > 0:
+            if self.budget > 0 and executed >= limit:
+                # let libevent poll before running the rest
+                tv.tv_sec = 0
+                tv.tv_usec = 0
+                event_add(&self.ev, &tv)
+                self._addref()
+                return
+            item = <queued_call>self._items[self._head]
+            Py_DECREF(item)  # the reference that was held by the queue
+            self._items[self._head] = NULL
+            self._head = (self._head + 1) & (self._capacity - 1)
+            self._count -= 1
+            callback = item.callback
+            if callback is None:
+                continue
+            args = item.args
+            item.callback = None
+            item.args = None
+            executed += 1
+            try:
+                callback(*args)
+            except:
+                traceback.print_exc()
+                try:
+                    sys.stderr.write('Failed to execute callback %r\n\n' % (callback, ))
+                except:
+                    traceback.print_exc()
+                sys.exc_clear()
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+
+cdef void __async_queue_handler(int fd, short evtype, void *arg) with gil:
+    cdef async_queue self = <async_queue>arg
+    cdef double started = _callback_enter()
+    try:
+        self._run()
+    finally:
+        _callback_exit(started)
+        if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            self._delref()
+
+
+cdef class async_queue(event):
+    """A FIFO of callbacks that other threads submit to the thread running the event loop.
+
+    The event loop is woken up through an eventfd on Linux and through a pipe (a socket pair
+    on Windows) elsewhere. Only the first :meth:`append` after the queue was drained writes
+    to it, so a burst of submissions costs one wakeup; the loop then executes everything
+    that was submitted in one pass. An exception raised by a callback is printed and does not
+    affect the rest.
+
+    The queue must be created in the thread that runs the event loop; :meth:`append` may be called
+    from any thread.
+    """
+    cdef list _items
+    cdef int _fds[2]
+    cdef int _signalled
+    cdef int _opened
+
+    def __init__(self):
+        global errno
+        self._items = []
+        self._signalled = 0
+        errno = 0
+        if gevent_wakeup_open(self._fds) < 0:
+            raise IOError(errno, strerror(errno))
+        self._opened = 1
+        event_set(&self.ev, self._fds[0], C_EV_READ|C_EV_PERSIST, __async_queue_handler, <void*>self)
+        self._bind()
+        event.add(self)
+
+    def __dealloc__(self):
+        if self._opened:
+            self._opened = 0
+            gevent_wakeup_close(self._fds)
+
+    def __len__(self):
+        return len(self._items)
+
+    def append(self, callback, tuple args=(), dict kwargs=None):
+        """Schedule ``callback(*args, **kwargs)`` to be called in the event loop. Safe to call from any thread."""
+        # this method does not release the GIL, so it's atomic with respect to the other threads and to _run
+        if not self._opened:
+            raise ValueError('The queue is closed')
+        self._items.append((callback, args, kwargs))
+        if not self._signalled:
+            self._signalled = 1
+            gevent_wakeup_signal(self._fds)
+
+    cdef _run(self):
+        cdef list items
+        gevent_wakeup_drain(self._fds)
+        self._signalled = 0
+        items = self._items
+        self._items = []
+        for callback, args, kwargs in items:
+            try:
+                if kwargs:
+                    callback(*args, **kwargs)
+                else:
+                    callback(*args)
+            except:
+                traceback.print_exc()
+                try:
+                    sys.stderr.write('Failed to execute callback %r\n\n' % (callback, ))
+                except:
+                    traceback.print_exc()
+                sys.exc_clear()
+
+    def close(self):
+        """Stop watching the wakeup descriptor and close it."""
+        self.cancel()
+        if self._opened:
+            self._opened = 0
+            gevent_wakeup_close(self._fds)
+
+    cdef _detach(self):
+        event._detach(self)
+        if self._opened:
+            self._opened = 0
+            gevent_wakeup_close(self._fds)
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+
+cdef void __ready_queue_handler(int fd, short evtype, void *arg) with gil:
+    cdef ready_queue self = <ready_queue>arg
+    cdef double started = _callback_enter()
+    try:
+        self._run()
+    finally:
+        _callback_exit(started)
+        if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            self._delref()
+
+
+cdef class ready_queue(event):
+    """A FIFO of greenlets that yielded control with :func:`sleep(0) <gevent.hub.sleep>`.
+
+    The greenlets are switched to in order in the next loop iteration, after libevent has polled
+    for I/O once, so the yielding greenlets do not starve I/O and timers. All of them share
+    a single zero timeout and nothing is allocated per greenlet. Each greenlet is switched to
+    with the queue itself as the argument.
+    """
+    cdef list _ready
+    cdef list _running
+    cdef Py_ssize_t _index
+
+    def __init__(self):
+        self._ready = []
+        self._running = []
+        self._index = 0
+        evtimer_set(&self.ev, __ready_queue_handler, <void*>self)
+        self._bind()
+
+    def __len__(self):
+        return len(self._ready) + len(self._running) - self._index
+
+    def append(self, greenlet):
+        """Switch to *greenlet* in the next loop iteration."""
+        cdef timeval tv
+        self._ready.append(greenlet)
+        if not event_pending(&self.ev, C_EV_TIMEOUT, NULL):
+            tv.tv_sec = 0
+            tv.tv_usec = 0
+            event_add(&self.ev, &tv)
+            self._addref()
+
+    def remove(self, greenlet):
+        """Remove *greenlet* from the queue if it is still waiting there."""
+        try:
+            self._running[self._running.index(greenlet, self._index)] = None
+            return
+        except ValueError:
+            pass
+        try:
+            self._ready[self._ready.index(greenlet)] = None
+        except ValueError:
+            pass
+
+    cdef _run(self):
+        # swap the buffers: the greenlets that yield while this runs wait for the next iteration
+        cdef list running = self._ready
+        self._ready = self._running
+        self._running = running
+        self._index = 0
+        try:
+            while self._index < len(running):
+                greenlet = running[self._index]
+                self._index += 1
+                if greenlet is None:
+                    continue
+                try:
+                    greenlet.switch(self)
+                except:
+                    traceback.print_exc()
+                    try:
+                        sys.stderr.write('Failed to switch to %r\n\n' % (greenlet, ))
+                    except:
+                        traceback.print_exc()
+                    sys.exc_clear()
+        finally:
+            del running[:]
+            self._index = 0
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+
+cdef class timer_wheel(event)
+
+
+cdef class wheel_timer:
+    """A timer scheduled with :meth:`timer_wheel.start`."""
+    cdef public object callback
+    cdef public object args
+    cdef public double seconds
+    cdef wheel_timer _prev
+    cdef wheel_timer _next
+    cdef timer_wheel _wheel
+    cdef unsigned long _tick
+
+    property pending:
+        """Return True if the timer is still scheduled to run."""
+
+        def __get__(self):
+            return self._wheel is not None
+
+    def cancel(self):
+        """Remove the timer from the wheel."""
+        if self._wheel is not None:
+            self._wheel._remove(self)
+        self.callback = None
+        self.args = None
+
+    def __repr__(self):
+        if self._wheel is None:
+            pending = ''
+        else:
+            pending = ' pending'
+        return '<%s at %s%s seconds=%s callback=%r args=%r>' % (type(self).__name__, hex(id(self)), pending,
+                                                                self.seconds, self.callback, self.args)
+
+
+cdef void __timer_wheel_handler(int fd, short evtype, void *arg) with gil:
+    cdef timer_wheel self = <timer_wheel>arg
+    cdef double started = _callback_enter()
+    try:
+        self._run()
+    finally:
+        _callback_exit(started)
+        if not event_pending(&self.ev, C_EV_READ|C_EV_WRITE|C_EV_SIGNAL|C_EV_TIMEOUT, NULL):
+            self._delref()
+
+
+cdef class timer_wheel(event):
+    """A hashed timer wheel for the short-lived timeouts that are usually cancelled before they expire.
+
+    - *resolution* -- the length of one tick in seconds; a timer expires at the end of the tick its deadline
+      falls into, so it never fires early but may fire up to *resolution* seconds late;
+    - *size* -- the number of slots in the wheel (rounded up to a power of two); timers further than
+      *size* ticks away stay in their slot until enough revolutions have passed.
+
+    Starting and cancelling a timer are O(1): the timer is linked into (or unlinked from) the slot of
+    its deadline. The wheel uses a single libevent timer that is scheduled for the nearest non-empty
+    slot, so libevent's heap is not touched for every timer.
+    """
+    cdef double _resolution
+    cdef double _origin
+    cdef unsigned long _current
+    cdef unsigned long _scheduled
+    cdef unsigned int _mask
+    cdef unsigned int _count
+    cdef list _slots
+
+    def __init__(self, double resolution=0.005, unsigned int size=1024):
+        cdef unsigned int slots = 1
+        cdef wheel_timer head
+        if resolution <= 0.0:
+            raise ValueError('Invalid value for resolution, must be a positive number: %r' % (resolution, ))
+        while slots < size:
+            slots = slots * 2
+        self._resolution = resolution
+        self._origin = _now()
+        self._current = 0
+        self._scheduled = 0
+        self._mask = slots - 1
+        self._count = 0
+        self._slots = []
+        for _ in range(slots):
+            head = wheel_timer()
+            head._prev = head
+            head._next = head
+            self._slots.append(head)
+        evtimer_set(&self.ev, __timer_wheel_handler, <void*>self)
+        self._bind()
+
+    property resolution:
+
+        def __get__(self):
+            return self._resolution
+
+    def __len__(self):
+        return self._count
+
+    cdef unsigned long _now_tick(self):
+        return <unsigned long>((_now() - self._origin) / self._resolution)
+
+    def start(self, double seconds, callback, *args):
+        """Call *callback* with *args* after *seconds*. Return a :class:`wheel_timer` instance."""
+        cdef wheel_timer timer, head
+        cdef double deadline
+        cdef unsigned long tick
+        if seconds < 0.0:
+            seconds = 0.0
+        deadline = _now() - self._origin + seconds
+        tick = <unsigned long>(deadline / self._resolution) + 1
+        if tick <= self._current:
+            tick = self._current + 1
+        timer = wheel_timer()
+        timer.callback = callback
+        timer.args = args
+        timer.seconds = seconds
+        timer._tick = tick
+        timer._wheel = self
+        head = <wheel_timer>self._slots[tick & self._mask]
+        timer._prev = head._prev
+        timer._next = head
+        head._prev._next = timer
+        head._prev = timer
+        self._count += 1
+        if self._scheduled == 0 or tick < self._scheduled:
+            self._schedule(tick)
+        return timer
+
+    cdef _remove(self, wheel_timer timer):
+        timer._prev._next = timer._next
+        timer._next._prev = timer._prev
+        timer._prev = None
+        timer._next = None
+        timer._wheel = None
+        self._count -= 1
+        if self._count == 0 and self._scheduled:
+            self._scheduled = 0
+            if event_pending(&self.ev, C_EV_TIMEOUT, NULL):
+                event_del(&self.ev)
+                self._delref()
+
+    cdef _schedule(self, unsigned long tick):
+        cdef timeval tv
+        cdef double delay = tick * self._resolution - (_now() - self._origin)
+        if delay < 0.0:
+            delay = 0.0
+        tv.tv_sec = <long>delay
+        tv.tv_usec = <unsigned int>((delay - <double>tv.tv_sec) * 1000000.0)
+        if not event_pending(&self.ev, C_EV_TIMEOUT, NULL):
+            self._addref()
+        event_add(&self.ev, &tv)
+        self._scheduled = tick
+
+    cdef _run(self):
+        cdef unsigned long now
+        cdef list expired = []
+        _update_loop_time()
+        now = self._now_tick()
+        cdef unsigned long tick
+        cdef unsigned int index
+        cdef wheel_timer head, timer, following
+        self._scheduled = 0
+        if now > self._current:
+            tick = self._current + 1
+            if now - self._current > self._mask:
+                tick = now - self._mask
+            while tick <= now:
+                head = <wheel_timer>self._slots[tick & self._mask]
+                timer = head._next
+                while timer is not head:
+                    following = timer._next
+                    if timer._tick <= now:
+                        self._remove(timer)
+                        expired.append(timer)
+                    timer = following
+                tick += 1
+            self._current = now
+        if self._count:
+            # find the nearest non-empty slot; it might contain only the timers from the later revolutions
+            for index from 1 <= index <= self._mask + 1:
+                head = <wheel_timer>self._slots[(self._current + index) & self._mask]
+                if head._next is not head:
+                    self._schedule(self._current + index)
+                    break
+        for timer in expired:
+            callback = timer.callback
+            if callback is None:
+                continue  # cancelled by one of the previous callbacks
+            args = timer.args
+            timer.callback = None
+            timer.args = None
+            try:
+                callback(*args)
+            except:
+                traceback.print_exc()
+                try:
+                    sys.stderr.write('Failed to execute callback %r\n\n' % (callback, ))
+                except:
+                    traceback.print_exc()
+                sys.exc_clear()
+
+    def add(self, timeout=None):
+        raise NotImplementedError
+
+
 def init():
     """Initialize event queue."""
     event_init()
 
 
 def dispatch():
-    """Dispatch all events on the event queue.
+    """Dispatch all events on the event queue of the calling thread's loop.
     Returns 0 on success, and 1 if no events are registered.
     May raise IOError.
     """
-    cdef int ret
-    with nogil:
-        ret = event_dispatch()
-    if ret < 0:
-        raise IOError(errno, strerror(errno))
-    return ret
+    return get_loop().dispatch()
 
 
 def loop(nonblock=False):
-    """Dispatch all pending events on queue in a single pass.
+    """Dispatch all pending events on queue of the calling thread's loop in a single pass.
     Returns 0 on success, and 1 if no events are registered.
     May raise IOError.
     """
-    cdef int flags, ret
-    flags = EVLOOP_ONCE
-    if nonblock:
-        flags = EVLOOP_ONCE|EVLOOP_NONBLOCK
-    with nogil:
-        ret = event_loop(flags)
-    if ret < 0:
-        raise IOError(errno, strerror(errno))
-    return ret
+    return get_loop().loop(nonblock)
 
 
 def get_version():
@@ -424,8 +1686,8 @@ def get_version():
 
 
 def get_method():
-    """Wrapper for :meth:`event_get_method`"""
-    return event_get_method()
+    """Wrapper for :meth:`event_base_get_method` for the calling thread's loop"""
+    return event_base_get_method(_current_base())
 
 
 cdef extern from *:
@@ -450,13 +1712,20 @@ def get_header_version():
 def reinit():
     """Wrapper for :meth:`event_reinit`."""
     emit_ifdef()
-    return event_reinit(current_base)
+    return event_reinit(_current_base())
     emit_endif()
 
 include "evdns.pxi"
 
 # XXX - make sure event queue is always initialized.
 init()
+_default_loop = Loop.__new__(Loop)
+_default_loop._ptr = current_base
+_default_loop._default = 1
+gevent_thread_loop = <void*>_default_loop
+gevent_thread_base = current_base
+if gevent_thread_exit_init() == 0:
+    gevent_thread_exit_callback = _thread_exit
 
 if get_version() != get_header_version() and get_header_version() is not None and get_version() != '1.3.99-trunk':
     import warnings
@@ -465,6 +1734,7 @@ if get_version() != get_header_version() and get_header_version() is not None an
 
 include "evbuffer.pxi"
 include "evhttp.pxi"
+include "sockio.pxi"
 
 def set_exc_info(object typ, object value, object tb):
     cdef PyThreadState* tstate = PyThreadState_GET()
@@ -3,12 +3,14 @@
 
 import sys
 import traceback
-from gevent.core import active_event
-from gevent.hub import get_hub, getcurrent
+import collections
+from heapq import heappush, heappop
+from gevent import core
+from gevent.hub import get_hub, getcurrent, Waiter, _Links
 from gevent.timeout import Timeout
 
 
-__all__ = ['Semaphore', 'DummySemaphore', 'BoundedSemaphore', 'RLock']
+__all__ = ['Semaphore', 'DummySemaphore', 'BoundedSemaphore', 'PrioritySemaphore', 'RLock', 'Condition', 'RWLock']
 
 
 class Semaphore(object):
@@ -21,7 +23,7 @@ class Semaphore(object):
     def __init__(self, value=1):
         if value < 0:
             raise ValueError("semaphore initial value must be >= 0")
-        self._links = []
+        self._links = _Links()
         self.counter = value
         self._notifier = None
 
@@ -34,25 +36,29 @@ class Semaphore(object):
 
     def release(self):
         self.counter += 1
-        if self._links and self.counter > 0 and self._notifier is None:
-            self._notifier = active_event(self._notify_links, list(self._links))
-
-    def _notify_links(self, links):
-        try:
-            for link in links:
-                if self.counter <= 0:
-                    return
-                if link in self._links:
-                    try:
-                        link(self)
-                    except:
-                        traceback.print_exc()
-                        try:
-                            sys.stderr.write('Failed to notify link %r of %r\n\n' % (link, self))
-                        except:
-                            traceback.print_exc()
-        finally:
-            self._notifier = None
+        if self._links and self.counter > 0:
+            self._schedule_notify()
+
+    def _schedule_notify(self):
+        # the same re-armable event is used for every notification this instance does
+        if self._notifier is None:
+            self._notifier = core.callback(self._notify_links)
+        self._notifier.start()
+
+    def _notify_links(self):
+        # the links are visited in place: a waiter that got the counter unlinks itself, so each
+        # release only touches the links in front of the first waiter that is still blocked
+        for link in self._links:
+            if self.counter <= 0:
+                return
+            try:
+                link(self)
+            except:
+                traceback.print_exc()
+                try:
+                    sys.stderr.write('Failed to notify link %r of %r\n\n' % (link, self))
+                except:
+                    traceback.print_exc()
 
     def rawlink(self, callback):
         """Register a callback to call when a counter is more than zero.
@@ -63,15 +69,12 @@ class Semaphore(object):
         if not callable(callback):
             raise TypeError('Expected callable: %r' % (callback, ))
         self._links.append(callback)
-        if self.counter > 0 and self._notifier is None:
-            self._notifier = active_event(self._notify_links, list(self._links))
+        if self.counter > 0:
+            self._schedule_notify()
 
     def unlink(self, callback):
         """Remove the callback set by :meth:`rawlink`"""
-        try:
-            self._links.remove(callback)
-        except ValueError:
-            pass
+        self._links.remove(callback)
 
     def wait(self, timeout=None):
         if self.counter > 0:
@@ -176,6 +179,98 @@ class BoundedSemaphore(Semaphore):
         return Semaphore.release(self)
 
 
+class PrioritySemaphore(Semaphore):
+    """A semaphore that serves the blocked :meth:`acquire` calls in the order of their priority.
+
+    The calls with lower *priority* values get the counter first; the calls with the same priority
+    are served in order. A call with a *deadline* (a :func:`gevent.core.now` value) gives up once it
+    passes: if the deadline has passed by the time the counter is available, the call is discarded
+    without decrementing it. The callbacks registered with :meth:`rawlink` are notified after the
+    blocked calls have been served.
+    """
+
+    def __init__(self, value=1):
+        Semaphore.__init__(self, value)
+        # a heap of [priority, serial, deadline, switch] entries; switch is None once the call is gone
+        self._waiters = []
+        self._serial = 0
+
+    def __str__(self):
+        params = (self.__class__.__name__, self.counter, len(self._waiters), len(self._links))
+        return '<%s counter=%s _waiters[%s] _links[%s]>' % params
+
+    def release(self):
+        self.counter += 1
+        if (self._waiters or self._links) and self.counter > 0:
+            self._schedule_notify()
+
+    def _notify_links(self):
+        waiters = self._waiters
+        now = core.now()
+        while waiters and self.counter > 0:
+            entry = heappop(waiters)
+            switch = entry[3]
+            if switch is None:
+                continue
+            entry[3] = None
+            deadline = entry[2]
+            try:
+                if deadline is not None and deadline <= now:
+                    switch(None)
+                else:
+                    switch(self)
+            except:
+                traceback.print_exc()
+                try:
+                    sys.stderr.write('Failed to notify %r of %r\n\n' % (switch, self))
+                except:
+                    traceback.print_exc()
+        if self.counter > 0:
+            Semaphore._notify_links(self)
+
+    def acquire(self, blocking=True, timeout=None, priority=0, deadline=None):
+        """Decrement the counter, waiting if necessary. Return True on success.
+
+        Return False if *blocking* is false and the counter is not available at once,
+        or if *timeout* expires or *deadline* passes before it becomes available.
+        """
+        if deadline is not None:
+            remaining = deadline - core.now()
+            if remaining <= 0:
+                return False
+            if timeout is None or remaining < timeout:
+                timeout = remaining
+        if self.counter > 0 and not self._waiters:
+            self.counter -= 1
+            return True
+        elif not blocking:
+            return False
+        self._serial += 1
+        entry = [priority, self._serial, deadline, getcurrent().switch]
+        heappush(self._waiters, entry)
+        if self.counter > 0:
+            self._schedule_notify()
+        try:
+            timer = Timeout.start_new(timeout)
+            try:
+                try:
+                    result = get_hub().switch()
+                except Timeout, ex:
+                    if ex is not timer:
+                        raise
+                    return False
+            finally:
+                timer.cancel()
+        finally:
+            entry[3] = None
+        if result is None:
+            return False
+        assert result is self, 'Invalid switch into PrioritySemaphore.acquire(): %r' % (result, )
+        self.counter -= 1
+        assert self.counter >= 0
+        return True
+
+
 class RLock(object):
 
     def __init__(self):
@@ -232,3 +327,246 @@ class RLock(object):
 
     def _is_owned(self):
         return self._owner is getcurrent()
+
+
+def _abandon(waiters, waiter):
+    """Remove *waiter* that is leaving because of an exception. Return True if it was woken up already."""
+    # the waiters that leave this way usually expire in the order they came, so the search stops early
+    try:
+        waiters.remove(waiter)
+    except ValueError:
+        return True
+    return False
+
+
+class Condition(object):
+    """A condition variable with the interface of :class:`threading.Condition` that works across greenlets.
+
+    If *lock* is not given, a new :class:`RLock` is used. The waiters are woken up in the order
+    they called :meth:`wait`; each of them only takes a :class:`Waiter <gevent.hub.Waiter>`.
+    """
+
+    def __init__(self, lock=None):
+        if lock is None:
+            lock = RLock()
+        self._lock = lock
+        self.acquire = lock.acquire
+        self.release = lock.release
+        # use the lock's own internal methods if it has them (RLock does)
+        for name in ('_release_save', '_acquire_restore', '_is_owned'):
+            method = getattr(lock, name, None)
+            if method is not None:
+                setattr(self, name, method)
+        self._waiters = collections.deque()
+
+    def __repr__(self):
+        return '<%s(%s, %d)>' % (self.__class__.__name__, self._lock, len(self._waiters))
+
+    def __enter__(self):
+        return self._lock.__enter__()
+
+    def __exit__(self, typ, value, tb):
+        return self._lock.__exit__(typ, value, tb)
+
+    def _release_save(self):
+        self._lock.release()
+
+    def _acquire_restore(self, state):
+        self._lock.acquire()
+
+    def _is_owned(self):
+        if self._lock.acquire(0):
+            self._lock.release()
+            return False
+        return True
+
+    def wait(self, timeout=None):
+        """Release the lock, block until notified or until *timeout* expires, then re-acquire the lock.
+
+        Return False if the timeout expired and True otherwise.
+        """
+        if not self._is_owned():
+            raise RuntimeError('cannot wait on un-acquired lock')
+        waiter = Waiter()
+        self._waiters.append(waiter)
+        saved_state = self._release_save()
+        try:
+            timer = Timeout.start_new(timeout)
+            try:
+                try:
+                    result = waiter.get()
+                    assert result is self, 'Invalid switch into Condition.wait(): %r' % (result, )
+                except Timeout, ex:
+                    notified = _abandon(self._waiters, waiter)
+                    if ex is timer:
+                        return notified
+                    if notified:
+                        self._wake(1)
+                    raise
+                except:
+                    if _abandon(self._waiters, waiter):
+                        # pass the notification on instead of losing it
+                        self._wake(1)
+                    raise
+            finally:
+                timer.cancel()
+        finally:
+            self._acquire_restore(saved_state)
+        return True
+
+    def wait_for(self, predicate, timeout=None):
+        """Wait until *predicate()* is true or *timeout* expires. Return the last result of *predicate()*."""
+        result = predicate()
+        if result or timeout is not None and timeout <= 0:
+            return result
+        if timeout is not None:
+            deadline = core.monotonic() + timeout
+        while not result:
+            if timeout is not None:
+                timeout = deadline - core.monotonic()
+                if timeout <= 0:
+                    break
+            self.wait(timeout)
+            result = predicate()
+        return result
+
+    def notify(self, n=1):
+        """Wake up at most *n* greenlets waiting on this condition. The lock must be held."""
+        if not self._is_owned():
+            raise RuntimeError('cannot notify on un-acquired lock')
+        self._wake(n)
+
+    def notify_all(self):
+        """Wake up all the greenlets waiting on this condition. The lock must be held."""
+        self.notify(len(self._waiters))
+
+    notifyAll = notify_all
+
+    def _wake(self, n):
+        waiters = self._waiters
+        if waiters:
+            run_callback = get_hub().run_callback
+            while n > 0 and waiters:
+                run_callback(waiters.popleft().switch, self)
+                n -= 1
+
+
+class RWLock(object):
+    """A lock that is held either by any number of readers or by a single writer.
+
+    Readers do not switch to acquire the lock while no writer holds it (or, if *prefer_writers*
+    is true, waits for it). With *prefer_writers* false the lock prefers the readers: new readers
+    join the active ones even if a writer is waiting, so a steady flow of readers can starve the
+    writers. With *prefer_writers* true the readers wait behind the waiting writers instead.
+    The writers, as well as the readers that wait, get the lock in the order they asked for it;
+    the lock is handed over to them directly when it is released.
+
+    The lock is not reentrant. :attr:`reader` and :attr:`writer` can be used in ``with`` statements.
+    """
+
+    def __init__(self, prefer_writers=False):
+        self.prefer_writers = prefer_writers
+        self._readers = 0
+        self._owner = None
+        self._read_waiters = collections.deque()
+        self._write_waiters = collections.deque()
+        self.reader = _RWLockView(self.acquire_read, self.release_read)
+        self.writer = _RWLockView(self.acquire_write, self.release_write)
+
+    def __repr__(self):
+        return '<%s readers=%s owner=%s read_waiters[%s] write_waiters[%s]>' % (
+                self.__class__.__name__,
+                self._readers,
+                self._owner,
+                len(self._read_waiters),
+                len(self._write_waiters))
+
+    def acquire_read(self, blocking=True, timeout=None):
+        """Acquire the lock for reading. Return False if *blocking* is false or *timeout* expires
+        and it cannot be acquired."""
+        if self._owner is None and not (self.prefer_writers and self._write_waiters):
+            self._readers += 1
+            return True
+        return self._wait(self._read_waiters, self.release_read, blocking, timeout)
+
+    def release_read(self):
+        if self._readers <= 0:
+            raise RuntimeError('cannot release un-acquired lock')
+        self._readers -= 1
+        if not self._readers:
+            self._grant()
+
+    def acquire_write(self, blocking=True, timeout=None):
+        """Acquire the lock for writing. Return False if *blocking* is false or *timeout* expires
+        and it cannot be acquired."""
+        if self._owner is None and not self._readers and not self._write_waiters and not self._read_waiters:
+            self._owner = getcurrent()
+            return True
+        return self._wait(self._write_waiters, self.release_write, blocking, timeout)
+
+    def release_write(self):
+        if self._owner is not getcurrent():
+            raise RuntimeError('cannot release un-acquired lock')
+        self._owner = None
+        self._grant()
+
+    def _wait(self, waiters, release, blocking, timeout):
+        if not blocking:
+            return False
+        waiter = Waiter()
+        waiters.append(waiter)
+        timer = Timeout.start_new(timeout)
+        try:
+            try:
+                result = waiter.get()
+                assert result is self, 'Invalid switch into RWLock: %r' % (result, )
+            except Timeout, ex:
+                granted = _abandon(waiters, waiter)
+                if ex is timer:
+                    if not granted:
+                        self._grant()
+                    return granted
+                if granted:
+                    release()
+                else:
+                    self._grant()
+                raise
+            except:
+                if _abandon(waiters, waiter):
+                    release()
+                else:
+                    self._grant()
+                raise
+        finally:
+            timer.cancel()
+        return True
+
+    def _grant(self):
+        # hand the lock over to the waiters it is available to; they are already owners when they wake up
+        if self._owner is not None:
+            return
+        if self._write_waiters and not self._readers and (self.prefer_writers or not self._read_waiters):
+            waiter = self._write_waiters.popleft()
+            self._owner = waiter.greenlet
+            get_hub().run_callback(waiter.switch, self)
+        elif self._read_waiters and not (self.prefer_writers and self._write_waiters):
+            run_callback = get_hub().run_callback
+            while self._read_waiters:
+                self._readers += 1
+                run_callback(self._read_waiters.popleft().switch, self)
+
+
+class _RWLockView(object):
+    """The reading or the writing side of an :class:`RWLock`, with the interface of a lock."""
+
+    __slots__ = ['acquire', 'release']
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+
+    def __exit__(self, typ, value, tb):
+        self.release()
@@ -53,6 +53,13 @@ def dns_err_to_string(int err):
         return result
 
 
+cdef int _check_dns_thread() except -1:
+    # evdns is bound to the default loop
+    if gevent_thread_base != current_base:
+        raise RuntimeError('evdns can only be used in the thread of the default loop')
+    return 0
+
+
 cdef void __evdns_callback(int code, char type, int count, int ttl, void *addrs, void *arg) with gil:
     cdef int i
     cdef object callback = <object>arg
@@ -88,6 +95,7 @@ def dns_resolve_ipv4(char *name, int flags, object callback):
     - *flags*    -- either 0 or DNS_QUERY_NO_SEARCH
     - *callback* -- callback with ``(result, type, ttl, addrs)`` prototype
     """
+    _check_dns_thread()
     cdef int result = evdns_resolve_ipv4(name, flags, __evdns_callback, <void *>callback)
     if result:
         raise IOError('evdns_resolve_ipv4(%r, %r) returned %s' % (name, flags, result, ))
@@ -101,6 +109,7 @@ def dns_resolve_ipv6(char *name, int flags, object callback):
     - *flags*    -- either 0 or DNS_QUERY_NO_SEARCH
     - *callback* -- callback with ``(result, type, ttl, addrs)`` prototype
     """
+    _check_dns_thread()
     cdef int result = evdns_resolve_ipv6(name, flags, __evdns_callback, <void *>callback)
     if result:
         raise IOError('evdns_resolve_ip6(%r, %r) returned %s' % (name, flags, result, ))
@@ -114,6 +123,7 @@ def dns_resolve_reverse(char* packed_ip, int flags, object callback):
     - *flags*     -- either 0 or DNS_QUERY_NO_SEARCH
     - *callback*  -- callback with ``(result, type, ttl, addrs)`` prototype
     """
+    _check_dns_thread()
     cdef int result = evdns_resolve_reverse(<void *>packed_ip, flags, __evdns_callback, <void *>callback)
     if result:
         raise IOError('evdns_resolve_reverse(%r, %r) returned %s' % (packed_ip, flags, result, ))
@@ -127,6 +137,7 @@ def dns_resolve_reverse_ipv6(char* packed_ip, int flags, object callback):
     - *flags*     -- either 0 or DNS_QUERY_NO_SEARCH
     - *callback*  -- callback with ``(result, type, ttl, addrs)`` prototype
     """
+    _check_dns_thread()
     cdef int result = evdns_resolve_reverse_ipv6(<void *>packed_ip, flags, __evdns_callback, <void *>callback)
     if result:
         raise IOError('evdns_resolve_reverse_ipv6(%r, %r) returned %s' % (packed_ip, flags, result, ))
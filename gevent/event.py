@@ -3,8 +3,7 @@
 
 import sys
 import traceback
-from gevent import core
-from gevent.hub import get_hub, getcurrent, _NONE
+from gevent.hub import get_hub, getcurrent, _NONE, _Links
 from gevent.timeout import Timeout
 
 __all__ = ['Event', 'AsyncResult']
@@ -20,7 +19,7 @@ class Event(object):
     """
 
     def __init__(self):
-        self._links = []
+        self._links = _Links()
         self._flag = False
 
     def __str__(self):
@@ -40,7 +39,7 @@ class Event(object):
         self._flag = True
         if self._links:
             # schedule a job to notify the links already set
-            core.active_event(self._notify_links, list(self._links))
+            get_hub().run_callback(self._notify_links, list(self._links))
 
     def clear(self):
         """Reset the internal flag to false.
@@ -92,14 +91,11 @@ class Event(object):
             raise TypeError('Expected callable: %r' % (callback, ))
         self._links.append(callback)
         if self._flag:
-            core.active_event(self._notify_links, list(self._links))  # XXX just pass [callback]
+            get_hub().run_callback(self._notify_links, [callback])
 
     def unlink(self, callback):
         """Remove the callback set by :meth:`rawlink`"""
-        try:
-            self._links.remove(callback)
-        except ValueError:
-            pass
+        self._links.remove(callback)
 
     def _notify_links(self, links):
         assert getcurrent() is get_hub()
@@ -149,7 +145,7 @@ class AsyncResult(object):
         ZeroDivisionError: integer division or modulo by zero
     """
     def __init__(self):
-        self._links = set()
+        self._links = _Links()
         self.value = None
         self._exception = _NONE
         self._notifier = None
@@ -178,7 +174,7 @@ class AsyncResult(object):
         self.value = value
         self._exception = None
         if self._links and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
     def set_exception(self, exception):
         """Store the exception. Wake up the waiters.
@@ -188,7 +184,7 @@ class AsyncResult(object):
         """
         self._exception = exception
         if self._links and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
     def get(self, block=True, timeout=None):
         """Return the stored value or raise the exception.
@@ -271,7 +267,7 @@ class AsyncResult(object):
         try:
             assert getcurrent() is get_hub()
             while self._links:
-                link = self._links.pop()
+                link = self._links.popleft()
                 try:
                     link(self)
                 except:
@@ -291,13 +287,13 @@ class AsyncResult(object):
         """
         if not callable(callback):
             raise TypeError('Expected callable: %r' % (callback, ))
-        self._links.add(callback)
+        self._links.append(callback)
         if self.ready() and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
     def unlink(self, callback):
         """Remove the callback set by :meth:`rawlink`"""
-        self._links.discard(callback)
+        self._links.remove(callback)
 
     # link protocol
     def __call__(self, source):
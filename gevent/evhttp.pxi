@@ -518,7 +518,7 @@ cdef class http:
         else:
             self.default_response_headers = default_response_headers
         self._requests = {} # maps connection id to WeakKeyDictionary which holds requests
-        self.__obj = evhttp_new(current_base)
+        self.__obj = evhttp_new(_current_base())
         evhttp_set_gencb(self.__obj, _http_cb_handler, <void *>self)
 
     def __dealloc__(self):
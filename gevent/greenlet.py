@@ -145,26 +145,28 @@ def killgroup(source):
 class Greenlet(greenlet):
     """A light-weight cooperatively-scheduled execution unit."""
 
-    args = ()
-    kwargs = {}
-    group = None
+    # the state is kept in slots rather than in the instance's __dict__, which is only created for
+    # the attributes of subclasses; the set of links is allocated by the first rawlink()
+    __slots__ = ['_run', 'args', 'kwargs', 'group', 'value', '_links', '_exception', '_notifier',
+                 '_start_event', '_formatted_info']
 
     def __init__(self, run=None, *args, **kwargs):
         greenlet.__init__(self, parent=get_hub())
         if run is not None:
             self._run = run
-        if args:
-            self.args = args
+        self.args = args
         if kwargs:
             self.kwargs = kwargs
-        self._links = set()
+        else:
+            self.kwargs = _NO_KWARGS
+        self._links = None
         self.value = None
         self._exception = _NONE
         self._notifier = None
         self._start_event = None
         group = getattr(getcurrent(), "group", None)
+        self.group = group
         if group is not None:
-            self.group = group
             group.add(self)
 
     def detach_group(self):
@@ -210,7 +212,8 @@ class Greenlet(greenlet):
         except AttributeError:
             pass
         try:
-            result = getfuncname(self.__dict__['_run'])
+            # not self._run, which could be a method of a subclass
+            result = getfuncname(_run_slot.__get__(self))
         except Exception:
             pass
         else:
@@ -269,7 +272,7 @@ class Greenlet(greenlet):
     def start(self):
         """Schedule the greenlet to run in this loop iteration"""
         assert not self.started, 'Greenlet already started'
-        self._start_event = core.active_event(self.switch)
+        self._start_event = get_hub().run_callback(self.switch)
 
     def start_later(self, seconds):
         """Schedule the greenlet to run in the future loop iteration *seconds* later"""
@@ -329,7 +332,7 @@ class Greenlet(greenlet):
             self._start_event = None
         if not self.dead:
             waiter = Waiter()
-            core.active_event(_kill, self, exception, waiter)
+            get_hub().run_callback(_kill, self, exception, waiter)
             if block:
                 waiter.wait()
                 self.join(timeout)
@@ -402,7 +405,7 @@ class Greenlet(greenlet):
         self._exception = None
         self.value = result
         if self._links and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
     def _report_error(self, exc_info):
         exception = exc_info[1]
@@ -416,7 +419,7 @@ class Greenlet(greenlet):
         self._exception = exception
 
         if self._links and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
         info = str(self) + ' failed with '
         try:
@@ -435,9 +438,12 @@ class Greenlet(greenlet):
                 return
             self._report_result(result)
         finally:
-            self.__dict__.pop('_run', None)
-            self.__dict__.pop('args', None)
-            self.__dict__.pop('kwargs', None)
+            try:
+                del self._run
+            except AttributeError:
+                pass
+            self.args = ()
+            self.kwargs = _NO_KWARGS
 
     def rawlink(self, callback):
         """Register a callable to be executed when the greenlet finishes the execution.
@@ -446,9 +452,12 @@ class Greenlet(greenlet):
         """
         if not callable(callback):
             raise TypeError('Expected callable: %r' % (callback, ))
-        self._links.add(callback)
+        if self._links is None:
+            self._links = set([callback])
+        else:
+            self._links.add(callback)
         if self.ready() and self._notifier is None:
-            self._notifier = core.active_event(self._notify_links)
+            self._notifier = get_hub().run_callback(self._notify_links)
 
     def link(self, receiver=None, GreenletLink=GreenletLink, SpawnedLink=SpawnedLink):
         """Link greenlet's completion to callable or another greenlet.
@@ -488,7 +497,8 @@ class Greenlet(greenlet):
             receiver = getcurrent()
         # discarding greenlets when we have GreenletLink instances in _links works, because
         # a GreenletLink instance pretends to be a greenlet, hash-wise and eq-wise
-        self._links.discard(receiver)
+        if self._links:
+            self._links.discard(receiver)
 
     def link_value(self, receiver=None, GreenletLink=SuccessGreenletLink, SpawnedLink=SuccessSpawnedLink):
         """Like :meth:`link` but *receiver* is only notified when the greenlet has completed successfully"""
@@ -573,7 +583,7 @@ def _killall(greenlets, exception):
 def killall(greenlets, exception=GreenletExit, block=True, timeout=None):
     if block:
         waiter = Waiter()
-        core.active_event(_killall3, greenlets, exception, waiter)
+        get_hub().run_callback(_killall3, greenlets, exception, waiter)
         if block:
             t = Timeout.start_new(timeout)
             try:
@@ -583,7 +593,7 @@ def killall(greenlets, exception=GreenletExit, block=True, timeout=None):
             finally:
                 t.cancel()
     else:
-        core.active_event(_killall, greenlets, exception)
+        get_hub().run_callback(_killall, greenlets, exception)
 
 
 class LinkedExited(Exception):
@@ -641,3 +651,5 @@ def getfuncname(func):
 
 
 _NONE = Exception("Neither exception nor value")
+_NO_KWARGS = {}
+_run_slot = Greenlet.__dict__['_run']
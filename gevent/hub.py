@@ -9,6 +9,7 @@ from gevent import core
 __all__ = ['getcurrent',
            'GreenletExit',
            'spawn_raw',
+           'spawn_pooled',
            'sleep',
            'kill',
            'signal',
@@ -39,6 +40,10 @@ MAIN = greenlet.getcurrent()
 
 thread = __import__('thread')
 threadlocal = thread._local
+# the watchdog needs a real thread even if the thread and time modules are monkey patched later
+_start_new_thread = thread.start_new_thread
+_get_ident = thread.get_ident
+_thread_sleep = __import__('time').sleep
 _threadlocal = threadlocal()
 _threadlocal.Hub = None
 try:
@@ -54,16 +59,72 @@ def _switch_helper(function, args, kwargs):
 
 
 def spawn_raw(function, *args, **kwargs):
+    hub = get_hub()
     if kwargs:
-        g = greenlet(_switch_helper, get_hub())
-        core.active_event(g.switch, function, args, kwargs)
+        g = greenlet(_switch_helper, hub)
+        hub.run_callback(g.switch, function, args, kwargs)
         return g
     else:
-        g = greenlet(function, get_hub())
-        core.active_event(g.switch, *args)
+        g = greenlet(function, hub)
+        hub.run_callback(g.switch, *args)
         return g
 
 
+def spawn_pooled(function, *args, **kwargs):
+    """Like :func:`spawn_raw`, but run *function* in a worker greenlet that is reused afterwards.
+
+    A worker that has finished its function waits in the hub's free-list (at most
+    :attr:`Hub.worker_pool_size` of them) for the next function, so that spawning in a steady state
+    does not create new greenlets. An error raised by *function* is printed and the worker is reused.
+    Note, that the worker keeps its identity, so the greenlet-local data (:mod:`gevent.local`)
+    is not reset between the functions.
+
+    The returned greenlet is the worker and not a handle of this particular call: once *function*
+    has returned, the same greenlet may already be running a later function. So the return value
+    must not be kept, killed or joined after *function* has completed; use :func:`spawn` if you need
+    that. Killing the worker while *function* runs only interrupts *function* and the worker stays
+    alive (and does not become dead when the function is done).
+    """
+    hub = get_hub()
+    idle = hub._idle_workers
+    if idle:
+        g = idle.pop()
+    else:
+        g = greenlet(_worker, hub)
+    hub.run_callback(g.switch, function, args, kwargs)
+    return g
+
+
+def _worker(function, args, kwargs):
+    current = getcurrent()
+    hub = current.parent
+    idle = hub._idle_workers
+    while True:
+        try:
+            function(*args, **kwargs)
+        except GreenletExit:
+            pass
+        except:
+            traceback.print_exc()
+            try:
+                sys.stderr.write('Failed to execute %r\n\n' % (function, ))
+            except:
+                traceback.print_exc()
+        sys.exc_clear()
+        function = args = kwargs = None
+        if len(idle) >= hub.worker_pool_size:
+            return
+        idle.append(current)
+        try:
+            # the exception state was cleared above, so Hub.switch() would not add anything
+            function, args, kwargs = greenlet.switch(hub)
+        except:
+            # nobody but spawn_pooled() is supposed to switch into an idle worker
+            if current in idle:
+                idle.remove(current)
+            raise
+
+
 def sleep(seconds=0):
     """Put the current greenlet to sleep for at least *seconds*.
 
@@ -71,9 +132,22 @@ def sleep(seconds=0):
     are desired. Calling sleep with *seconds* of 0 is the canonical way of
     expressing a cooperative yield.
     """
-    unique_mark = object()
     if not seconds >= 0:
         raise IOError(22, 'Invalid argument')
+    if seconds == 0:
+        # fast path: wait in the hub's ready queue instead of creating a timer
+        hub = get_hub()
+        current = getcurrent()
+        ready = hub._ready
+        ready.append(current)
+        try:
+            switch_result = hub.switch()
+            assert switch_result is ready, 'Invalid switch into sleep(): %r' % (switch_result, )
+        except:
+            ready.remove(current)
+            raise
+        return
+    unique_mark = object()
     timer = core.timer(seconds, getcurrent().switch, unique_mark)
     try:
         switch_result = get_hub().switch()
@@ -91,7 +165,7 @@ def kill(greenlet, exception=GreenletExit):
     so you have to use this function.
     """
     if not greenlet.dead:
-        core.active_event(greenlet.throw, exception)
+        get_hub().run_callback(greenlet.throw, exception)
 
 
 def _wrap_signal_handler(handler, args, kwargs):
@@ -122,68 +196,64 @@ def shutdown():
 
 
 def get_hub():
+    """Return the hub of the calling thread, creating it if needed.
+
+    Each thread has its own hub that runs the thread's own event loop (see :func:`gevent.core.get_loop`).
+    """
     global _threadlocal
     try:
         return _threadlocal.hub
     except AttributeError:
-        try:
-            hubtype = _threadlocal.Hub
-        except AttributeError:
-            # do not pretend to support multiple threads because it's not implemented properly by core.pyx
-            # this may change in the future, although currently I don't have a strong need for this
-            raise NotImplementedError('gevent is only usable from a single thread')
+        hubtype = getattr(_threadlocal, 'Hub', None)
         if hubtype is None:
             hubtype = Hub
         hub = _threadlocal.hub = hubtype()
         return hub
 
-def _socketpair():
-    socket = __import__("socket")
-    try:
-        reader, writer = socket.socketpair()
-    except AttributeError:
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        server.bind(('127.0.0.1', 0))
-        server.listen(1)
-        client.connect(server.getsockname())
-        reader, clientaddr = server.accept()
-        writer = client
-
-    writer.setblocking(0)
-    reader.setblocking(0)
-    return reader, writer
-
-class _Waker(object):
-    def __init__(self, cb):
-        self.cb = cb
-        self.reader, self.writer = _socketpair()
-        self.event = core.event(core.EV_READ | core.EV_PERSIST, self.reader.fileno(), self.eventcb)
-        self.event.add()
-
-    def eventcb(self, event, evtype):
-        import socket
-        try:
-            self.reader.recv(4096)
-        except socket.error:
-            pass
-        self.cb()
-
-    def wakeup(self):
-        self.writer.send(".")
 
 class Hub(greenlet):
     """A greenlet that runs the event loop.
 
-    It is created automatically by :func:`get_hub`.
+    It is created automatically by :func:`get_hub`, one per thread, and runs the event loop of
+    its thread (:attr:`loop`).
     """
 
+    #: The maximum number of callbacks scheduled with :meth:`run_callback` by other callbacks that are
+    #: executed in the same loop iteration before the hub lets libevent poll for I/O (0 means no limit).
+    callback_budget = 1000
+
+    #: The tick length of :attr:`timer_wheel` in seconds; timeouts that do not ask for precision
+    #: may expire up to that much later than requested.
+    timer_resolution = 0.005
+
+    #: The maximum number of idle worker greenlets kept for reuse by :func:`spawn_pooled`.
+    worker_pool_size = 256
+
+    #: Return the monotonic time cached for the current loop iteration (see :func:`gevent.core.now`).
+    now = staticmethod(core.now)
+
+    #: Return the wall-clock time cached for the current loop iteration (see :func:`gevent.core.walltime`).
+    walltime = staticmethod(core.walltime)
+
+    #: Start recording the statistics of the loop iterations (see :func:`gevent.core.enable_stats`).
+    enable_stats = staticmethod(core.enable_stats)
+
+    #: Stop recording the statistics of the loop iterations (see :func:`gevent.core.disable_stats`).
+    disable_stats = staticmethod(core.disable_stats)
+
+    #: Return the statistics of the recent loop iterations (see :func:`gevent.core.get_stats`).
+    get_stats = staticmethod(core.get_stats)
+
     def __init__(self):
         greenlet.__init__(self)
         self.keyboard_interrupt_signal = None
-        self.waker = None
-        self.callqueue = []
+        self._watchdog = None
+        self.loop = core.get_loop()
+        self._async = core.async_queue()
+        self._callbacks = core.callback_queue(self.callback_budget)
+        self._ready = core.ready_queue()
+        self._idle_workers = []
+        self.timer_wheel = core.timer_wheel(self.timer_resolution)
 
     def switch(self):
         cur = getcurrent()
@@ -204,28 +274,26 @@ class Hub(greenlet):
     def run(self):
         global _threadlocal
         assert self is getcurrent(), 'Do not call run() directly'
-        try:
-            self.keyboard_interrupt_signal = signal(2, core.active_event, MAIN.throw, KeyboardInterrupt)
-        except IOError:
-            pass  # no signal() on windows
-
-        self.waker = _Waker(self.run_callqueue)
-        if self.callqueue:
-            self.waker.wakeup()
+        if self.loop.default:
+            # only the default loop handles signals
+            try:
+                self.keyboard_interrupt_signal = signal(2, core.active_event, MAIN.throw, KeyboardInterrupt)
+            except IOError:
+                pass  # no signal() on windows
 
         try:
             loop_count = 0
             while True:
                 try:
-                    result = core.dispatch()
+                    result = self.loop.dispatch()
                 except IOError, ex:
                     loop_count += 1
                     if loop_count > 15:
-                        MAIN.throw(*sys.exc_info())
+                        self.parent.throw(*sys.exc_info())
                     sys.stderr.write('Restarting gevent.core.dispatch() after an error [%s]: %s\n' % (loop_count, ex))
                     continue
                 raise DispatchExit(result)
-                # this function must never return, as it will cause switch() in MAIN to return an unexpected value
+                # this function must never return, as it will cause switch() in the parent to return an unexpected value
         finally:
             if self.keyboard_interrupt_signal is not None:
                 self.keyboard_interrupt_signal.cancel()
@@ -234,11 +302,12 @@ class Hub(greenlet):
                 _threadlocal.__dict__.pop('hub')
 
     def shutdown(self):
-        assert getcurrent() is MAIN, "Shutting down is only possible from MAIN greenlet"
+        assert getcurrent() is self.parent, "Shutting down is only possible from the main greenlet of the hub's thread"
         if self.keyboard_interrupt_signal is not None:
             self.keyboard_interrupt_signal.cancel()
             self.keyboard_interrupt_signal = None
-        core.dns_shutdown()
+        if self.loop.default:
+            core.dns_shutdown()
         if not self or self.dead:
             if _threadlocal.__dict__.get('hub') is self:
                 _threadlocal.__dict__.pop('hub')
@@ -251,26 +320,125 @@ class Hub(greenlet):
                 return
             raise
 
+    def run_callback(self, function, *args):
+        """Schedule *function* to be called with *args* in the Hub in this loop iteration.
+
+        The callbacks are kept in a :class:`core.callback_queue <gevent.core.callback_queue>` owned
+        by the hub and are executed in order, in one pass, by a single libevent event.
+        Return a :class:`core.queued_call <gevent.core.queued_call>` that can be cancelled.
+        """
+        return self._callbacks.append(function, args)
+
     def call_in_hub(self, f, *args, **kwargs):
-        self.callqueue.append((f, args, kwargs))
-        if self.waker:
-            self.waker.wakeup()
-
-    def run_callqueue(self):
-        count = 0
-        total = len(self.callqueue)
-        for (f, args, kwargs) in self.callqueue:
-            try:
-                f(*args, **kwargs)
-            except:
-                pass  # XXX log error
+        """Schedule ``f(*args, **kwargs)`` to be called in the Hub. Unlike the rest of the Hub's methods, this one
+        may be called from any thread.
+
+        The calls are kept in a :class:`core.async_queue <gevent.core.async_queue>` owned by the hub.
+        """
+        self._async.append(f, args, kwargs)
+
+    def destroy(self):
+        """Close the descriptor used by :meth:`call_in_hub` and, unless the hub runs the default loop,
+        destroy the loop (see :meth:`gevent.core.Loop.destroy`).
+
+        The next :func:`get_hub` call in this thread creates a new hub. The loop of a thread other than the
+        main one is destroyed automatically when the thread exits, so this is only needed to release
+        the hub earlier. Must be called from the thread of the hub; the hub must not be switched to afterwards.
+        """
+        global _threadlocal
+        if _threadlocal.__dict__.get('hub') is self:
+            _threadlocal.__dict__.pop('hub')
+        self.stop_watchdog()
+        self._async.close()
+        if self.loop.default:
+            self._callbacks.cancel()
+            self._ready.cancel()
+            self.timer_wheel.cancel()
+        else:
+            self.loop.destroy()
+
+    def start_watchdog(self, threshold=0.1, report=None):
+        """Start a thread that reports the greenlets that block the event loop for longer than *threshold* seconds.
+
+        *report* is called in the watchdog thread with ``(greenlet, seconds, stack)`` arguments, where *stack*
+        is the formatted stack trace of the blocking code, while the loop is still blocked. By default the
+        report is written to stderr. The greenlet is only known if the greenlet module supports ``settrace()``,
+        otherwise it's None. Must be called from the thread of the hub; only the hub of the default loop
+        can be watched.
+        """
+        self.stop_watchdog()
+        if report is None:
+            report = _report_blocking
+        self._watchdog = _Watchdog(threshold, report)
+
+    def stop_watchdog(self):
+        """Stop the thread started by :meth:`start_watchdog`."""
+        if self._watchdog is not None:
+            self._watchdog.stop()
+            self._watchdog = None
+
+
+def _report_blocking(greenlet, seconds, stack):
+    sys.stderr.write('The event loop has been blocked for %.3f seconds by %r:\n%s\n' % (seconds, greenlet, stack))
 
-            count += 1
-            if count == total:
+
+class _Watchdog(object):
+
+    def __init__(self, threshold, report):
+        self.threshold = threshold
+        self.report = report
+        self.greenlet = None
+        self.running = True
+        self.thread_id = _get_ident()
+        settrace = getattr(greenlet, 'settrace', None)
+        if settrace is None:
+            settrace = getattr(__import__(greenlet.__module__), 'settrace', None)
+        self._settrace = settrace
+        if settrace is not None:
+            self._previous_trace = settrace(self._trace)
+        core.track_callbacks(True)
+        _start_new_thread(self._run, ())
+
+    def _trace(self, event, args):
+        if event in ('switch', 'throw'):
+            self.greenlet = args[1]
+        if self._previous_trace is not None:
+            self._previous_trace(event, args)
+
+    def stop(self):
+        self.running = False
+        core.track_callbacks(False)
+        if self._settrace is not None:
+            self._settrace(self._previous_trace)
+
+    def _run(self):
+        # keep the references, the module globals are cleared if the interpreter exits while we sleep
+        sleep, get_current_callback, monotonic = _thread_sleep, core.get_current_callback, core.monotonic
+        current_frames, format_stack, print_exc = sys._current_frames, traceback.format_stack, traceback.print_exc
+        reported = None
+        while self.running:
+            sleep(self.threshold / 2.0)
+            if not self.running:
                 break
-        del self.callqueue[:count]
-        if self.callqueue:
-            self.waker.wakeup()
+            current = get_current_callback()
+            if current is None:
+                continue
+            serial, started = current
+            if serial == reported:
+                continue
+            seconds = monotonic() - started
+            if seconds < self.threshold:
+                continue
+            reported = serial
+            frame = current_frames().get(self.thread_id)
+            if frame is None:
+                stack = ''
+            else:
+                stack = ''.join(format_stack(frame))
+            try:
+                self.report(self.greenlet, seconds, stack)
+            except:
+                print_exc()
 
 
 class DispatchExit(Exception):
@@ -390,6 +558,97 @@ class Waiter(object):
     # and unwraps it in wait() thus checking that switch() was indeed called
 
 
+class _Links(object):
+    """An ordered collection of callbacks, used by the synchronization primitives to keep their waiters.
+
+    A doubly-linked list of ``[prev, next, callback, duplicate, serial]`` nodes plus a dict that maps a
+    callback to its oldest node, so that :meth:`append`, :meth:`remove`, :meth:`popleft` and ``in``
+    take constant time regardless of the number of waiters. A callback linked several times is
+    kept once per link; :meth:`remove` removes the oldest one, like :meth:`list.remove` would.
+
+    Iteration goes from the oldest callback to the newest and tolerates the collection being
+    changed by the callbacks it calls: the callbacks removed meanwhile are skipped and
+    the callbacks appended after the iteration has started are not visited.
+    """
+
+    __slots__ = ['_root', '_nodes', '_size', '_serial']
+
+    def __init__(self):
+        root = []
+        root[:] = [root, root, _NONE, None, 0]
+        self._root = root
+        self._nodes = {}
+        self._size = 0
+        self._serial = 0
+
+    def __repr__(self):
+        return '<%s %r>' % (type(self).__name__, list(self))
+
+    def __len__(self):
+        return self._size
+
+    def __nonzero__(self):
+        return bool(self._nodes)
+
+    def __contains__(self, callback):
+        return callback in self._nodes
+
+    def __iter__(self):
+        root = self._root
+        serial = self._serial
+        node = root[1]
+        while node is not root and node[4] <= serial:
+            callback = node[2]
+            if callback is not _NONE:
+                yield callback
+            node = node[1]
+
+    def append(self, callback):
+        root = self._root
+        last = root[0]
+        self._serial += 1
+        node = [last, root, callback, None, self._serial]
+        last[1] = root[0] = node
+        self._size += 1
+        first = self._nodes.setdefault(callback, node)
+        if first is not node:
+            while first[3] is not None:
+                first = first[3]
+            first[3] = node
+
+    def remove(self, callback):
+        """Remove the oldest link of *callback*. Return False if it was not linked."""
+        node = self._nodes.pop(callback, None)
+        if node is None:
+            return False
+        if node[3] is not None:
+            self._nodes[callback] = node[3]
+        self._unlink(node)
+        return True
+
+    def popleft(self):
+        """Remove and return the oldest callback. Raise :class:`IndexError` if there are none."""
+        node = self._root[1]
+        if node is self._root:
+            raise IndexError('pop from empty %s' % type(self).__name__)
+        callback = node[2]
+        if node[3] is None:
+            del self._nodes[callback]
+        else:
+            self._nodes[callback] = node[3]
+        self._unlink(node)
+        return callback
+
+    def _unlink(self, node):
+        prev, next = node[0], node[1]
+        prev[1] = next
+        next[0] = prev
+        # the node keeps pointing to its successor so that the iterators standing on it can proceed
+        node[2] = _NONE
+        node[3] = None
+        self._size -= 1
+
+
 class _NONE(object):
     "A special thingy you must never pass to any of gevent API"
     __slots__ = []
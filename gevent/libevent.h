@@ -50,5 +50,441 @@
 
 #define TAILQ_GET_NEXT(X) TAILQ_NEXT((X), next)
 
+/* edge-triggered events are only supported by libevent 2 */
+#ifndef EV_ET
+#define EV_ET 0
+#endif
+
 extern void *current_base;
 
+#ifdef _MSC_VER
+#define GEVENT_THREAD_LOCAL __declspec(thread)
+#else
+#define GEVENT_THREAD_LOCAL __thread
+#endif
+
+/* the event loop of the calling thread and the clock readings cached for its current iteration */
+static GEVENT_THREAD_LOCAL void *gevent_thread_base = NULL;
+static GEVENT_THREAD_LOCAL void *gevent_thread_loop = NULL;
+static GEVENT_THREAD_LOCAL double gevent_loop_time = 0.0;
+static GEVENT_THREAD_LOCAL double gevent_loop_walltime = 0.0;
+static GEVENT_THREAD_LOCAL int gevent_loop_time_valid = 0;
+
+
+/* gevent_thread_exit_callback is called with the loop stored by gevent_thread_exit_set() when the thread exits */
+static void (*gevent_thread_exit_callback)(void *loop) = NULL;
+
+#ifdef WIN32
+static DWORD gevent_thread_exit_key = FLS_OUT_OF_INDEXES;
+
+static void WINAPI gevent_thread_exit(void *loop)
+{
+    if (loop && gevent_thread_exit_callback && Py_IsInitialized())
+        gevent_thread_exit_callback(loop);
+}
+
+static int gevent_thread_exit_init(void)
+{
+    gevent_thread_exit_key = FlsAlloc(gevent_thread_exit);
+    return gevent_thread_exit_key == FLS_OUT_OF_INDEXES ? -1 : 0;
+}
+
+static void gevent_thread_exit_set(void *loop)
+{
+    if (gevent_thread_exit_key != FLS_OUT_OF_INDEXES)
+        FlsSetValue(gevent_thread_exit_key, loop);
+}
+#else
+#include <pthread.h>
+static pthread_key_t gevent_thread_exit_key;
+static int gevent_thread_exit_key_created = 0;
+
+static void gevent_thread_exit(void *loop)
+{
+    if (loop && gevent_thread_exit_callback && Py_IsInitialized())
+        gevent_thread_exit_callback(loop);
+}
+
+static int gevent_thread_exit_init(void)
+{
+    if (pthread_key_create(&gevent_thread_exit_key, gevent_thread_exit) != 0)
+        return -1;
+    gevent_thread_exit_key_created = 1;
+    return 0;
+}
+
+static void gevent_thread_exit_set(void *loop)
+{
+    if (gevent_thread_exit_key_created)
+        pthread_setspecific(gevent_thread_exit_key, loop);
+}
+#endif
+
+
+/* monotonic and wall clocks in seconds, used by the timer wheel and the cached loop time */
+#ifdef WIN32
+static double gevent_monotonic(void)
+{
+    static LARGE_INTEGER frequency;
+    LARGE_INTEGER counter;
+    if (!frequency.QuadPart)
+        QueryPerformanceFrequency(&frequency);
+    QueryPerformanceCounter(&counter);
+    return (double)counter.QuadPart / (double)frequency.QuadPart;
+}
+static double gevent_walltime(void)
+{
+    FILETIME ft;
+    ULARGE_INTEGER t;
+    GetSystemTimeAsFileTime(&ft);
+    t.LowPart = ft.dwLowDateTime;
+    t.HighPart = ft.dwHighDateTime;
+    /* 100-nanosecond intervals since January 1, 1601 */
+    return (double)(t.QuadPart - 116444736000000000ULL) * 1e-7;
+}
+#else
+#include <time.h>
+#include <sys/time.h>
+static double gevent_monotonic(void)
+{
+    struct timeval tv;
+#ifdef CLOCK_MONOTONIC
+    struct timespec ts;
+    if (clock_gettime(CLOCK_MONOTONIC, &ts) == 0)
+        return (double)ts.tv_sec + (double)ts.tv_nsec * 1e-9;
+#endif
+    gettimeofday(&tv, NULL);
+    return (double)tv.tv_sec + (double)tv.tv_usec * 1e-6;
+}
+static double gevent_walltime(void)
+{
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return (double)tv.tv_sec + (double)tv.tv_usec * 1e-6;
+}
+#endif
+
+
+/* a wakeup channel for the other threads: eventfd on Linux, a pipe (a socket pair on Windows) elsewhere;
+   fds[0] is watched by the event loop, fds[1] is written to by the other threads */
+#if defined(__linux__)
+#include <sys/eventfd.h>
+#endif
+#ifndef WIN32
+#include <unistd.h>
+#include <fcntl.h>
+#include <errno.h>
+#endif
+
+static int gevent_wakeup_open(int *fds)
+{
+#ifdef WIN32
+    evutil_socket_t pair[2];
+    if (evutil_socketpair(AF_INET, SOCK_STREAM, 0, pair) < 0)
+        return -1;
+    evutil_make_socket_nonblocking(pair[0]);
+    evutil_make_socket_nonblocking(pair[1]);
+    fds[0] = (int)pair[0];
+    fds[1] = (int)pair[1];
+    return 0;
+#else
+    int index;
+#if defined(__linux__) && defined(EFD_NONBLOCK) && defined(EFD_CLOEXEC)
+    int fd = eventfd(0, EFD_NONBLOCK | EFD_CLOEXEC);
+    if (fd >= 0) {
+        fds[0] = fds[1] = fd;
+        return 0;
+    }
+#endif
+    if (pipe(fds) < 0)
+        return -1;
+    for (index = 0; index < 2; index++) {
+        fcntl(fds[index], F_SETFL, fcntl(fds[index], F_GETFL) | O_NONBLOCK);
+        fcntl(fds[index], F_SETFD, fcntl(fds[index], F_GETFD) | FD_CLOEXEC);
+    }
+    return 0;
+#endif
+}
+
+static void gevent_wakeup_signal(int *fds)
+{
+#ifdef WIN32
+    send(fds[1], "x", 1, 0);
+#else
+    if (fds[0] == fds[1]) {
+        unsigned long long value = 1;
+        if (write(fds[1], &value, sizeof(value)) < 0) {}
+    }
+    else {
+        if (write(fds[1], "x", 1) < 0) {}
+    }
+#endif
+}
+
+static void gevent_wakeup_drain(int *fds)
+{
+    char buf[64];
+#ifdef WIN32
+    while (recv(fds[0], buf, sizeof(buf), 0) > 0) {}
+#else
+    /* a single read resets eventfd's counter */
+    if (fds[0] == fds[1]) {
+        if (read(fds[0], buf, 8) < 0) {}
+    }
+    else {
+        while (read(fds[0], buf, sizeof(buf)) > 0) {}
+    }
+#endif
+}
+
+static void gevent_wakeup_close(int *fds)
+{
+#ifdef WIN32
+    EVUTIL_CLOSESOCKET(fds[0]);
+    EVUTIL_CLOSESOCKET(fds[1]);
+#else
+    close(fds[0]);
+    if (fds[1] != fds[0])
+        close(fds[1]);
+#endif
+}
+
+
+/* nonblocking socket I/O for gevent.core.recv/recv_into/send: return what the call returns,
+   or -1 with the error code in *err; interrupted calls are restarted */
+#ifdef WIN32
+#define GEVENT_SOCKET_ERROR() WSAGetLastError()
+#define GEVENT_WOULDBLOCK(err) ((err) == WSAEWOULDBLOCK)
+#define GEVENT_INTERRUPTED(err) ((err) == WSAEINTR)
+#define GEVENT_SOCKET(fd) ((SOCKET)(fd))
+#define GEVENT_IO_SIZE(size) ((int)(size))
+#else
+#include <sys/socket.h>
+#define GEVENT_SOCKET_ERROR() errno
+#define GEVENT_WOULDBLOCK(err) ((err) == EWOULDBLOCK || (err) == EAGAIN)
+#define GEVENT_INTERRUPTED(err) ((err) == EINTR)
+#define GEVENT_SOCKET(fd) ((int)(fd))
+#define GEVENT_IO_SIZE(size) ((size_t)(size))
+#endif
+
+static long gevent_recv(long fd, char *buf, long size, int flags, int *err)
+{
+    long result;
+    do {
+        result = (long)recv(GEVENT_SOCKET(fd), buf, GEVENT_IO_SIZE(size), flags);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+
+static long gevent_send(long fd, char *buf, long size, int flags, int *err)
+{
+    long result;
+    do {
+        result = (long)send(GEVENT_SOCKET(fd), buf, GEVENT_IO_SIZE(size), flags);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+
+/* gathering send for gevent.core.sendv: a vector of at most GEVENT_IOV_MAX buffers goes out with a single call */
+#ifdef WIN32
+typedef WSABUF gevent_iovec;
+#define GEVENT_IOV_MAX 1024
+#define GEVENT_IOV_SET(iov, base, size) ((iov).buf = (char *)(base), (iov).len = (u_long)(size))
+
+static long gevent_sendv(long fd, gevent_iovec *iov, int count, int flags, int *err)
+{
+    DWORD sent = 0;
+    if (WSASend(GEVENT_SOCKET(fd), iov, (DWORD)count, &sent, (DWORD)flags, NULL, NULL) != 0) {
+        *err = WSAGetLastError();
+        return -1;
+    }
+    return (long)sent;
+}
+#else
+#include <sys/uio.h>
+#include <limits.h>
+typedef struct iovec gevent_iovec;
+#ifdef IOV_MAX
+#define GEVENT_IOV_MAX IOV_MAX
+#else
+#define GEVENT_IOV_MAX 16
+#endif
+#define GEVENT_IOV_SET(iov, base, size) ((iov).iov_base = (void *)(base), (iov).iov_len = (size_t)(size))
+
+static long gevent_sendv(long fd, gevent_iovec *iov, int count, int flags, int *err)
+{
+    struct msghdr msg;
+    long result;
+    memset(&msg, 0, sizeof(msg));
+    msg.msg_iov = iov;
+    msg.msg_iovlen = count;
+    do {
+        result = (long)sendmsg(GEVENT_SOCKET(fd), &msg, flags);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+#endif
+
+/* sendfile for gevent.core.sendfile: copy up to count bytes of the file in_fd, starting at offset, to the
+   socket out_fd in the kernel; where there is no such call, fail with ENOSYS */
+#if defined(__linux__)
+#include <sys/sendfile.h>
+
+static long gevent_sendfile(long out_fd, long in_fd, PY_LONG_LONG offset, long count, int *err)
+{
+    off_t file_offset = (off_t)offset;
+    long result;
+    do {
+        result = (long)sendfile((int)out_fd, (int)in_fd, &file_offset, (size_t)count);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+#elif defined(__FreeBSD__) || defined(__APPLE__)
+#include <sys/types.h>
+#include <sys/uio.h>
+
+static long gevent_sendfile(long out_fd, long in_fd, PY_LONG_LONG offset, long count, int *err)
+{
+    off_t sent;
+    int result;
+    do {
+#if defined(__APPLE__)
+        sent = (off_t)count;
+        result = sendfile((int)in_fd, (int)out_fd, (off_t)offset, &sent, NULL, 0);
+#else
+        sent = 0;
+        result = sendfile((int)in_fd, (int)out_fd, (off_t)offset, (size_t)count, NULL, &sent, 0);
+#endif
+        /* a call that would block or is interrupted may still have sent something */
+        if (result < 0 && sent > 0)
+            return (long)sent;
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    if (result < 0)
+        return -1;
+    return (long)sent;
+}
+#else
+static long gevent_sendfile(long out_fd, long in_fd, PY_LONG_LONG offset, long count, int *err)
+{
+    *err = ENOSYS;
+    return -1;
+}
+#endif
+
+/* batched datagram I/O for gevent.core.mmsgbuffer: recvmmsg()/sendmmsg() move many datagrams with one call;
+   where they are not available the calls fail with ENOSYS. The addresses are AF_INET or AF_INET6 ones. */
+#if defined(__linux__) && defined(MSG_WAITFORONE)
+#include <netinet/in.h>
+#include <arpa/inet.h>
+#define GEVENT_MMSG_MAX 1024
+typedef struct msghdr gevent_msghdr;
+typedef struct mmsghdr gevent_mmsghdr;
+typedef struct sockaddr_storage gevent_sockaddr;
+
+static int gevent_recvmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+{
+    int result;
+    do {
+        result = recvmmsg((int)fd, msgs, (unsigned int)count, flags, NULL);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+
+static int gevent_sendmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+{
+    int result;
+    do {
+        result = sendmmsg((int)fd, msgs, (unsigned int)count, flags);
+    } while (result < 0 && GEVENT_INTERRUPTED(*err = GEVENT_SOCKET_ERROR()));
+    return result;
+}
+
+/* store the numeric host of *address* in *host* and return its port, or -1 if the family is not supported */
+static long gevent_sockaddr_get(gevent_sockaddr *address, char *host, int hostlen,
+                                unsigned long *flowinfo, unsigned long *scope_id)
+{
+    if (address->ss_family == AF_INET) {
+        struct sockaddr_in *sin = (struct sockaddr_in *)address;
+        if (!inet_ntop(AF_INET, &sin->sin_addr, host, hostlen))
+            return -1;
+        return ntohs(sin->sin_port);
+    }
+    if (address->ss_family == AF_INET6) {
+        struct sockaddr_in6 *sin6 = (struct sockaddr_in6 *)address;
+        if (!inet_ntop(AF_INET6, &sin6->sin6_addr, host, hostlen))
+            return -1;
+        *flowinfo = ntohl(sin6->sin6_flowinfo);
+        *scope_id = sin6->sin6_scope_id;
+        return ntohs(sin6->sin6_port);
+    }
+    return -1;
+}
+
+/* fill *address* from a numeric host; return its length, or -1 if the host is not a numeric one of the family */
+static int gevent_sockaddr_set(gevent_sockaddr *address, int family, char *host, int port,
+                               unsigned long flowinfo, unsigned long scope_id)
+{
+    memset(address, 0, sizeof(*address));
+    if (family == AF_INET) {
+        struct sockaddr_in *sin = (struct sockaddr_in *)address;
+        if (inet_pton(AF_INET, host, &sin->sin_addr) != 1)
+            return -1;
+        sin->sin_family = AF_INET;
+        sin->sin_port = htons((unsigned short)port);
+        return sizeof(*sin);
+    }
+    if (family == AF_INET6) {
+        struct sockaddr_in6 *sin6 = (struct sockaddr_in6 *)address;
+        if (inet_pton(AF_INET6, host, &sin6->sin6_addr) != 1)
+            return -1;
+        sin6->sin6_family = AF_INET6;
+        sin6->sin6_port = htons((unsigned short)port);
+        sin6->sin6_flowinfo = htonl(flowinfo);
+        sin6->sin6_scope_id = scope_id;
+        return sizeof(*sin6);
+    }
+    return -1;
+}
+#else
+#define GEVENT_MMSG_MAX 1024
+typedef struct {
+    void *msg_name;
+    int msg_namelen;
+    gevent_iovec *msg_iov;
+    int msg_iovlen;
+    void *msg_control;
+    int msg_controllen;
+    int msg_flags;
+} gevent_msghdr;
+typedef struct {
+    gevent_msghdr msg_hdr;
+    unsigned int msg_len;
+} gevent_mmsghdr;
+typedef struct {
+    char data[128];
+} gevent_sockaddr;
+
+static int gevent_recvmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+{
+    *err = ENOSYS;
+    return -1;
+}
+
+static int gevent_sendmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+{
+    *err = ENOSYS;
+    return -1;
+}
+
+static long gevent_sockaddr_get(gevent_sockaddr *address, char *host, int hostlen,
+                                unsigned long *flowinfo, unsigned long *scope_id)
+{
+    return -1;
+}
+
+static int gevent_sockaddr_set(gevent_sockaddr *address, int family, char *host, int port,
+                               unsigned long flowinfo, unsigned long scope_id)
+{
+    return -1;
+}
+#endif
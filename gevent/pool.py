@@ -9,11 +9,12 @@ concurrency: its :meth:`spawn <Pool.spawn>` method blocks if the number of
 greenlets in the pool has already reached the limit, until there is a free slot.
 """
 
+from gevent import core
 from gevent.hub import GreenletExit, getcurrent
-from gevent.greenlet import joinall, Greenlet
+from gevent.greenlet import joinall, killall, Greenlet
 from gevent.timeout import Timeout
 from gevent.event import Event
-from gevent.coros import Semaphore, DummySemaphore
+from gevent.coros import Semaphore, DummySemaphore, PrioritySemaphore
 
 __all__ = ['Group', 'Pool']
 
@@ -25,6 +26,9 @@ class Group(object):
     """
     greenlet_class = Greenlet
 
+    #: The default *maxsize* of :meth:`imap` and :meth:`imap_unordered` if the size is not limited.
+    imap_maxsize = 100
+
     def __init__(self, *args):
         assert len(args) <= 1, args
         self.greenlets = set(*args)
@@ -162,39 +166,71 @@ class Group(object):
                 greenlet.link(pass_value(callback))
             return greenlet
 
-    def map(self, func, iterable):
-        greenlets = [self.spawn(func, item) for item in iterable]
-        return [greenlet.get() for greenlet in greenlets]
+    def map(self, func, iterable, chunksize=None):
+        """An equivalent of the map() builtin function. It blocks till the result is ready.
 
-    def map_cb(self, func, iterable, callback=None):
-        result = self.map(func, iterable)
+        By default, each item is processed by its own greenlet. If *chunksize* is given, the items are
+        split into chunks of that size instead, which are processed by as many worker greenlets as
+        there are chunks, but no more than the size of the pool. That is much cheaper for a lot of
+        items that do not block. If *func* raises an error, the workers are killed and the error
+        is re-raised.
+        """
+        if chunksize is None:
+            greenlets = [self.spawn(func, item) for item in iterable]
+            return [greenlet.get() for greenlet in greenlets]
+        if chunksize < 1:
+            raise ValueError('Invalid chunksize (positive integer or None required): %r' % (chunksize, ))
+        items = list(iterable)
+        result = [None] * len(items)
+        chunks = iter(xrange(0, len(items), chunksize))
+        count = (len(items) + chunksize - 1) // chunksize
+        size = getattr(self, 'size', None)
+        if size is not None:
+            count = min(count, size)
+        workers = [self.spawn(_map_chunks, func, items, result, chunks, chunksize) for _ in xrange(count)]
+        try:
+            for worker in workers:
+                worker.get()
+        except:
+            killall(workers, block=False)
+            raise
+        return result
+
+    def map_cb(self, func, iterable, callback=None, chunksize=None):
+        result = self.map(func, iterable, chunksize)
         if callback is not None:
             callback(result)
         return result
 
-    def map_async(self, func, iterable, callback=None):
+    def map_async(self, func, iterable, callback=None, chunksize=None):
         """
         A variant of the map() method which returns a Greenlet object.
 
         If callback is specified then it should be a callable which accepts a
         single argument.
         """
-        return Greenlet.spawn(self.map_cb, func, iterable, callback)
+        return Greenlet.spawn(self.map_cb, func, iterable, callback, chunksize)
 
-    def imap(self, func, iterable):
+    def imap(self, func, iterable, maxsize=None):
         """An equivalent of itertools.imap()
 
-        **TODO**: Fix this.
+        The *iterable* is consumed lazily, one item per :meth:`spawn`. At most *maxsize* items
+        are being processed or have their results waiting to be consumed at any time (by default,
+        the size of the pool, or :attr:`imap_maxsize` if the size is not limited). That also bounds
+        the results that are kept because they became ready ahead of their turn.
         """
-        return iter(self.map(func, iterable))
+        return IMap.spawn(self.spawn, func, iterable, self._get_imap_maxsize(maxsize))
 
-    def imap_unordered(self, func, iterable):
-        """The same as imap() except that the ordering of the results from the
-        returned iterator should be considered arbitrary.
+    def imap_unordered(self, func, iterable, maxsize=None):
+        """The same as imap() except that the results are yielded in the order they become ready."""
+        return IMapUnordered.spawn(self.spawn, func, iterable, self._get_imap_maxsize(maxsize))
 
-        **TODO**: Fix this.
-        """
-        return iter(self.map(func, iterable))
+    def _get_imap_maxsize(self, maxsize):
+        if maxsize is None:
+            maxsize = getattr(self, 'size', None)
+            if maxsize is None:
+                maxsize = self.imap_maxsize
+        return maxsize
 
     def full(self):
         return False
@@ -221,7 +257,9 @@ class Pool(Group):
         if size is None:
             self._semaphore = DummySemaphore()
         else:
-            self._semaphore = Semaphore(size)
+            self._semaphore = PrioritySemaphore(size)
+        #: The number of functions passed to :meth:`submit` that were not started because of their deadline.
+        self.dropped = 0
 
     def wait_available(self):
         self._semaphore.wait()
@@ -253,6 +291,34 @@ class Pool(Group):
             raise
         return greenlet
 
+    def submit(self, func, args=None, kwds=None, priority=0, deadline=None):
+        """Spawn ``func(*args, **kwds)`` in the pool, waiting for a free slot with the given priority.
+
+        While the pool is full, the submissions with lower *priority* values get the free slots first,
+        and the submissions with the same priority get them in order; :meth:`spawn` waits with
+        priority 0. If *deadline* (a :func:`gevent.core.now` value) passes before the function can
+        be started, it is dropped: return None and increment :attr:`dropped`. Otherwise, return
+        the new greenlet.
+        """
+        if args is None:
+            args = ()
+        if kwds is None:
+            kwds = {}
+        if self.size is None:
+            acquired = deadline is None or deadline > core.now()
+        else:
+            acquired = self._semaphore.acquire(priority=priority, deadline=deadline)
+        if not acquired:
+            self.dropped += 1
+            return None
+        try:
+            greenlet = self.greenlet_class.spawn(func, *args, **kwds)
+            self.add(greenlet)
+        except:
+            self._semaphore.release()
+            raise
+        return greenlet
+
     def spawn_link(self, *args, **kwargs):
         self._semaphore.acquire()
         try:
@@ -288,6 +354,129 @@ class Pool(Group):
         self._semaphore.release()
 
 
+class IMapUnordered(Greenlet):
+    """The iterator returned by :meth:`Group.imap_unordered`.
+
+    The greenlet itself feeds the items of the iterable to *spawn*, so it blocks if the pool is full
+    or if *maxsize* results are in flight.
+    """
+
+    def __init__(self, spawn, func, iterable, maxsize=None):
+        from gevent.queue import Queue
+        Greenlet.__init__(self)
+        self._spawn = spawn
+        self._func = func
+        self._iterable = iterable
+        if maxsize is None:
+            self._in_flight = DummySemaphore()
+        else:
+            self._in_flight = Semaphore(maxsize)
+        # holds the finished greenlets and then this greenlet, once everything has been received
+        self.queue = Queue()
+        self.count = 0
+        self.received = 0
+        self.finished = False
+        self.stopped = False
+        self.rawlink(self._on_finish)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if self.stopped:
+            raise StopIteration
+        greenlet = self.queue.get()
+        if greenlet is self:
+            return self._stop()
+        return self._consume(greenlet)
+
+    def _consume(self, greenlet):
+        self._in_flight.release()
+        if greenlet.successful():
+            return greenlet.value
+        raise greenlet.exception
+
+    def _stop(self):
+        self.stopped = True
+        if self.successful():
+            raise StopIteration
+        raise self.exception
+
+    def _run(self):
+        func = self._func
+        acquire = self._in_flight.acquire
+        try:
+            iterator = iter(self._iterable)
+            while True:
+                # wait for a free slot before taking the next item
+                acquire()
+                try:
+                    item = iterator.next()
+                except StopIteration:
+                    self._in_flight.release()
+                    break
+                greenlet = self._spawn(func, item)
+                self._add(greenlet, self.count)
+                self.count += 1
+                greenlet.rawlink(self._on_result)
+        finally:
+            self._spawn = None
+            self._func = None
+            self._iterable = None
+
+    def _add(self, greenlet, index):
+        pass
+
+    def _on_result(self, greenlet):
+        self.received += 1
+        self.queue.put(greenlet)
+        if self.finished and self.received == self.count:
+            self.queue.put(self)
+
+    def _on_finish(self, _self):
+        self.finished = True
+        if self.received == self.count:
+            self.queue.put(self)
+
+
+class IMap(IMapUnordered):
+    """The iterator returned by :meth:`Group.imap`.
+
+    The results that become ready ahead of their turn are kept in a buffer, which is bounded
+    by *maxsize*.
+    """
+
+    def __init__(self, spawn, func, iterable, maxsize=None):
+        IMapUnordered.__init__(self, spawn, func, iterable, maxsize)
+        self.index = 0
+        self._indexes = {}
+        self._buffer = {}
+
+    def next(self):
+        while True:
+            greenlet = self._buffer.pop(self.index, None)
+            if greenlet is not None:
+                self.index += 1
+                return self._consume(greenlet)
+            if self.stopped:
+                raise StopIteration
+            greenlet = self.queue.get()
+            if greenlet is self:
+                # everything that was spawned has been received, so the buffer is empty
+                return self._stop()
+            self._buffer[self._indexes.pop(greenlet)] = greenlet
+
+    def _add(self, greenlet, index):
+        self._indexes[greenlet] = index
+
+
+def _map_chunks(func, items, result, chunks, chunksize):
+    # the workers of one map() share the iterator of the chunks' starting indexes
+    for start in chunks:
+        for index in xrange(start, min(start + chunksize, len(items))):
+            result[index] = func(items[index])
+
+
 def get_values(greenlets):
     joinall(greenlets)
     return [x.value for x in greenlets]
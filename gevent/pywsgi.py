@@ -2,6 +2,8 @@
 # Copyright (c) 2009-2010, gevent contributors
 
 import errno
+import os
+import stat
 import sys
 import time
 import traceback
@@ -10,12 +12,13 @@ from datetime import datetime
 from urllib import unquote
 
 from gevent import socket
+from gevent import core
 import gevent
 from gevent.server import StreamServer
 from gevent.hub import GreenletExit
 
 
-__all__ = ['WSGIHandler', 'WSGIServer']
+__all__ = ['WSGIHandler', 'WSGIServer', 'FileWrapper']
 
 
 MAX_REQUEST_LINE = 8192
@@ -34,9 +37,42 @@ _BAD_REQUEST_RESPONSE = "HTTP/1.0 400 Bad Request\r\nConnection: close\r\nConten
 _CONTINUE_RESPONSE = "HTTP/1.1 100 Continue\r\n\r\n"
 
 
+_date_time_cache = (None, None)
+
+
 def format_date_time(timestamp):
-    year, month, day, hh, mm, ss, wd, _y, _z = time.gmtime(timestamp)
-    return "%s, %02d %3s %4d %02d:%02d:%02d GMT" % (_WEEKDAYNAME[wd], day, _MONTHNAME[month], year, hh, mm, ss)
+    global _date_time_cache
+    second = int(timestamp)
+    cached_second, result = _date_time_cache
+    if cached_second == second:
+        return result
+    year, month, day, hh, mm, ss, wd, _y, _z = time.gmtime(second)
+    result = "%s, %02d %3s %4d %02d:%02d:%02d GMT" % (_WEEKDAYNAME[wd], day, _MONTHNAME[month], year, hh, mm, ss)
+    _date_time_cache = (second, result)
+    return result
+
+
+class FileWrapper(object):
+    """The ``wsgi.file_wrapper`` of :class:`WSGIServer`.
+
+    Iterates over *filelike* in blocks of *blksize* bytes, but when *filelike* is a regular file
+    :class:`WSGIHandler` sends it with :meth:`socket.sendfile` instead.
+    """
+
+    def __init__(self, filelike, blksize=8192):
+        self.filelike = filelike
+        self.blksize = blksize
+        if hasattr(filelike, 'close'):
+            self.close = filelike.close
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        data = self.filelike.read(self.blksize)
+        if data:
+            return data
+        raise StopIteration
 
 
 class Input(object):
@@ -310,7 +346,7 @@ class WSGIHandler(object):
                 self.response_headers_list.append('Content-Length')
 
             if 'Date' not in self.response_headers_list:
-                self.response_headers.append(('Date', format_date_time(time.time())))
+                self.response_headers.append(('Date', format_date_time(core.walltime())))
                 self.response_headers_list.append('Date')
 
             if self.request_version == 'HTTP/1.0' and 'Connection' not in self.response_headers_list:
@@ -335,13 +371,46 @@ class WSGIHandler(object):
         if data:
             if self.response_use_chunked:
                 ## Write the chunked encoding
-                towrite.append("%x\r\n%s\r\n" % (len(data), data))
+                towrite.append("%x\r\n" % len(data))
+                towrite.append(data)
+                towrite.append("\r\n")
             else:
                 towrite.append(data)
 
-        self.wfile.writelines(towrite)
+        # wfile is unbuffered, so writing past it to the socket keeps the order; sendall_iov
+        # sends the headers and the body without joining them into a new string first
+        self.socket.sendall_iov(towrite)
         self.response_length += sum(len(x) for x in towrite)
 
+    def sendfile(self, filelike):
+        """Send the rest of *filelike* as the response body with :meth:`socket.sendfile`.
+
+        Return False, without sending anything, if *filelike* is not a regular file.
+        """
+        if not self.status:
+            return False
+        try:
+            fileno = filelike.fileno()
+            position = filelike.tell()
+        except (AttributeError, ValueError, IOError, OSError):
+            sys.exc_clear()
+            return False
+        if not stat.S_ISREG(os.fstat(fileno).st_mode):
+            return False
+        if 'Content-Length' in self.response_headers_list:
+            length = int(self.response_headers[self.response_headers_list.index('Content-Length')][1])
+        else:
+            length = max(os.fstat(fileno).st_size - position, 0)
+            self.response_headers.append(('Content-Length', str(length)))
+            self.response_headers_list.append('Content-Length')
+        self.write('')
+        sent = self.socket.sendfile(filelike, position, length)
+        self.response_length += sent
+        if sent < length:
+            # the file is shorter than Content-Length says; the client cannot tell where the response ends
+            self.close_connection = 1
+        return True
+
     def start_response(self, status, headers, exc_info=None):
         if exc_info:
             try:
@@ -383,9 +452,10 @@ class WSGIHandler(object):
         try:
             try:
                 self.result = self.application(self.environ, self.start_response)
-                for data in self.result:
-                    if data:
-                        self.write(data)
+                if not (isinstance(self.result, FileWrapper) and self.sendfile(self.result.filelike)):
+                    for data in self.result:
+                        if data:
+                            self.write(data)
                 if self.status and not self.headers_sent:
                     self.write('')
                 if self.response_use_chunked:
@@ -477,7 +547,8 @@ class WSGIServer(StreamServer):
                 'wsgi.version': (1, 0),
                 'wsgi.multithread': False,
                 'wsgi.multiprocess': False,
-                'wsgi.run_once': False}
+                'wsgi.run_once': False,
+                'wsgi.file_wrapper': FileWrapper}
 
     def __init__(self, listener, application=None, backlog=None, spawn='default', log='default', handler_class=None,
                  environ=None, **ssl_args):
@@ -25,7 +25,7 @@ from gevent.hub import get_hub, Waiter, getcurrent, _NONE
 from gevent import core
 
 
-__all__ = ['Queue', 'PriorityQueue', 'LifoQueue', 'JoinableQueue']
+__all__ = ['Queue', 'PriorityQueue', 'LifoQueue', 'JoinableQueue', 'choose']
 
 
 class Queue(object):
@@ -43,8 +43,11 @@ class Queue(object):
             self.maxsize = None
         else:
             self.maxsize = maxsize
-        self.getters = set()
-        self.putters = set()
+        # the blocked calls are served in order; a waiter is removed by the one who wakes it up
+        self.getters = collections.deque()
+        self.putters = collections.deque()
+        # the putters whose items were taken by get() directly; they are resumed by _unlock()
+        self._delivered = collections.deque()
         self._event_unlock = None
         self._init(maxsize)
 
@@ -73,7 +76,7 @@ class Queue(object):
             result += ' getters[%s]' % len(self.getters)
         if self.putters:
             result += ' putters[%s]' % len(self.putters)
-        if self._event_unlock is not None:
+        if self._event_unlock is not None and self._event_unlock.pending:
             result += ' unlocking'
         return result
 
@@ -112,27 +115,36 @@ class Queue(object):
             # we're in the mainloop, so we cannot wait; we can switch() to other greenlets though
             # find a getter and deliver an item to it
             while self.getters:
-                getter = self.getters.pop()
-                if getter:
-                    self._put(item)
-                    item = self._get()
-                    getter.switch(item)
-                    return
+                getter = self.getters.popleft()
+                self._put(item)
+                item = self._get()
+                getter.switch(item)
+                return
             raise Full
         elif block:
             waiter = ItemWaiter(item)
-            self.putters.add(waiter)
+            self.putters.append(waiter)
             timeout = Timeout.start_new(timeout, Full)
             try:
-                if self.getters:
-                    self._schedule_unlock()
-                result = waiter.wait()
-                assert result is waiter, "Invalid switch into Queue.put: %r" % (result, )
-                if waiter.item is not _NONE:
-                    self._put(item)
+                try:
+                    if self.getters:
+                        self._schedule_unlock()
+                    result = waiter.get()
+                    assert result is waiter, "Invalid switch into Queue.put: %r" % (result, )
+                except Full:
+                    if waiter.item is not _NONE:
+                        _discard(self.putters, waiter)
+                        raise
+                    # a getter has taken the item before the timeout was delivered
+                except:
+                    if waiter.item is not _NONE:
+                        _discard(self.putters, waiter)
+                    raise
+                else:
+                    if waiter.item is not _NONE:
+                        self._put(item)
             finally:
                 timeout.cancel()
-                self.putters.discard(waiter)
         else:
             raise Full
 
@@ -144,6 +156,32 @@ class Queue(object):
         """
         self.put(item, False)
 
+    def put_many(self, items, block=True, timeout=None):
+        """Put all the items from the iterable *items* into the queue, in order.
+
+        The items that fit are put at once and the blocked getters are woken up together.
+        If the queue gets full, block until there's room for the rest, like :meth:`put` does.
+        *block* and *timeout* apply to the whole call; if it raises :class:`Full`, the items
+        that were put before that remain in the queue.
+        """
+        items = iter(items)
+        timeout = Timeout.start_new(timeout, Full)
+        try:
+            for item in items:
+                if self.maxsize is None or self.qsize() < self.maxsize:
+                    self._put(item)
+                else:
+                    if self.getters:
+                        self._schedule_unlock()
+                    self.put(item, block)
+                    if timeout.seconds is not None and not timeout.pending:
+                        # a getter took the item while the timeout was being delivered
+                        raise Full
+            if self.getters:
+                self._schedule_unlock()
+        finally:
+            timeout.cancel()
+
     def get(self, block=True, timeout=None):
         """Remove and return an item from the queue.
 
@@ -153,31 +191,46 @@ class Queue(object):
         if no item was available within that time. Otherwise (*block* is false), return
         an item if one is immediately available, else raise the :class:`Empty` exception
         (*timeout* is ignored in that case).
+
+        If the queue is empty but there are greenlets blocked in :meth:`put` and none blocked
+        in :meth:`get`, the item of the oldest putter is taken directly, without blocking.
         """
         if self.qsize():
             if self.putters:
                 self._schedule_unlock()
             return self._get()
+        elif self.putters and not self.getters and get_hub() is not getcurrent():
+            # nobody is waiting ahead of us, so take the item of the oldest putter;
+            # it is resumed by _unlock(), as only the hub may switch to it
+            putter = self.putters.popleft()
+            item = putter.item
+            putter.item = _NONE  # this makes greenlet calling put() not to call _put() again
+            self._put(item)
+            self._delivered.append(putter)
+            self._schedule_unlock()
+            return self._get()
         elif not block and get_hub() is getcurrent():
             # special case to make get_nowait() runnable in the mainloop greenlet
             # there are no items in the queue; try to fix the situation by unlocking putters
             while self.putters:
-                putter = self.putters.pop()
-                if putter:
-                    putter.switch(putter)
-                    if self.qsize():
-                        return self._get()
+                putter = self.putters.popleft()
+                putter.switch(putter)
+                if self.qsize():
+                    return self._get()
             raise Empty
         elif block:
             waiter = Waiter()
             timeout = Timeout.start_new(timeout, Empty)
             try:
-                self.getters.add(waiter)
+                self.getters.append(waiter)
                 if self.putters:
                     self._schedule_unlock()
-                return waiter.wait()
+                try:
+                    return waiter.get()
+                except:
+                    _discard(self.getters, waiter)
+                    raise
             finally:
-                self.getters.discard(waiter)
                 timeout.cancel()
         else:
             raise Empty
@@ -190,46 +243,82 @@ class Queue(object):
         """
         return self.get(False)
 
+    def get_many(self, max_items=None, block=True, timeout=None):
+        """Remove and return a list of up to *max_items* items (all if ``None``) from the queue.
+
+        Block like :meth:`get` until at least one item is available; then take the items that
+        are available at once, including those of the greenlets blocked in :meth:`put`.
+        """
+        if max_items is not None and max_items < 1:
+            raise ValueError('max_items must be positive: %r' % (max_items, ))
+        items = [self.get(block, timeout)]
+        while max_items is None or len(items) < max_items:
+            if self.qsize():
+                items.append(self._get())
+            elif self.putters:
+                try:
+                    items.append(self.get(False))
+                except Empty:
+                    break
+            else:
+                break
+        if self.putters:
+            self._schedule_unlock()
+        return items
+
+    def drain(self):
+        """Remove and return a list of all the items available without blocking.
+
+        Return an empty list if there are none.
+        """
+        if self.qsize() or self.putters:
+            return self.get_many(None, False)
+        return []
+
     def _unlock(self):
-        try:
-            while True:
-                if self.qsize() and self.getters:
-                    getter = self.getters.pop()
-                    if getter:
-                        try:
-                            item = self._get()
-                        except:
-                            getter.throw(*sys.exc_info())
-                        else:
-                            getter.switch(item)
-                elif self.putters and self.getters:
-                    putter = self.putters.pop()
-                    if putter:
-                        getter = self.getters.pop()
-                        if getter:
-                            item = putter.item
-                            putter.item = _NONE  # this makes greenlet calling put() not to call _put() again
-                            self._put(item)
-                            item = self._get()
-                            getter.switch(item)
-                            putter.switch(putter)
-                        else:
-                            self.putters.add(putter)
-                elif self.putters and (self.getters or self.qsize() < self.maxsize):
-                    putter = self.putters.pop()
-                    putter.switch(putter)
+        while True:
+            if self._delivered:
+                putter = self._delivered.popleft()
+                putter.switch(putter)
+            elif self.qsize() and self.getters:
+                getter = self.getters.popleft()
+                try:
+                    item = self._get()
+                except:
+                    getter.throw(*sys.exc_info())
                 else:
-                    break
-        finally:
-            self._event_unlock = None  # QQQ maybe it's possible to obtain this info from libevent?
-            # i.e. whether this event is pending _OR_ currently executing
+                    getter.switch(item)
+            elif self.putters and self.getters:
+                putter = self.putters.popleft()
+                getter = self.getters.popleft()
+                item = putter.item
+                putter.item = _NONE  # this makes greenlet calling put() not to call _put() again
+                self._put(item)
+                item = self._get()
+                getter.switch(item)
+                putter.switch(putter)
+            elif self.putters and (self.getters or self.qsize() < self.maxsize):
+                putter = self.putters.popleft()
+                putter.switch(putter)
+            else:
+                break
         # testcase: 2 greenlets: while True: q.put(q.get()) - nothing else has a change to execute
         # to avoid this, schedule unlock with timer(0, ...) once in a while
 
     def _schedule_unlock(self):
+        # the same re-armable event is used for every unlock this instance does
         if self._event_unlock is None:
-            self._event_unlock = core.active_event(self._unlock)
-            # QQQ re-activate event (with event_active libevent call) instead of creating a new one each time
+            self._event_unlock = core.callback(self._unlock)
+        self._event_unlock.start()
+
+
+def _discard(waiters, waiter):
+    # only the calls that did not get what they waited for (a timeout or a kill) are still there;
+    # these usually expire in the order they started waiting, so the search stops early
+    try:
+        waiters.remove(waiter)
+    except ValueError:
+        pass
 
 
 class ItemWaiter(Waiter):
@@ -290,10 +379,11 @@ class JoinableQueue(Queue):
         self.unfinished_tasks += 1
         self._cond.clear()
 
-    def task_done(self):
+    def task_done(self, count=1):
         '''Indicate that a formerly enqueued task is complete. Used by queue consumer threads.
         For each :meth:`get <Queue.get>` used to fetch a task, a subsequent call to :meth:`task_done` tells the queue
-        that the processing on the task is complete.
+        that the processing on the task is complete. After fetching several tasks with
+        :meth:`get_many <Queue.get_many>`, pass their number as *count*.
 
         If a :meth:`join` is currently blocking, it will resume when all items have been processed
         (meaning that a :meth:`task_done` call was received for every item that had been
@@ -301,9 +391,11 @@ class JoinableQueue(Queue):
 
         Raises a :exc:`ValueError` if called more times than there were items placed in the queue.
         '''
-        if self.unfinished_tasks <= 0:
+        if count < 1:
+            raise ValueError('count must be positive: %r' % (count, ))
+        if self.unfinished_tasks < count:
             raise ValueError('task_done() called too many times')
-        self.unfinished_tasks -= 1
+        self.unfinished_tasks -= count
         if self.unfinished_tasks == 0:
             self._cond.set()
 
@@ -316,3 +408,86 @@ class JoinableQueue(Queue):
         unfinished tasks drops to zero, :meth:`join` unblocks.
         '''
         self._cond.wait()
+
+
+def choose(objects, timeout=None):
+    """Block until one of *objects* is ready and return an ``(object, value)`` pair.
+
+    *objects* may contain queues and objects that support :meth:`rawlink`, like
+    :class:`Event <gevent.event.Event>`, :class:`AsyncResult <gevent.event.AsyncResult>` and
+    :class:`Greenlet <gevent.greenlet.Greenlet>`. A queue is ready when it has an item to get;
+    the item is removed and returned as *value*, so only one queue gives up an item per call.
+    For the other objects *value* is ``None``. The objects are checked in order, so the first
+    one that is ready at once wins.
+
+    The current greenlet waits in all of them at once, without spawning a greenlet per object,
+    and is removed from the rest when one of them wakes it up.
+    Return ``None`` if *timeout* expires first.
+    """
+    # the objects are gone through several times
+    objects = list(objects)
+    for obj in objects:
+        if isinstance(obj, Queue):
+            if obj.qsize() or obj.putters:
+                try:
+                    return obj, obj.get(False)
+                except Empty:
+                    pass
+        elif obj.ready():
+            return obj, None
+    current = getcurrent()
+    link = _LinkChoice(current)
+    waiters = []
+    try:
+        for obj in objects:
+            if isinstance(obj, Queue):
+                waiter = _QueueChoice(current, obj)
+                obj.getters.append(waiter)
+                waiters.append(waiter)
+            else:
+                obj.rawlink(link)
+        timer = Timeout.start_new(timeout)
+        try:
+            try:
+                result = get_hub().switch()
+                assert type(result) is tuple and len(result) == 2, 'Invalid switch into choose(): %r' % (result, )
+                return result
+            except Timeout, ex:
+                if ex is not timer:
+                    raise
+        finally:
+            timer.cancel()
+    finally:
+        for waiter in waiters:
+            _discard(waiter.queue.getters, waiter)
+        for obj in objects:
+            if not isinstance(obj, Queue):
+                obj.unlink(link)
+
+
+class _QueueChoice(object):
+    """Stands in the getters of a queue for a greenlet blocked in :func:`choose`."""
+
+    __slots__ = ['greenlet', 'queue']
+
+    def __init__(self, greenlet, queue):
+        self.greenlet = greenlet
+        self.queue = queue
+
+    def switch(self, item):
+        self.greenlet.switch((self.queue, item))
+
+    def throw(self, *throw_args):
+        self.greenlet.throw(*throw_args)
+
+
+class _LinkChoice(object):
+    """The callback :func:`choose` links to the objects that are not queues."""
+
+    __slots__ = ['greenlet']
+
+    def __init__(self, greenlet):
+        self.greenlet = greenlet
+
+    def __call__(self, source):
+        self.greenlet.switch((source, None))
@@ -74,7 +74,7 @@ __imports__ = ['error',
 
 
 import sys
-import time
+import errno
 import random
 import re
 
@@ -136,6 +136,7 @@ if 'inet_ntop' not in globals():
 
 from gevent.hub import getcurrent, get_hub
 from gevent import core
+from gevent.core import recv as _recv, recv_into as _recv_into, send as _send, sendv as _sendv, sendfile as _sendfile
 
 _ip4_re = re.compile('^[\d\.]+$')
 
@@ -225,7 +226,32 @@ def __cancel_wait(event):
 
 
 def cancel_wait(event):
-    core.active_event(__cancel_wait, event)
+    get_hub().run_callback(__cancel_wait, event)
+
+
+def _watcher_helper(watcher, evtype, arg):
+    current, timeout_exc = arg
+    if evtype & core.EV_TIMEOUT:
+        current.throw(timeout_exc)
+    else:
+        current.switch(watcher)
+
+
+def _close_watcher(watcher):
+    _cancel_watcher(watcher, core.EV_READ | core.EV_WRITE)
+    watcher.cancel()
+
+
+def _cancel_watcher(watcher, evtype):
+    # the waiters are looked up again after each throw: the reader might have been also waiting for writing
+    if evtype & core.EV_READ:
+        arg = watcher.read_arg
+        if arg is not None:
+            arg[0].throw(error(EBADF, 'File descriptor was closed in another greenlet'))
+    if evtype & core.EV_WRITE:
+        arg = watcher.write_arg
+        if arg is not None:
+            arg[0].throw(error(EBADF, 'File descriptor was closed in another greenlet'))
 
 
 if sys.version_info[:2] <= (2, 4):
@@ -259,6 +285,21 @@ else:
         return memoryview(string)[offset:]
 
 
+# the errors of sendfile() that mean it cannot be used with this file or on this platform
+_SENDFILE_UNSUPPORTED = set([EINVAL])
+for _name in ('ENOSYS', 'ESPIPE', 'ENOTSOCK', 'EOPNOTSUPP', 'ENOTSUP'):
+    if hasattr(errno, _name):
+        _SENDFILE_UNSUPPORTED.add(getattr(errno, _name))
+del _name
+_SENDFILE_BLOCKSIZE = 0x40000000
+
+
+def _encode(data):
+    if isinstance(data, unicode):
+        return data.encode()
+    return data
+
+
 class _closedsocket(object):
     __slots__ = []
 
@@ -276,6 +317,10 @@ timeout_default = object()
 
 class socket(object):
 
+    _persistent = False
+    # (count, size, gevent.core.mmsgbuffer) of the last recv_many()/send_many()
+    _mmsg = None
+
     def __init__(self, family=AF_INET, type=SOCK_STREAM, proto=0, _sock=None):
         if _sock is None:
             self._sock = _realsocket(family, type, proto)
@@ -286,13 +331,12 @@ class socket(object):
                 self.timeout = getattr(_sock, 'timeout', False)
                 if self.timeout is False:
                     self.timeout = _socket.getdefaulttimeout()
+                self._persistent = getattr(_sock, '_persistent', False)
             else:
                 self._sock = _sock
                 self.timeout = _socket.getdefaulttimeout()
         self._sock.setblocking(0)
-        self._read_event = core.event(core.EV_READ, self.fileno(), _wait_helper)
-        self._write_event = core.event(core.EV_WRITE, self.fileno(), _wait_helper)
-        self._rw_event = core.event(core.EV_READ | core.EV_WRITE, self.fileno(), _wait_helper)
+        self._watcher = None
 
     def __repr__(self):
         return '<%s at %s %s>' % (type(self).__name__, hex(id(self)), self._formatinfo())
@@ -324,6 +368,21 @@ class socket(object):
             result += ' timeout=' + str(self.timeout)
         return result
 
+    def _wait(self, evtype, timeout, timeout_exc=timeout('timed out')):
+        """Block the current greenlet until the socket is ready for *evtype* (EV_READ, EV_WRITE or both).
+
+        All the waits share one :class:`gevent.core.fd_watcher` that is created on the first wait.
+        """
+        watcher = self._watcher
+        if watcher is None:
+            watcher = self._watcher = core.fd_watcher(self._sock.fileno(), _watcher_helper, self._persistent)
+        watcher.start(evtype, (getcurrent(), timeout_exc), timeout)
+        try:
+            switch_result = get_hub().switch()
+            assert watcher is switch_result, 'Invalid switch into %s._wait(): %r' % (type(self).__name__, switch_result, )
+        finally:
+            watcher.stop(evtype)
+
     def accept(self):
         sock = self._sock
         while True:
@@ -334,13 +393,12 @@ class socket(object):
                 if ex[0] != EWOULDBLOCK or self.timeout == 0.0:
                     raise
                 sys.exc_clear()
-            wait_read(sock.fileno(), timeout=self.timeout, event=self._read_event)
+            self._wait(core.EV_READ, self.timeout)
         return socket(_sock=client_socket), address
 
     def close(self):
-        cancel_wait(self._rw_event)
-        cancel_wait(self._read_event)
-        cancel_wait(self._write_event)
+        if self._watcher is not None:
+            get_hub().run_callback(_close_watcher, self._watcher)
         self._sock = _closedsocket()
         dummy = self._sock._dummy
         for method in _delegate_methods:
@@ -361,11 +419,11 @@ class socket(object):
                 if not result or result == EISCONN:
                     break
                 elif (result in (EWOULDBLOCK, EINPROGRESS, EALREADY)) or (result == EINVAL and is_windows):
-                    wait_readwrite(sock.fileno(), event=self._rw_event)
+                    self._wait(core.EV_READ | core.EV_WRITE, None)
                 else:
                     raise error(result, strerror(result))
         else:
-            end = time.time() + self.timeout
+            end = core.now() + self.timeout
             while True:
                 err = sock.getsockopt(SOL_SOCKET, SO_ERROR)
                 if err:
@@ -374,10 +432,10 @@ class socket(object):
                 if not result or result == EISCONN:
                     break
                 elif (result in (EWOULDBLOCK, EINPROGRESS, EALREADY)) or (result == EINVAL and is_windows):
-                    timeleft = end - time.time()
+                    timeleft = end - core.now()
                     if timeleft <= 0:
                         raise timeout('timed out')
-                    wait_readwrite(sock.fileno(), timeout=timeleft, event=self._rw_event)
+                    self._wait(core.EV_READ | core.EV_WRITE, timeleft)
                 else:
                     raise error(result, strerror(result))
 
@@ -396,33 +454,72 @@ class socket(object):
         """dup() -> socket object
 
         Return a new socket object connected to the same system resource.
-        Note, that the new socket does not inherit the timeout."""
-        return socket(_sock=self._sock)
+        Note, that the new socket does not inherit the timeout. It does inherit the persistent mode,
+        because libevent cannot mix edge-triggered and regular events on one descriptor."""
+        sock = socket(_sock=self._sock)
+        sock._persistent = self._persistent
+        return sock
 
     def makefile(self, mode='r', bufsize=-1):
         # note that this does not inherit timeout either (intentionally, because that's
         # how the standard socket behaves)
-        return _fileobject(self.dup(), mode, bufsize)
+        return _socketfile(self.dup(), mode, bufsize)
 
-    def recv(self, *args):
+    def recv(self, size, flags=0):
         sock = self._sock  # keeping the reference so that fd is not closed during waiting
+        try:
+            fileno = sock.fileno()
+        except error, ex:
+            if ex[0] == EBADF:
+                return ''
+            raise
         while True:
+            # core.recv() returns None instead of raising when the call would block
             try:
-                return sock.recv(*args)
+                data = _recv(fileno, size, flags)
             except error, ex:
                 if ex[0] == EBADF:
                     return ''
-                if ex[0] != EWOULDBLOCK or self.timeout == 0.0:
-                    raise
-                # QQQ without clearing exc_info test__refcount.test_clean_exit fails
-                sys.exc_clear()
+                raise
+            if data is not None:
+                return data
+            if self.timeout == 0.0:
+                raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
             try:
-                wait_read(sock.fileno(), timeout=self.timeout, event=self._read_event)
+                self._wait(core.EV_READ, self.timeout)
             except error, ex:
                 if ex[0] == EBADF:
                     return ''
                 raise
 
+    def _recv_buffer(self, buffer, size=-1):
+        """Receive up to *size* bytes into *buffer*, the :class:`gevent.core.recvbuffer` of a file object
+        made by :meth:`makefile`. Return the number of bytes received, 0 at the end of the stream."""
+        sock = self._sock
+        try:
+            fileno = sock.fileno()
+        except error, ex:
+            if ex[0] == EBADF:
+                return 0
+            raise
+        while True:
+            try:
+                count = buffer.fill(fileno, size)
+            except error, ex:
+                if ex[0] == EBADF:
+                    return 0
+                raise
+            if count is not None:
+                return count
+            if self.timeout == 0.0:
+                raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
+            try:
+                self._wait(core.EV_READ, self.timeout)
+            except error, ex:
+                if ex[0] == EBADF:
+                    return 0
+                raise
+
     def recvfrom(self, *args):
         sock = self._sock
         while True:
@@ -432,7 +529,7 @@ class socket(object):
                 if ex[0] != EWOULDBLOCK or self.timeout == 0.0:
                     raise
                 sys.exc_clear()
-            wait_read(sock.fileno(), timeout=self.timeout, event=self._read_event)
+            self._wait(core.EV_READ, self.timeout)
 
     def recvfrom_into(self, *args):
         sock = self._sock
@@ -443,21 +540,29 @@ class socket(object):
                 if ex[0] != EWOULDBLOCK or self.timeout == 0.0:
                     raise
                 sys.exc_clear()
-            wait_read(sock.fileno(), timeout=self.timeout, event=self._read_event)
+            self._wait(core.EV_READ, self.timeout)
 
-    def recv_into(self, *args):
+    def recv_into(self, buffer, nbytes=0, flags=0):
         sock = self._sock
+        try:
+            fileno = sock.fileno()
+        except error, ex:
+            if ex[0] == EBADF:
+                return 0
+            raise
         while True:
             try:
-                return sock.recv_into(*args)
+                count = _recv_into(fileno, buffer, nbytes, flags)
             except error, ex:
                 if ex[0] == EBADF:
                     return 0
-                if ex[0] != EWOULDBLOCK or self.timeout == 0.0:
-                    raise
-                sys.exc_clear()
+                raise
+            if count is not None:
+                return count
+            if self.timeout == 0.0:
+                raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
             try:
-                wait_read(sock.fileno(), timeout=self.timeout, event=self._read_event)
+                self._wait(core.EV_READ, self.timeout)
             except error, ex:
                 if ex[0] == EBADF:
                     return 0
@@ -467,24 +572,23 @@ class socket(object):
         sock = self._sock
         if timeout is timeout_default:
             timeout = self.timeout
-        try:
-            return sock.send(data, flags)
-        except error, ex:
-            if ex[0] != EWOULDBLOCK or timeout == 0.0:
-                raise
-            sys.exc_clear()
+        if isinstance(data, unicode):
+            data = data.encode()
+        fileno = sock.fileno()
+        count = _send(fileno, data, flags)
+        if count is None:
+            if timeout == 0.0:
+                raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
             try:
-                wait_write(sock.fileno(), timeout=timeout, event=self._write_event)
+                self._wait(core.EV_WRITE, timeout)
             except error, ex:
                 if ex[0] == EBADF:
                     return 0
                 raise
-            try:
-                return sock.send(data, flags)
-            except error, ex2:
-                if ex2[0] == EWOULDBLOCK:
-                    return 0
-                raise
+            count = _send(fileno, data, flags)
+            if count is None:
+                return 0
+        return count
 
     def sendall(self, data, flags=0):
         if isinstance(data, unicode):
@@ -497,16 +601,223 @@ class socket(object):
                 data_sent += self.send(_get_memory(data, data_sent), flags)
         else:
             timeleft = self.timeout
-            end = time.time() + timeleft
+            end = core.now() + timeleft
             data_sent = 0
             while True:
                 data_sent += self.send(_get_memory(data, data_sent), flags, timeout=timeleft)
                 if data_sent >= len(data):
                     break
-                timeleft = end - time.time()
+                timeleft = end - core.now()
                 if timeleft <= 0:
                     raise timeout('timed out')
 
+    def sendall_iov(self, buffers, flags=0):
+        """Send all the strings (or buffers) in the sequence *buffers*, in order.
+
+        The result is the same as ``sendall(''.join(buffers))``, but the buffers are passed to
+        the kernel as a vector (sendmsg/writev) so they are never concatenated. After a partial
+        write only the unsent part is sent again.
+        """
+        buffers = list(buffers)
+        for data in buffers:
+            if isinstance(data, unicode):
+                buffers = [_encode(data) for data in buffers]
+                break
+        remaining = sum(map(len, buffers))
+        if not remaining:
+            return
+        fileno = self._sock.fileno()
+        end = self._deadline()
+        while True:
+            # core.sendv() takes at most IOV_MAX buffers from the start of the list
+            data_sent = _sendv(fileno, buffers, flags)
+            if data_sent is None:
+                self._wait_until(core.EV_WRITE, end)
+                continue
+            remaining -= data_sent
+            if remaining <= 0:
+                return
+            # drop the buffers that went out completely and resume from the middle of the partial one
+            index = 0
+            while data_sent >= len(buffers[index]):
+                data_sent -= len(buffers[index])
+                index += 1
+            del buffers[:index]
+            if data_sent:
+                buffers[0] = _get_memory(buffers[0], data_sent)
+
+    def sendfile(self, file, offset=0, count=None):
+        """Send *count* bytes of *file* (by default, everything up to the end of the file) starting at *offset*.
+
+        The data goes from the file to the socket with the sendfile() system call, without being copied
+        through userspace. If sendfile() is not available or does not support *file* (it has to be a regular
+        file), the file is read and sent with :meth:`sendall` instead. Like :meth:`sendall`, the whole
+        operation is subject to the socket's timeout. The file position is left after the last byte sent.
+        Return the number of bytes sent.
+        """
+        if count is not None and count <= 0:
+            return 0
+        try:
+            in_fd = file.fileno()
+        except AttributeError:
+            return self._sendfile_use_send(file, offset, count)
+        fileno = self._sock.fileno()
+        end = self._deadline()
+        total_sent = 0
+        try:
+            while count is None or total_sent < count:
+                if count is None:
+                    blocksize = _SENDFILE_BLOCKSIZE
+                else:
+                    blocksize = min(count - total_sent, _SENDFILE_BLOCKSIZE)
+                try:
+                    sent = _sendfile(fileno, in_fd, offset + total_sent, blocksize)
+                except error, ex:
+                    if total_sent == 0 and ex[0] in _SENDFILE_UNSUPPORTED:
+                        sys.exc_clear()
+                        return self._sendfile_use_send(file, offset, count)
+                    raise
+                if sent is None:
+                    self._wait_until(core.EV_WRITE, end)
+                elif sent == 0:
+                    # end of file
+                    break
+                else:
+                    total_sent += sent
+        finally:
+            if total_sent > 0 and hasattr(file, 'seek'):
+                file.seek(offset + total_sent)
+        return total_sent
+
+    def _sendfile_use_send(self, file, offset, count):
+        if offset:
+            file.seek(offset)
+        total_sent = 0
+        while count is None or total_sent < count:
+            if count is None:
+                blocksize = 65536
+            else:
+                blocksize = min(count - total_sent, 65536)
+            data = file.read(blocksize)
+            if not data:
+                break
+            self.sendall(data)
+            total_sent += len(data)
+        return total_sent
+
+    def _deadline(self):
+        if self.timeout is not None:
+            return core.now() + self.timeout
+
+    def _wait_until(self, evtype, end):
+        """Wait for *evtype* until the time *end* returned by :meth:`_deadline`: used by the operations
+        that apply the socket's timeout to the whole call rather than to each wait."""
+        if end is None:
+            timeleft = None
+        elif self.timeout == 0.0:
+            raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
+        else:
+            timeleft = end - core.now()
+            if timeleft <= 0:
+                raise timeout('timed out')
+        self._wait(evtype, timeleft)
+
+    def recv_many(self, bufsize, count=64, flags=0):
+        """Receive up to *count* datagrams of up to *bufsize* bytes each; return a list of (data, address) pairs.
+
+        Only waits (subject to the socket's timeout) for the first datagram, then takes those already waiting.
+        On Linux this is a single recvmmsg() call, into memory that is allocated for the socket once and reused
+        by the calls with the same *bufsize* and *count*; elsewhere recvfrom() is called repeatedly.
+        """
+        buffer = self._get_mmsg(count, bufsize)
+        if buffer is None:
+            return self._recv_many_loop(bufsize, count, flags)
+        fileno = self._sock.fileno()
+        while True:
+            try:
+                result = buffer.recv(fileno, flags)
+            except error, ex:
+                if ex[0] != errno.ENOSYS:
+                    raise
+                sys.exc_clear()
+                return self._recv_many_loop(bufsize, count, flags)
+            if result is not None:
+                return result
+            if self.timeout == 0.0:
+                raise error(EWOULDBLOCK, strerror(EWOULDBLOCK))
+            self._wait(core.EV_READ, self.timeout)
+
+    def _recv_many_loop(self, bufsize, count, flags):
+        result = [self.recvfrom(bufsize, flags)]
+        sock = self._sock
+        while len(result) < count:
+            try:
+                result.append(sock.recvfrom(bufsize, flags))
+            except error, ex:
+                if ex[0] not in (EWOULDBLOCK, EAGAIN):
+                    raise
+                sys.exc_clear()
+                break
+        return result
+
+    def send_many(self, messages, flags=0):
+        """Send the datagrams in *messages*, a sequence of (data, address) pairs; return their number.
+
+        The address is None on a connected socket. Waits whenever the socket cannot take more; like
+        :meth:`sendall`, the whole operation is subject to the socket's timeout. On Linux the datagrams
+        go out in batches with sendmmsg(), as long as the addresses are numeric; otherwise sendto() is
+        called for each of them.
+        """
+        messages = list(messages)
+        end = self._deadline()
+        index = 0
+        mmsg = self._mmsg
+        if mmsg is not None:
+            buffer = mmsg[2]
+        else:
+            buffer = self._get_mmsg(64, 1)
+        if buffer is not None:
+            fileno = self._sock.fileno()
+            while index < len(messages):
+                try:
+                    sent = buffer.send(fileno, messages[index:index + buffer.count], flags)
+                except ValueError:
+                    # not a numeric address
+                    sys.exc_clear()
+                    break
+                except error, ex:
+                    if ex[0] != errno.ENOSYS:
+                        raise
+                    sys.exc_clear()
+                    break
+                if sent is None:
+                    self._wait_until(core.EV_WRITE, end)
+                else:
+                    index += sent
+        sock = self._sock
+        for data, address in messages[index:]:
+            while True:
+                try:
+                    if address is None:
+                        sock.send(data, flags)
+                    else:
+                        sock.sendto(data, flags, address)
+                    break
+                except error, ex:
+                    if ex[0] not in (EWOULDBLOCK, EAGAIN):
+                        raise
+                    sys.exc_clear()
+                self._wait_until(core.EV_WRITE, end)
+        return len(messages)
+
+    def _get_mmsg(self, count, size):
+        if self.family not in (AF_INET, AF_INET6):
+            return None
+        mmsg = self._mmsg
+        if mmsg is None or mmsg[0] != count or mmsg[1] != size:
+            mmsg = self._mmsg = (count, size, core.mmsgbuffer(self.family, count, size))
+        return mmsg[2]
+
     def sendto(self, *args):
         sock = self._sock
         try:
@@ -515,7 +826,7 @@ class socket(object):
             if ex[0] != EWOULDBLOCK or timeout == 0.0:
                 raise
             sys.exc_clear()
-            wait_write(sock.fileno(), timeout=self.timeout, event=self._write_event)
+            self._wait(core.EV_WRITE, self.timeout)
             try:
                 return sock.sendto(*args)
             except error, ex2:
@@ -543,15 +854,38 @@ class socket(object):
     def gettimeout(self):
         return self.timeout
 
+    def setpersistent(self, flag):
+        """Keep the socket registered with the event loop between the waits.
+
+        In the persistent mode the descriptor is registered once as an edge-triggered event, so
+        a blocking call that has to wait does not make any system calls besides the I/O itself.
+        This suits long-lived busy connections. The socket stays registered until it is closed
+        or garbage collected.
+
+        The flag is ignored if libevent does not support edge-triggered events (libevent 1.4).
+        It must not be changed while another greenlet is blocked on the socket.
+        """
+        flag = bool(flag) and core.EV_ET != 0
+        if flag != self._persistent:
+            watcher = self._watcher
+            if watcher is not None:
+                assert not (watcher.reading or watcher.writing), 'Cannot change the mode of %r while it is being waited on' % (self, )
+                watcher.cancel()
+                self._watcher = None
+            self._persistent = flag
+
+    def getpersistent(self):
+        return self._persistent
+
     def shutdown(self, how):
-        cancel_wait(self._rw_event)
-        if how == 0:  # SHUT_RD
-            cancel_wait(self._read_event)
-        elif how == 1:  # SHUT_RW
-            cancel_wait(self._write_event)
-        else:
-            cancel_wait(self._read_event)
-            cancel_wait(self._write_event)
+        if self._watcher is not None:
+            if how == 0:  # SHUT_RD
+                evtype = core.EV_READ
+            elif how == 1:  # SHUT_RW
+                evtype = core.EV_WRITE
+            else:
+                evtype = core.EV_READ | core.EV_WRITE
+            get_hub().run_callback(_cancel_watcher, self._watcher, evtype)
         self._sock.shutdown(how)
 
     family = property(lambda self: self._sock.family, doc="the socket family")
@@ -568,6 +902,177 @@ class socket(object):
 
 SocketType = socket
 
+
+class _socketfile(object):
+    """The file object returned by :meth:`socket.makefile`, in place of the standard socket._fileobject.
+
+    Reads go through a :class:`gevent.core.recvbuffer`: the data is received straight into its reusable
+    memory and lines are found with memchr(), rather than by concatenating the results of many small
+    recv() calls. Buffered writes are sent with :meth:`socket.sendall_iov` without being joined first.
+    """
+
+    default_bufsize = 8192
+    name = "<socket>"
+
+    def __init__(self, sock, mode='rb', bufsize=-1, close=False):
+        self._sock = sock
+        self.mode = mode
+        if bufsize < 0:
+            bufsize = self.default_bufsize
+        self.bufsize = bufsize
+        self.softspace = False
+        # like in _fileobject, an unbuffered file never receives more than it returns
+        if bufsize == 0:
+            self._rbufsize = 1
+        elif bufsize == 1:
+            self._rbufsize = self.default_bufsize
+        else:
+            self._rbufsize = bufsize
+        self._wbufsize = bufsize
+        self._rbuf = core.recvbuffer(self._rbufsize)
+        self._wbuf = []
+        self._wbuf_len = 0
+        self._close = close
+
+    def _getclosed(self):
+        return self._sock is None
+    closed = property(_getclosed, doc="True if the file is closed")
+
+    def close(self):
+        try:
+            if self._sock:
+                self.flush()
+        finally:
+            if self._close:
+                self._sock.close()
+            self._sock = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except:
+            # close() may fail if __init__ didn't complete
+            pass
+
+    def flush(self):
+        if self._wbuf:
+            buffers = self._wbuf
+            size = self._wbuf_len
+            self._wbuf = []
+            self._wbuf_len = 0
+            if len(buffers) == 1:
+                self._sock.sendall(buffers[0])
+            elif size <= self.default_bufsize:
+                # joining a few small strings costs less than a vector
+                self._sock.sendall(''.join(buffers))
+            else:
+                self._sock.sendall_iov(buffers)
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def write(self, data):
+        data = str(data)
+        if not data:
+            return
+        self._wbuf.append(data)
+        self._wbuf_len += len(data)
+        if (self._wbufsize == 0 or
+            (self._wbufsize == 1 and '\n' in data) or
+            (self._wbufsize > 1 and self._wbuf_len >= self._wbufsize)):
+            self.flush()
+
+    def writelines(self, list):
+        lines = filter(None, map(str, list))
+        self._wbuf.extend(lines)
+        self._wbuf_len += sum(map(len, lines))
+        if self._wbufsize <= 1 or self._wbuf_len >= self._wbufsize:
+            self.flush()
+
+    def _fill(self, size):
+        if self._rbufsize == 1:
+            # unbuffered: receive no more than asked for
+            return self._sock._recv_buffer(self._rbuf, size)
+        return self._sock._recv_buffer(self._rbuf)
+
+    def read(self, size=-1):
+        rbuf = self._rbuf
+        if size < 0:
+            # read until EOF, taking the data out of the buffer as it comes so that it does not grow
+            chunks = [rbuf.read()]
+            while self._sock._recv_buffer(rbuf, max(self._rbufsize, self.default_bufsize)):
+                chunks.append(rbuf.read())
+            return ''.join(chunks)
+        if len(rbuf) >= size:
+            return rbuf.read(size)
+        chunks = [rbuf.read()]
+        left = size - len(chunks[0])
+        while left > 0:
+            if left >= self._rbufsize:
+                # the buffer is empty and would not help with a read this large
+                data = self._sock.recv(left)
+            else:
+                if not self._fill(left):
+                    break
+                data = rbuf.read(left)
+            if not data:
+                break
+            chunks.append(data)
+            left -= len(data)
+        return ''.join(chunks)
+
+    def readinto(self, buffer):
+        """Read up to ``len(buffer)`` bytes into the writable *buffer*, fewer only at the end of the stream.
+        Return the number of bytes read."""
+        rbuf = self._rbuf
+        view = memoryview(buffer)
+        size = len(view)
+        count = rbuf.readinto(view)
+        while count < size:
+            left = size - count
+            if left >= self._rbufsize:
+                received = self._sock.recv_into(view[count:])
+            else:
+                if not self._fill(left):
+                    break
+                received = rbuf.readinto(view[count:])
+            if not received:
+                break
+            count += received
+        return count
+
+    def readline(self, size=-1):
+        rbuf = self._rbuf
+        line = rbuf.readline(size)
+        while line is None:
+            if not self._fill(1):
+                # the end of the stream: there is no newline in the rest
+                return rbuf.read()
+            line = rbuf.readline(size)
+        return line
+
+    def readlines(self, sizehint=0):
+        total = 0
+        list = []
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            list.append(line)
+            total += len(line)
+            if sizehint and total >= sizehint:
+                break
+        return list
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        line = self.readline()
+        if not line:
+            raise StopIteration
+        return line
+
 if hasattr(_socket, 'socketpair'):
 
     def socketpair(*args):
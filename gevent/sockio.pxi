@@ -0,0 +1,528 @@
+__all__ += ['recv', 'recv_into', 'send', 'sendv', 'sendfile', 'recvbuffer', 'mmsgbuffer']
+
+# nonblocking socket I/O for the hot paths of gevent.socket: a call that would block returns None
+# instead of raising socket.error, which saves building and clearing an exception every time
+# a greenlet has to wait for its socket
+
+from _socket import error as _socket_error
+
+cdef extern from "libevent.h":
+    long gevent_recv(long fd, char *buf, long size, int flags, int *err)
+    long gevent_send(long fd, char *buf, long size, int flags, int *err)
+    int  GEVENT_WOULDBLOCK(int err)
+    ctypedef struct gevent_iovec:
+        pass
+    enum:
+        GEVENT_IOV_MAX
+    void GEVENT_IOV_SET(gevent_iovec iov, void *base, Py_ssize_t size)
+    long gevent_sendv(long fd, gevent_iovec *iov, int count, int flags, int *err)
+    long gevent_sendfile(long out_fd, long in_fd, long long offset, long count, int *err)
+    enum:
+        GEVENT_MMSG_MAX
+        AF_INET
+        AF_INET6
+    ctypedef struct gevent_msghdr:
+        void* msg_name
+        int msg_namelen
+        gevent_iovec* msg_iov
+        int msg_iovlen
+        void* msg_control
+        int msg_controllen
+        int msg_flags
+    ctypedef struct gevent_mmsghdr:
+        gevent_msghdr msg_hdr
+        unsigned int msg_len
+    ctypedef struct gevent_sockaddr:
+        pass
+    int  gevent_recvmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+    int  gevent_sendmmsg(long fd, gevent_mmsghdr *msgs, int count, int flags, int *err)
+    long gevent_sockaddr_get(gevent_sockaddr *address, char *host, int hostlen,
+                             unsigned long *flowinfo, unsigned long *scope_id)
+    int  gevent_sockaddr_set(gevent_sockaddr *address, int family, char *host, int port,
+                             unsigned long flowinfo, unsigned long scope_id)
+
+cdef extern from "Python.h":
+    ctypedef struct Py_buffer:
+        void *buf
+        Py_ssize_t len
+    enum:
+        PyBUF_SIMPLE
+        PyBUF_WRITABLE
+    int   PyObject_CheckBuffer(object obj)
+    int   PyObject_GetBuffer(object obj, Py_buffer *view, int flags) except -1
+    void  PyBuffer_Release(Py_buffer *view)
+    int   PyObject_AsReadBuffer(object obj, void **buffer, Py_ssize_t *buffer_len) except -1
+    int   PyObject_AsWriteBuffer(object obj, void **buffer, Py_ssize_t *buffer_len) except -1
+    PyObject* _string_new "PyString_FromStringAndSize"(char *v, Py_ssize_t len)
+    int   _string_resize "_PyString_Resize"(PyObject **string, Py_ssize_t newsize) except -1
+    char* _string_data "PyString_AS_STRING"(PyObject *string)
+    void* PyMem_Realloc(void *p, size_t n)
+
+cdef extern from "string.h":
+    void* memcpy(void *dest, void *src, size_t n)
+    void* memmove(void *dest, void *src, size_t n)
+    void* memset(void *s, int c, size_t n)
+
+
+cdef object _socket_io_error(int err):
+    if GEVENT_WOULDBLOCK(err):
+        return None
+    raise _socket_error(err, strerror(err))
+
+
+def recv(long fd, long size, int flags=0):
+    """recv(fd, size, flags=0) -> data, or None if the call would block
+
+    Receive up to *size* bytes from the nonblocking socket *fd*. Return an empty string at
+    the end of the stream. Raise :class:`socket.error` on errors other than "would block".
+    """
+    cdef int err = 0
+    cdef long count
+    cdef PyObject* data
+    cdef object result
+    if size < 0:
+        raise ValueError('negative buffersize in recv')
+    data = _string_new(NULL, size)
+    if data == NULL:
+        raise MemoryError()
+    count = gevent_recv(fd, _string_data(data), size, flags, &err)
+    if count < 0:
+        Py_XDECREF(data)
+        return _socket_io_error(err)
+    if count != size:
+        # frees the string if it fails
+        _string_resize(&data, count)
+    result = <object>data
+    Py_XDECREF(data)
+    return result
+
+
+def recv_into(long fd, object buffer, long nbytes=0, int flags=0):
+    """recv_into(fd, buffer, nbytes=0, flags=0) -> number of bytes received, or None if the call would block
+
+    Receive up to *nbytes* bytes (if 0, as many as *buffer* holds) from the nonblocking socket *fd*
+    into the writable *buffer*. Raise :class:`socket.error` on errors other than "would block".
+    """
+    cdef int err = 0
+    cdef long count
+    cdef Py_buffer view
+    cdef int has_view = 0
+    cdef void* buf
+    cdef Py_ssize_t length
+    if nbytes < 0:
+        raise ValueError('negative buffersize in recv_into')
+    if PyObject_CheckBuffer(buffer):
+        PyObject_GetBuffer(buffer, &view, PyBUF_WRITABLE)
+        has_view = 1
+        buf = view.buf
+        length = view.len
+    else:
+        PyObject_AsWriteBuffer(buffer, &buf, &length)
+    if nbytes <= length:
+        if nbytes == 0:
+            nbytes = length
+        count = gevent_recv(fd, <char*>buf, nbytes, flags, &err)
+    if has_view:
+        PyBuffer_Release(&view)
+    if nbytes > length:
+        raise ValueError('buffer too small for requested bytes')
+    if count < 0:
+        return _socket_io_error(err)
+    return count
+
+
+def send(long fd, object data, int flags=0):
+    """send(fd, data, flags=0) -> number of bytes sent, or None if the call would block
+
+    Send as much of *data* (a string or another object that supports the buffer interface)
+    as the nonblocking socket *fd* accepts at once. Raise :class:`socket.error` on errors
+    other than "would block".
+    """
+    cdef int err = 0
+    cdef long count
+    cdef Py_buffer view
+    cdef void* buf
+    cdef Py_ssize_t length
+    if PyObject_CheckBuffer(data):
+        PyObject_GetBuffer(data, &view, PyBUF_SIMPLE)
+        count = gevent_send(fd, <char*>view.buf, view.len, flags, &err)
+        PyBuffer_Release(&view)
+    else:
+        PyObject_AsReadBuffer(data, &buf, &length)
+        count = gevent_send(fd, <char*>buf, length, flags, &err)
+    if count < 0:
+        return _socket_io_error(err)
+    return count
+
+
+IOV_MAX = GEVENT_IOV_MAX
+
+
+def sendv(long fd, object buffers, int flags=0):
+    """sendv(fd, buffers, flags=0) -> number of bytes sent, or None if the call would block
+
+    Send the strings (or other objects that support the buffer interface) in the list *buffers*
+    with a single gathering call, as if they were concatenated but without copying them into
+    one string. Only the first :data:`IOV_MAX` buffers are considered. Raise :class:`socket.error`
+    on errors other than "would block".
+    """
+    cdef int err = 0
+    cdef long count = -1
+    cdef Py_ssize_t size, index, acquired = 0
+    cdef gevent_iovec* iov
+    cdef Py_buffer* views
+    cdef char* has_view
+    cdef void* buf
+    cdef Py_ssize_t length
+    if not isinstance(buffers, list):
+        # the list keeps the items and thus the memory referenced by the vector alive
+        buffers = list(buffers)
+    size = len(buffers)
+    if size > GEVENT_IOV_MAX:
+        size = GEVENT_IOV_MAX
+    if size == 0:
+        return 0
+    iov = <gevent_iovec*>PyMem_Malloc(size * sizeof(gevent_iovec))
+    views = <Py_buffer*>PyMem_Malloc(size * sizeof(Py_buffer))
+    has_view = <char*>PyMem_Malloc(size)
+    try:
+        if iov == NULL or views == NULL or has_view == NULL:
+            raise MemoryError()
+        for index from 0 <= index < size:
+            item = buffers[index]
+            if PyObject_CheckBuffer(item):
+                PyObject_GetBuffer(item, &views[index], PyBUF_SIMPLE)
+                has_view[index] = 1
+                acquired = index + 1
+                GEVENT_IOV_SET(iov[index], views[index].buf, views[index].len)
+            else:
+                has_view[index] = 0
+                acquired = index + 1
+                PyObject_AsReadBuffer(item, &buf, &length)
+                GEVENT_IOV_SET(iov[index], buf, length)
+        count = gevent_sendv(fd, iov, size, flags, &err)
+    finally:
+        for index from 0 <= index < acquired:
+            if has_view[index]:
+                PyBuffer_Release(&views[index])
+        PyMem_Free(iov)
+        PyMem_Free(views)
+        PyMem_Free(has_view)
+    if count < 0:
+        return _socket_io_error(err)
+    return count
+
+
+def sendfile(long out_fd, long in_fd, long long offset, long count):
+    """sendfile(out_fd, in_fd, offset, count) -> number of bytes sent, or None if the call would block
+
+    Send up to *count* bytes of the file *in_fd*, starting at *offset*, to the nonblocking socket
+    *out_fd* without copying them through userspace. Return 0 at the end of the file. The file
+    position of *in_fd* is not changed. Raise :class:`socket.error` on errors other than
+    "would block"; the error is ENOSYS on platforms without sendfile().
+    """
+    cdef int err = 0
+    cdef long result
+    if offset < 0 or count < 0:
+        raise ValueError('negative offset or count in sendfile')
+    result = gevent_sendfile(out_fd, in_fd, offset, count, &err)
+    if result < 0:
+        return _socket_io_error(err)
+    return result
+
+
+cdef class recvbuffer:
+    """recvbuffer(size=8192)
+
+    The read buffer of a buffered socket file object. Data is received straight into the buffer's
+    memory with :meth:`fill` (or added with :meth:`feed`) and taken out as strings, lines being
+    found with memchr(). The memory is reused: it only grows to hold a line longer than *size*.
+    """
+    cdef char* _data
+    cdef Py_ssize_t _capacity
+    cdef Py_ssize_t _start
+    cdef Py_ssize_t _end
+
+    def __init__(self, Py_ssize_t size=8192):
+        if size <= 0:
+            size = 1
+        if self._data == NULL:
+            self._data = <char*>PyMem_Malloc(size)
+            if self._data == NULL:
+                raise MemoryError()
+            self._capacity = size
+
+    def __dealloc__(self):
+        PyMem_Free(self._data)
+        self._data = NULL
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __repr__(self):
+        return '<%s at 0x%x %s/%s bytes>' % (type(self).__name__, id(self), self._end - self._start, self._capacity)
+
+    cdef int _reserve(self, Py_ssize_t size) except -1:
+        # make at least *size* bytes available at the end, by moving the data to the start or growing
+        cdef Py_ssize_t length = self._end - self._start
+        cdef Py_ssize_t capacity
+        cdef char* data
+        if self._capacity - self._end >= size:
+            return 0
+        if self._start > 0:
+            memmove(self._data, self._data + self._start, length)
+            self._start = 0
+            self._end = length
+            if self._capacity - length >= size:
+                return 0
+        capacity = self._capacity * 2
+        if capacity < length + size:
+            capacity = length + size
+        data = <char*>PyMem_Realloc(self._data, capacity)
+        if data == NULL:
+            raise MemoryError()
+        self._data = data
+        self._capacity = capacity
+        return 0
+
+    def fill(self, long fd, Py_ssize_t size=-1):
+        """fill(fd, size=-1) -> number of bytes received, or None if the call would block
+
+        Receive up to *size* bytes (if negative, as many as the free part of the buffer holds, making room
+        if there is none) from the nonblocking socket *fd*. Return 0 at the end of the stream.
+        """
+        cdef int err = 0
+        cdef long count
+        if size < 0:
+            # use all the memory not taken by the buffered data; double it if it is full
+            size = self._capacity - (self._end - self._start)
+            if size == 0:
+                size = self._capacity
+        self._reserve(size)
+        count = gevent_recv(fd, self._data + self._end, size, 0, &err)
+        if count < 0:
+            return _socket_io_error(err)
+        self._end += count
+        return count
+
+    def feed(self, data):
+        """Append the string (or another object that supports the buffer interface) *data* to the buffer."""
+        cdef void* buf
+        cdef Py_ssize_t length
+        PyObject_AsReadBuffer(data, &buf, &length)
+        self._reserve(length)
+        memcpy(self._data + self._end, buf, length)
+        self._end += length
+
+    def read(self, Py_ssize_t size=-1):
+        """Take the first *size* bytes out of the buffer (all of them if *size* is negative or there are fewer)."""
+        cdef Py_ssize_t length = self._end - self._start
+        if size < 0 or size > length:
+            size = length
+        result = PyString_FromStringAndSize(self._data + self._start, size)
+        self._start += size
+        return result
+
+    def readline(self, Py_ssize_t size=-1):
+        """readline(size=-1) -> line, or None if there is no complete line in the buffer
+
+        Take a line, including the newline, out of the buffer. If *size* is not negative, a line is also
+        complete after *size* bytes.
+        """
+        cdef Py_ssize_t length = self._end - self._start
+        cdef char* start = self._data + self._start
+        cdef char* newline
+        if size >= 0 and size < length:
+            length = size
+        newline = <char*>memchr(start, 10, length)
+        if newline != NULL:
+            length = newline - start + 1
+        elif length != size:
+            return None
+        result = PyString_FromStringAndSize(start, length)
+        self._start += length
+        return result
+
+    def readinto(self, object buffer):
+        """Move as many bytes as fit from the buffer into the writable *buffer*; return their number."""
+        cdef Py_buffer view
+        cdef void* buf
+        cdef Py_ssize_t length
+        cdef int has_view = 0
+        if PyObject_CheckBuffer(buffer):
+            PyObject_GetBuffer(buffer, &view, PyBUF_WRITABLE)
+            has_view = 1
+            buf = view.buf
+            length = view.len
+        else:
+            PyObject_AsWriteBuffer(buffer, &buf, &length)
+        if length > self._end - self._start:
+            length = self._end - self._start
+        memcpy(buf, self._data + self._start, length)
+        if has_view:
+            PyBuffer_Release(&view)
+        self._start += length
+        return length
+
+
+cdef class mmsgbuffer:
+    """mmsgbuffer(family, count=64, size=65536)
+
+    Preallocated memory for batched datagram I/O on a socket of *family* (AF_INET or AF_INET6):
+    :meth:`recv` receives up to *count* datagrams of up to *size* bytes each with one recvmmsg() call,
+    :meth:`send` sends up to *count* datagrams with one sendmmsg() call. Where these calls are not
+    available (anywhere but Linux), both fail with ENOSYS.
+    """
+    cdef gevent_mmsghdr* _msgs
+    cdef gevent_iovec* _iov
+    cdef gevent_sockaddr* _addresses
+    cdef Py_buffer* _views
+    cdef char* _has_view
+    cdef char* _data
+    cdef readonly int family
+    cdef readonly int count
+    cdef readonly long size
+
+    def __init__(self, int family, int count=64, long size=65536):
+        if family != AF_INET and family != AF_INET6:
+            raise ValueError('unsupported address family: %r' % family)
+        if count <= 0 or size <= 0:
+            raise ValueError('count and size must be positive')
+        if count > GEVENT_MMSG_MAX:
+            count = GEVENT_MMSG_MAX
+        self._free()
+        self._msgs = <gevent_mmsghdr*>PyMem_Malloc(count * sizeof(gevent_mmsghdr))
+        self._iov = <gevent_iovec*>PyMem_Malloc(count * sizeof(gevent_iovec))
+        self._addresses = <gevent_sockaddr*>PyMem_Malloc(count * sizeof(gevent_sockaddr))
+        self._views = <Py_buffer*>PyMem_Malloc(count * sizeof(Py_buffer))
+        self._has_view = <char*>PyMem_Malloc(count)
+        self._data = <char*>PyMem_Malloc(count * size)
+        if (self._msgs == NULL or self._iov == NULL or self._addresses == NULL or self._views == NULL or
+            self._has_view == NULL or self._data == NULL):
+            self._free()
+            raise MemoryError()
+        memset(self._msgs, 0, count * sizeof(gevent_mmsghdr))
+        self.family = family
+        self.count = count
+        self.size = size
+
+    cdef _free(self):
+        PyMem_Free(self._msgs)
+        PyMem_Free(self._iov)
+        PyMem_Free(self._addresses)
+        PyMem_Free(self._views)
+        PyMem_Free(self._has_view)
+        PyMem_Free(self._data)
+        self._msgs = NULL
+        self._iov = NULL
+        self._addresses = NULL
+        self._views = NULL
+        self._has_view = NULL
+        self._data = NULL
+        self.count = 0
+
+    def __dealloc__(self):
+        self._free()
+
+    def __repr__(self):
+        return '<%s at 0x%x count=%s size=%s>' % (type(self).__name__, id(self), self.count, self.size)
+
+    cdef object _address(self, int index):
+        cdef char host[64]
+        cdef unsigned long flowinfo = 0
+        cdef unsigned long scope_id = 0
+        cdef long port = gevent_sockaddr_get(&self._addresses[index], host, sizeof(host), &flowinfo, &scope_id)
+        if port < 0:
+            return None
+        if self.family == AF_INET6:
+            return (host, port, <long>flowinfo, <long>scope_id)
+        return (host, port)
+
+    def recv(self, long fd, int flags=0):
+        """recv(fd, flags=0) -> list of (data, address) pairs, or None if the call would block
+
+        Receive the datagrams that are waiting on the nonblocking socket *fd*, up to :attr:`count`
+        of them. A datagram longer than :attr:`size` is truncated, like with recvfrom().
+        Raise :class:`socket.error` on errors other than "would block".
+        """
+        cdef int index, received, err = 0
+        cdef unsigned int length
+        cdef gevent_msghdr* header
+        for index from 0 <= index < self.count:
+            GEVENT_IOV_SET(self._iov[index], self._data + index * self.size, self.size)
+            header = &self._msgs[index].msg_hdr
+            header.msg_name = &self._addresses[index]
+            header.msg_namelen = sizeof(gevent_sockaddr)
+            header.msg_iov = &self._iov[index]
+            header.msg_iovlen = 1
+        received = gevent_recvmmsg(fd, self._msgs, self.count, flags, &err)
+        if received < 0:
+            return _socket_io_error(err)
+        result = []
+        for index from 0 <= index < received:
+            length = self._msgs[index].msg_len
+            if length > self.size:
+                length = self.size
+            result.append((PyString_FromStringAndSize(self._data + index * self.size, length), self._address(index)))
+        return result
+
+    def send(self, long fd, object messages, int flags=0):
+        """send(fd, messages, flags=0) -> number of datagrams sent, or None if the call would block
+
+        Send the (data, address) pairs from the list *messages*, up to :attr:`count` of them, to
+        the nonblocking socket *fd*. The address is None on a connected socket. Raise ValueError,
+        before sending anything, if an address does not have a numeric host of the buffer's family.
+        Raise :class:`socket.error` on errors other than "would block".
+        """
+        cdef int index, size, sent = -1, err = 0, acquired = 0, address_length
+        cdef unsigned long flowinfo, scope_id
+        cdef void* buf
+        cdef Py_ssize_t length
+        cdef gevent_msghdr* header
+        if not isinstance(messages, list):
+            # the list keeps the data, and thus the memory referenced by the messages, alive
+            messages = list(messages)
+        size = len(messages)
+        if size > self.count:
+            size = self.count
+        if size == 0:
+            return 0
+        try:
+            for index from 0 <= index < size:
+                data, address = messages[index]
+                header = &self._msgs[index].msg_hdr
+                if address is None:
+                    header.msg_name = NULL
+                    header.msg_namelen = 0
+                else:
+                    flowinfo = scope_id = 0
+                    if len(address) > 2:
+                        flowinfo = address[2]
+                    if len(address) > 3:
+                        scope_id = address[3]
+                    address_length = gevent_sockaddr_set(&self._addresses[index], self.family, address[0], address[1],
+                                                         flowinfo, scope_id)
+                    if address_length < 0:
+                        raise ValueError('not a numeric address of family %s: %r' % (self.family, address))
+                    header.msg_name = &self._addresses[index]
+                    header.msg_namelen = address_length
+                if PyObject_CheckBuffer(data):
+                    PyObject_GetBuffer(data, &self._views[index], PyBUF_SIMPLE)
+                    self._has_view[index] = 1
+                    acquired = index + 1
+                    GEVENT_IOV_SET(self._iov[index], self._views[index].buf, self._views[index].len)
+                else:
+                    self._has_view[index] = 0
+                    acquired = index + 1
+                    PyObject_AsReadBuffer(data, &buf, &length)
+                    GEVENT_IOV_SET(self._iov[index], buf, length)
+                header.msg_iov = &self._iov[index]
+                header.msg_iovlen = 1
+            sent = gevent_sendmmsg(fd, self._msgs, size, flags, &err)
+        finally:
+            for index from 0 <= index < acquired:
+                if self._has_view[index]:
+                    PyBuffer_Release(&self._views[index])
+        if sent < 0:
+            return _socket_io_error(err)
+        return sent
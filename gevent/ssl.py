@@ -20,7 +20,8 @@ except AttributeError:
 
 import sys
 import errno
-from gevent.socket import socket, _fileobject, wait_read, wait_write, timeout_default
+from gevent import core
+from gevent.socket import socket, _socketfile, timeout_default
 from gevent.socket import error as socket_error, EBADF
 
 __implements__ = ['SSLSocket',
@@ -113,7 +114,7 @@ class SSLSocket(socket):
                         raise
                     sys.exc_clear()
                     try:
-                        wait_read(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorReadTimeout, event=self._read_event)
+                        self._wait(core.EV_READ, self.timeout, _SSLErrorReadTimeout)
                     except socket_error, ex:
                         if ex[0] == EBADF:
                             return ''
@@ -124,7 +125,7 @@ class SSLSocket(socket):
                     sys.exc_clear()
                     try:
                         # note: using _SSLErrorReadTimeout rather than _SSLErrorWriteTimeout below is intentional
-                        wait_write(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorReadTimeout, event=self._write_event)
+                        self._wait(core.EV_WRITE, self.timeout, _SSLErrorReadTimeout)
                     except socket_error, ex:
                         if ex[0] == EBADF:
                             return ''
@@ -144,7 +145,7 @@ class SSLSocket(socket):
                         raise
                     sys.exc_clear()
                     try:
-                        wait_read(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorWriteTimeout, event=self._read_event)
+                        self._wait(core.EV_READ, self.timeout, _SSLErrorWriteTimeout)
                     except socket_error, ex:
                         if ex[0] == EBADF:
                             return 0
@@ -154,7 +155,7 @@ class SSLSocket(socket):
                         raise
                     sys.exc_clear()
                     try:
-                        wait_write(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorWriteTimeout, event=self._write_event)
+                        self._wait(core.EV_WRITE, self.timeout, _SSLErrorWriteTimeout)
                     except socket_error, ex:
                         if ex[0] == EBADF:
                             return 0
@@ -192,7 +193,7 @@ class SSLSocket(socket):
                             return 0
                         sys.exc_clear()
                         try:
-                            wait_read(self.fileno(), timeout=timeout, event=self._read_event)
+                            self._wait(core.EV_READ, timeout)
                         except socket_error, ex:
                             if ex[0] == EBADF:
                                 return 0
@@ -202,7 +203,7 @@ class SSLSocket(socket):
                             return 0
                         sys.exc_clear()
                         try:
-                            wait_write(self.fileno(), timeout=timeout, event=self._write_event)
+                            self._wait(core.EV_WRITE, timeout)
                         except socket_error, ex:
                             if ex[0] == EBADF:
                                 return 0
@@ -215,6 +216,23 @@ class SSLSocket(socket):
             return socket.send(self, data, flags, timeout)
     # is it possible for sendall() to send some data without encryption if another end shut down SSL?
 
+    def sendall_iov(self, buffers, flags=0):
+        if self._sslobj:
+            # every buffer has to go through the SSL object anyway
+            for data in buffers:
+                self.sendall(data, flags)
+        else:
+            return socket.sendall_iov(self, buffers, flags)
+
+    def sendfile(self, file, offset=0, count=None):
+        if self._sslobj:
+            # the file has to be encrypted, so it cannot bypass userspace
+            if count is not None and count <= 0:
+                return 0
+            return self._sendfile_use_send(file, offset, count)
+        else:
+            return socket.sendfile(self, file, offset, count)
+
     def sendto(self, *args):
         if self._sslobj:
             raise ValueError("sendto not allowed on instances of %s" %
@@ -255,7 +273,7 @@ class SSLSocket(socket):
                         if self.timeout == 0.0:
                             raise
                         try:
-                            wait_read(self.fileno(), timeout=self.timeout, event=self._read_event)
+                            self._wait(core.EV_READ, self.timeout)
                         except socket_error, ex:
                             if ex[0] == EBADF:
                                 return 0
@@ -266,6 +284,17 @@ class SSLSocket(socket):
         else:
             return socket.recv_into(self, buffer, nbytes, flags)
 
+    def _recv_buffer(self, buffer, size=-1):
+        if self._sslobj:
+            # the data has to be decrypted, so it cannot be received straight into the buffer
+            if size < 0:
+                size = 16384
+            data = self.recv(size)
+            buffer.feed(data)
+            return len(data)
+        else:
+            return socket._recv_buffer(self, buffer, size)
+
     def recvfrom(self, *args):
         if self._sslobj:
             raise ValueError("recvfrom not allowed on instances of %s" %
@@ -315,12 +344,12 @@ class SSLSocket(socket):
                     if self.timeout == 0.0:
                         raise
                     sys.exc_clear()
-                    wait_read(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorHandshakeTimeout, event=self._read_event)
+                    self._wait(core.EV_READ, self.timeout, _SSLErrorHandshakeTimeout)
                 elif ex.args[0] == SSL_ERROR_WANT_WRITE:
                     if self.timeout == 0.0:
                         raise
                     sys.exc_clear()
-                    wait_write(self.fileno(), timeout=self.timeout, timeout_exc=_SSLErrorHandshakeTimeout, event=self._write_event)
+                    self._wait(core.EV_WRITE, self.timeout, _SSLErrorHandshakeTimeout)
                 else:
                     raise
 
@@ -367,7 +396,7 @@ class SSLSocket(socket):
         self._makefile_refs += 1
         # close=True so as to decrement the reference count when done with
         # the file-like object.
-        return _fileobject(self, mode, bufsize, close=True)
+        return _socketfile(self, mode, bufsize, close=True)
 
 
 _SSLErrorReadTimeout = SSLError('The read operation timed out')
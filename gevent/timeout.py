@@ -14,7 +14,7 @@ to arbitrary code.
 """
 
 from gevent import core
-from gevent.hub import getcurrent, _NONE
+from gevent.hub import getcurrent, get_hub, _NONE
 
 __all__ = ['Timeout',
            'with_timeout']
@@ -83,29 +83,40 @@ class Timeout(BaseException):
                 raise # not my timeout
     """
 
-    def __init__(self, seconds=None, exception=None):
+    def __init__(self, seconds=None, exception=None, precise=False):
         self.seconds = seconds
         self.exception = exception
+        self.precise = precise
         self.timer = None
 
     def start(self):
-        """Schedule the timeout."""
+        """Schedule the timeout.
+
+        Unless the timeout was created with ``precise=True`` or expires immediately, it is put on the hub's
+        :class:`timer wheel <gevent.core.timer_wheel>`, which makes starting and cancelling it cheap
+        but lets it expire up to :attr:`Hub.timer_resolution <gevent.hub.Hub.timer_resolution>` seconds late.
+        """
         assert not self.pending, '%r is already started; to restart it, cancel it first' % self
         if self.seconds is None:  # "fake" timeout (never expires)
             self.timer = None
-        elif self.exception is None or self.exception is False:  # timeout that raises self
-            self.timer = core.timer(self.seconds, getcurrent().throw, self)
+            return
+        if self.exception is None or self.exception is False:  # timeout that raises self
+            exception = self
         else:  # regular timeout with user-provided exception
-            self.timer = core.timer(self.seconds, getcurrent().throw, self.exception)
+            exception = self.exception
+        if self.precise or self.seconds <= 0:  # zero timeout must expire on the next loop iteration
+            self.timer = core.timer(self.seconds, getcurrent().throw, exception)
+        else:
+            self.timer = get_hub().timer_wheel.start(self.seconds, getcurrent().throw, exception)
 
     @classmethod
-    def start_new(cls, timeout=None, exception=None):
+    def start_new(cls, timeout=None, exception=None, precise=False):
         """Create a started :class:`Timeout`.
 
         This is a shortcut, the exact action depends on *timeout*'s type:
 
         * If *timeout* is a :class:`Timeout`, then call its :meth:`start` method.
-        * Otherwise, create a new :class:`Timeout` instance, passing (*timeout*, *exception*) as
+        * Otherwise, create a new :class:`Timeout` instance, passing (*timeout*, *exception*, *precise*) as
           arguments, then call its :meth:`start` method.
 
         Returns the :class:`Timeout` instance.
@@ -114,7 +125,7 @@ class Timeout(BaseException):
             if not timeout.pending:
                 timeout.start()
             return timeout
-        timeout = cls(timeout, exception)
+        timeout = cls(timeout, exception, precise)
         timeout.start()
         return timeout
 
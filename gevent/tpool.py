@@ -1,7 +1,6 @@
 
-import os
-import fcntl
 import gevent
+import gevent.hub
 import Queue
 import gevent.event
 from gevent import tlmonkey
@@ -9,41 +8,15 @@ from gevent import tlmonkey
 threading = tlmonkey.import_unpatched("threading")
 
 
-# Simple wrapper to os.pipe() - but sets to non-block
-def _pipe():
-    r, w = os.pipe()
-    fcntl.fcntl(r, fcntl.F_SETFL, os.O_NONBLOCK)
-    fcntl.fcntl(w, fcntl.F_SETFL, os.O_NONBLOCK)
-    return r, w
-
-_core_pipe_read, _core_pipe_write = _pipe()
-
-_hubq = tlmonkey.run_with_unpatched(Queue.Queue)
-
-
-def _core_pipe_read_callback(event, evtype):
-    try:
-        os.read(event.fd, 1)
-    except EnvironmentError:
-        pass
-
-    while 1:
-        try:
-            f, args, kwargs = _hubq.get(block=False)
-        except Queue.Empty:
-            return
-        try:
-            f(*args, **kwargs)
-        except:
-            pass  # XXX: log error
-
-gevent.core.event(gevent.core.EV_READ | gevent.core.EV_PERSIST,
-                  _core_pipe_read, _core_pipe_read_callback).add()
+_hub = gevent.hub.get_hub()
 
 
 def call_in_hub(func, *args, **kwargs):
-    _hubq.put((func, args, kwargs))
-    os.write(_core_pipe_write, " ")
+    """Schedule ``func(*args, **kwargs)`` to be called in the hub of the thread that imported this module.
+
+    Safe to call from any thread.
+    """
+    _hub.call_in_hub(func, *args, **kwargs)
 
 
 class ThreadPool(object):
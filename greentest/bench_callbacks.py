@@ -0,0 +1,40 @@
+"""Benchmarking the cost of scheduling callbacks in the hub.
+
+Compares allocating a core.active_event per callback with appending to the
+hub's callback queue (Hub.run_callback), which is drained by a single libevent event.
+"""
+from time import time
+import gevent
+from gevent import core
+
+N = 100000
+counter = 0
+
+
+def incr():
+    global counter
+    counter += 1
+
+
+def bench(name, schedule):
+    global counter
+    counter = 0
+    start = time()
+    for _ in xrange(N):
+        schedule(incr)
+    scheduled = time()
+    gevent.sleep(0)
+    finished = time()
+    assert counter == N, (counter, N)
+    print '%s: scheduling %.2f microseconds, executing %.2f microseconds per callback' % (
+        name, (scheduled - start) * 1000000.0 / N, (finished - scheduled) * 1000000.0 / N)
+
+
+def main():
+    hub = gevent.hub.get_hub()
+    bench('core.active_event', core.active_event)
+    bench('Hub.run_callback ', hub.run_callback)
+
+
+if __name__ == '__main__':
+    main()
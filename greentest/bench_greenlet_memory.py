@@ -0,0 +1,48 @@
+"""Benchmarking the memory used by Greenlet objects.
+
+Spawns N greenlets that are never linked or joined and reports the growth of
+the resident set size per greenlet while they are waiting to start, including
+the entries of the hub's callback queue that start them.
+"""
+import sys
+import gc
+import gevent
+
+N = 1000000
+# test__benchmarks.py runs every benchmark with "all" and kills the ones that take longer than 10 seconds
+N_ALL = 100000
+
+
+def rss():
+    """Return the resident set size of the process in bytes."""
+    try:
+        statm = open('/proc/self/statm').read().split()
+    except IOError:
+        import resource
+        # ru_maxrss never goes down, which is fine as long as the memory only grows
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    import os
+    return int(statm[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def noop(x):
+    pass
+
+
+def main():
+    count = N
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        count = int(sys.argv[1])
+    elif sys.argv[1:] == ['all']:
+        count = N_ALL
+    gc.collect()
+    start = rss()
+    greenlets = [gevent.spawn(noop, x) for x in xrange(count)]
+    spawned = rss()
+    print '%s greenlets: %.1f bytes per greenlet' % (count, float(spawned - start) / count)
+    gevent.sleep(0)
+    assert greenlets[-1].dead, greenlets[-1]
+
+
+if __name__ == '__main__':
+    main()
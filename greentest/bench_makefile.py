@@ -0,0 +1,52 @@
+#! /usr/bin/env python
+"""Benchmarking the file object of socket.makefile() on header-heavy HTTP requests.
+
+Reads requests of a request line, HEADERS headers and a small body from a socketpair, with
+readline() like pywsgi does, through the standard socket._fileobject and through makefile().
+"""
+import sys
+import time
+import gevent
+from gevent import socket
+
+N = 2000
+HEADERS = 30
+
+request = ('GET /some/path?with=query HTTP/1.1\r\n' +
+           ''.join(['X-Header-%s: some value of the header number %s\r\n' % (x, x) for x in xrange(HEADERS)]) +
+           'Content-Length: 10\r\n\r\n' + 'x' * 10)
+
+
+def writer(sock, count):
+    for _ in xrange(count):
+        sock.sendall(request)
+
+
+def read_requests(fileobj, count):
+    for _ in xrange(count):
+        while fileobj.readline() != '\r\n':
+            pass
+        fileobj.read(10)
+
+
+def bench(name, makefile):
+    reader, writer_sock = socket.socketpair()
+    fileobj = makefile(reader)
+    sender = gevent.spawn(writer, writer_sock, N)
+    start = time.time()
+    read_requests(fileobj, N)
+    delta = time.time() - start
+    sender.get()
+    print '%s: %.2f microseconds per request' % (name, delta * 1000000.0 / N)
+
+
+def main():
+    global N
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        N = int(sys.argv[1])
+    bench('socket._fileobject', lambda sock: socket._fileobject(sock.dup(), 'rb', -1))
+    bench('socket.makefile()  ', lambda sock: sock.makefile('rb', -1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmarking small-message ping-pong over a gevent socket pair.
+
+One greenlet sends a small message and waits for the reply, the other one echoes it back.
+Every recv() on either side is attempted before the data has arrived, so each round trip
+includes two reads that would block.
+"""
+import sys
+from time import time
+import gevent
+from gevent import socket
+
+N = 20000
+MESSAGE = 'x' * 64
+
+
+def echo(sock, count):
+    recv = sock.recv
+    sendall = sock.sendall
+    for _ in xrange(count):
+        sendall(recv(1024))
+
+
+def ping(sock, count):
+    recv = sock.recv
+    sendall = sock.sendall
+    for _ in xrange(count):
+        sendall(MESSAGE)
+        recv(1024)
+
+
+def recv_into_ping(sock, count):
+    recv_into = sock.recv_into
+    sendall = sock.sendall
+    buf = bytearray(1024)
+    for _ in xrange(count):
+        sendall(MESSAGE)
+        recv_into(buf)
+
+
+def bench(client, persistent=False):
+    one, two = socket.socketpair()
+    if persistent:
+        one.setpersistent(True)
+        two.setpersistent(True)
+    start = time()
+    gevent.joinall([gevent.spawn(echo, two, N), gevent.spawn(client, one, N)], raise_error=True)
+    delta = time() - start
+    one.close()
+    two.close()
+    name = client.__name__ + (persistent and ', persistent' or '')
+    print '%-28s %.2f microseconds per round trip' % (name + ':', delta * 1000000.0 / N)
+
+
+def main():
+    for persistent in (False, True):
+        bench(ping, persistent)
+        bench(recv_into_ping, persistent)
+
+
+if __name__ == '__main__':
+    main()
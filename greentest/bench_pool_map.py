@@ -0,0 +1,34 @@
+"""Benchmarking Pool.map() over a lot of cheap items.
+
+Compares the default map(), which spawns a greenlet per item, with the
+chunked map(), where a few worker greenlets process the items in chunks.
+"""
+from time import time
+from gevent.pool import Group, Pool
+
+N = 100000
+
+
+def incr(x):
+    return x + 1
+
+
+def bench(name, pool, chunksize=None):
+    items = range(N)
+    start = time()
+    result = pool.map(incr, items, chunksize)
+    delta = time() - start
+    assert result == [x + 1 for x in items]
+    print '%-36s %.2f microseconds per item' % (name, delta * 1000000.0 / N)
+
+
+def main():
+    bench('Group().map()', Group())
+    bench('Pool(100).map()', Pool(100))
+    for chunksize in (1, 100, 1000):
+        bench('Group().map(chunksize=%s)' % chunksize, Group(), chunksize)
+        bench('Pool(100).map(chunksize=%s)' % chunksize, Pool(100), chunksize)
+
+
+if __name__ == '__main__':
+    main()
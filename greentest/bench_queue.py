@@ -0,0 +1,79 @@
+"""Benchmarking gevent.queue.Queue with producer/consumer pairs.
+
+Each pair has its own queue; the producer puts N items that the consumer gets.
+The queues are unbounded, bounded to one item, or channels (maxsize of zero).
+Then the same items are moved in batches with put_many() and get_many() through
+queues bounded to one batch.
+"""
+import sys
+from time import time
+import gevent
+from gevent.queue import Queue
+
+N = 100000
+BATCH = 100
+
+
+def producer(queue, count):
+    put = queue.put
+    for index in xrange(count):
+        put(index)
+
+
+def consumer(queue, count):
+    get = queue.get
+    for _ in xrange(count):
+        get()
+
+
+def batch_producer(queue, count):
+    put_many = queue.put_many
+    for start in xrange(0, count, BATCH):
+        put_many(xrange(start, min(start + BATCH, count)))
+
+
+def batch_consumer(queue, count):
+    get_many = queue.get_many
+    while count > 0:
+        count -= len(get_many(BATCH))
+
+
+def bench(maxsize, pairs):
+    count = N / pairs
+    greenlets = []
+    start = time()
+    for _ in xrange(pairs):
+        queue = Queue(maxsize)
+        greenlets.append(gevent.spawn(consumer, queue, count))
+        greenlets.append(gevent.spawn(producer, queue, count))
+    gevent.joinall(greenlets, raise_error=True)
+    delta = time() - start
+    print 'Queue(%s), %4s pairs: %.2f microseconds per item' % (maxsize, pairs, delta * 1000000.0 / (count * pairs))
+
+
+def bench_batches(pairs):
+    count = N / pairs
+    greenlets = []
+    start = time()
+    for _ in xrange(pairs):
+        queue = Queue(BATCH)
+        greenlets.append(gevent.spawn(batch_consumer, queue, count))
+        greenlets.append(gevent.spawn(batch_producer, queue, count))
+    gevent.joinall(greenlets, raise_error=True)
+    delta = time() - start
+    print 'Queue(%s), %4s pairs, batches of %s: %.2f microseconds per item' % (BATCH, pairs, BATCH, delta * 1000000.0 / (count * pairs))
+
+
+def main():
+    pairs = [1, 100]
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        pairs = [int(x) for x in sys.argv[1:]]
+    for maxsize in (None, 1, 0):
+        for count in pairs:
+            bench(maxsize, count)
+    for count in pairs:
+        bench_batches(count)
+
+
+if __name__ == '__main__':
+    main()
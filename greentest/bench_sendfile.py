@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+"""Benchmarking socket.sendfile() against reading a file and sending it with sendall().
+
+Both serve the same temporary file to a StreamServer that discards what it receives.
+"""
+import sys
+import time
+import tempfile
+from gevent import socket
+from gevent.server import StreamServer
+
+
+def recvall(socket, addr):
+    while socket.recv(65536):
+        pass
+
+
+def read_and_sendall(conn, file, length):
+    file.seek(0)
+    while True:
+        data = file.read(65536)
+        if not data:
+            break
+        conn.sendall(data)
+
+
+def sendfile(conn, file, length):
+    assert conn.sendfile(file, 0, length) == length
+
+
+def bench(name, function, conn, file, length, N):
+    spent_total = 0
+    for i in range(N):
+        start = time.time()
+        function(conn, file, length)
+        spent_total += time.time() - start
+    print "%s: ~ %.2f MB/s" % (name, length * N / spent_total / 0x100000)
+
+
+def main():
+    N = 10
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        N = int(sys.argv[1])
+    length = 20 * 0x100000
+    file = tempfile.TemporaryFile()
+    file.write("x" * length)
+    file.flush()
+
+    server = StreamServer(("127.0.0.1", 0), recvall)
+    server.start()
+    conn = socket.create_connection((server.server_host, server.server_port))
+    try:
+        bench('read + sendall', read_and_sendall, conn, file, length, N)
+        bench('sendfile      ', sendfile, conn, file, length, N)
+    finally:
+        conn.close()
+        server.stop()
+        file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,51 @@
+"""Benchmarking sleep(0), the cooperative yield.
+
+Compares sleep(0), which waits in the hub's ready queue, with yielding
+through a zero core.timer (what sleep(0) used to do), both for a single
+greenlet and for many greenlets yielding to each other.
+"""
 from time import time
-from gevent import sleep
+import gevent
+from gevent import core
+from gevent.hub import getcurrent, get_hub
 
 N = 10000
+GREENLETS = 1000
+
+
+def timer_sleep0():
+    unique_mark = object()
+    timer = core.timer(0, getcurrent().switch, unique_mark)
+    try:
+        switch_result = get_hub().switch()
+        assert switch_result is unique_mark, switch_result
+    except:
+        timer.cancel()
+        raise
+
+
+def loop(sleep, count):
+    for _ in xrange(count):
+        sleep()
+
+
+def bench(name, sleep):
+    start = time()
+    loop(sleep, N)
+    delta = time() - start
+    print '%s: %.2f microseconds' % (name, delta * 1000000.0 / N)
+    count = N / GREENLETS * 10
+    greenlets = [gevent.spawn(loop, sleep, count) for _ in xrange(GREENLETS)]
+    start = time()
+    gevent.joinall(greenlets)
+    delta = time() - start
+    print '%s with %s greenlets: %.2f microseconds per switch' % (name, GREENLETS, delta * 1000000.0 / (count * GREENLETS))
+
+
+def main():
+    bench('sleep(0)             ', gevent.sleep)
+    bench('core.timer(0) + switch', timer_sleep0)
 
 
-start = time()
-for _ in xrange(N):
-    sleep(0)
-delta = time() - start
-print 'sleep(0): %.1f microseconds' % (delta * 1000000.0 / N)
+if __name__ == '__main__':
+    main()
@@ -63,6 +63,21 @@ def bench_geventraw(options):
     test(spawn_raw, sleep, options.kwargs)
 
 
+def bench_geventpooled(options):
+    import gevent
+    print 'using gevent from %s' % gevent.__file__
+    from gevent import sleep, spawn_pooled
+    from gevent.hub import get_hub
+    # warm up the free-list of worker greenlets, then measure the steady state
+    get_hub().worker_pool_size = N
+    test(spawn_pooled, sleep, options.kwargs)
+    # let the workers finish
+    sleep(0)
+    assert len(get_hub()._idle_workers) == N, len(get_hub()._idle_workers)
+    init()
+    test(spawn_pooled, sleep, options.kwargs)
+
+
 def bench_geventpool(options):
     import gevent
     print 'using gevent from %s' % gevent.__file__
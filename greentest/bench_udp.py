@@ -0,0 +1,50 @@
+#! /usr/bin/env python
+"""Benchmarking batched datagram I/O: recvfrom()/sendto() per datagram against recv_many()/send_many().
+
+Sends N small datagrams over loopback, in rounds that fit into the receiver's socket buffer.
+"""
+import sys
+import time
+from gevent import socket
+
+N = 20000
+ROUND = 200
+
+
+def one_by_one(sender, receiver, address, messages):
+    for data, _address in messages:
+        sender.sendto(data, address)
+    for _ in messages:
+        receiver.recvfrom(1024)
+
+
+def batched(sender, receiver, address, messages):
+    sender.send_many(messages)
+    received = 0
+    while received < len(messages):
+        received += len(receiver.recv_many(1024, 64))
+
+
+def bench(name, function):
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    address = receiver.getsockname()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    messages = [('metric.name.%s:1|c' % x, address) for x in xrange(ROUND)]
+    start = time.time()
+    for _ in xrange(N / ROUND):
+        function(sender, receiver, address, messages)
+    delta = time.time() - start
+    print '%s: %.2f microseconds per datagram' % (name, delta * 1000000.0 / N)
+
+
+def main():
+    global N
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        N = int(sys.argv[1])
+    bench('sendto + recvfrom       ', one_by_one)
+    bench('send_many + recv_many   ', batched)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Benchmarking the wakeup of many greenlets blocked on one primitive.
+
+For each primitive N greenlets block on it and then all of them are woken up:
+the Semaphore is released N times (each release wakes one waiter), the Event
+and the AsyncResult are set once. Every waiter uses a timeout, so it also
+unlinks itself on the way out. The numbers of waiters can be passed as
+arguments, for example: bench_waiters.py 10000 100000
+"""
+import sys
+from time import time
+import gevent
+from gevent.coros import Semaphore
+from gevent.event import Event, AsyncResult
+
+
+def bench_semaphore(count):
+    semaphore = Semaphore(0)
+    waiters = [gevent.spawn(semaphore.acquire, timeout=60) for _ in xrange(count)]
+    gevent.sleep(0)
+    start = time()
+    for _ in xrange(count):
+        semaphore.release()
+    gevent.joinall(waiters)
+    return time() - start
+
+
+def bench_event(count):
+    event = Event()
+    waiters = [gevent.spawn(event.wait, timeout=60) for _ in xrange(count)]
+    gevent.sleep(0)
+    start = time()
+    event.set()
+    gevent.joinall(waiters)
+    return time() - start
+
+
+def bench_asyncresult(count):
+    result = AsyncResult()
+    waiters = [gevent.spawn(result.get, timeout=60) for _ in xrange(count)]
+    gevent.sleep(0)
+    start = time()
+    result.set(1)
+    gevent.joinall(waiters)
+    return time() - start
+
+
+def main():
+    counts = [10000, 30000]
+    if sys.argv[1:] and sys.argv[1].isdigit():
+        counts = [int(x) for x in sys.argv[1:]]
+    for count in counts:
+        for bench in (bench_semaphore, bench_event, bench_asyncresult):
+            delta = bench(count)
+            print '%-18s %6s waiters: %.2f microseconds per waiter' % (bench.__name__[6:], count, delta * 1000000.0 / count)
+
+
+if __name__ == '__main__':
+    main()
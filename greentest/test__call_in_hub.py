@@ -0,0 +1,63 @@
+import greentest
+import gevent
+from gevent import tlmonkey
+from gevent.event import AsyncResult
+threading = tlmonkey.import_unpatched('threading')
+
+
+class Test(greentest.TestCase):
+
+    def test_threads(self):
+        hub = gevent.hub.get_hub()
+        result = AsyncResult()
+        received = []
+        THREADS, CALLS = 4, 1000
+
+        def append(value):
+            received.append(value)
+            if len(received) == THREADS * CALLS:
+                result.set(len(received))
+
+        def submit(index):
+            for count in xrange(CALLS):
+                hub.call_in_hub(append, (index, count))
+
+        threads = [threading.Thread(target=submit, args=(index, )) for index in xrange(THREADS)]
+        for thread in threads:
+            thread.start()
+        assert result.get(timeout=10) == THREADS * CALLS, len(received)
+        for thread in threads:
+            thread.join()
+        for index in xrange(THREADS):
+            assert [count for (thread, count) in received if thread == index] == range(CALLS)
+
+    def test_kwargs(self):
+        result = AsyncResult()
+        gevent.hub.get_hub().call_in_hub(result.set, value='kwargs')
+        assert result.get(timeout=1) == 'kwargs', result.value
+
+    def test_error_is_reported(self):
+        hub = gevent.hub.get_hub()
+        result = AsyncResult()
+
+        def fail():
+            raise ExpectedError('expected error in call_in_hub')
+
+        self.hook_stderr()
+        hub.call_in_hub(fail)
+        hub.call_in_hub(result.set, 'after')
+        assert result.get(timeout=1) == 'after', result.value
+        self.assert_stderr_traceback(ExpectedError('expected error in call_in_hub'))
+        self.assert_stderr('Failed to execute callback <function fail')
+
+    def test_tpool(self):
+        from gevent import tpool
+        assert tpool.spawn(lambda x: x * 2, 21).get(timeout=5) == 42
+
+
+class ExpectedError(Exception):
+    pass
+
+
+if __name__ == '__main__':
+    greentest.main()
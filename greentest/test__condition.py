@@ -0,0 +1,83 @@
+from gevent import monkey; monkey.patch_all()
+import threading
+from gevent.thread import allocate_lock
+threading.Lock = allocate_lock
+import greentest
+import gevent
+from gevent.coros import Condition
+import lock_tests
+
+
+class ConditionAsRLockTests(lock_tests.RLockTests):
+    # a Condition uses an RLock by default and exports its API
+    locktype = staticmethod(Condition)
+
+
+class ConditionTests(lock_tests.ConditionTests):
+    condtype = staticmethod(Condition)
+
+
+class TestCondition(greentest.TestCase):
+
+    def test_notify_order(self):
+        cond = Condition()
+        woken = []
+
+        def waiter(index):
+            cond.acquire()
+            try:
+                cond.wait()
+                woken.append(index)
+            finally:
+                cond.release()
+
+        greenlets = [gevent.spawn(waiter, index) for index in xrange(5)]
+        gevent.sleep(0)
+        cond.acquire()
+        cond.notify(2)
+        cond.release()
+        gevent.sleep(0)
+        self.assertEqual(woken, [0, 1])
+        cond.acquire()
+        cond.notify_all()
+        cond.release()
+        gevent.joinall(greenlets)
+        self.assertEqual(woken, [0, 1, 2, 3, 4])
+
+    def test_wait_returns(self):
+        cond = Condition()
+        cond.acquire()
+        assert cond.wait(0.01) is False
+
+        def notify():
+            cond.acquire()
+            cond.notify()
+            cond.release()
+
+        gevent.spawn(notify)
+        assert cond.wait(1) is True
+        cond.release()
+        assert not cond._waiters, cond
+
+    def test_wait_for(self):
+        cond = Condition()
+        state = []
+
+        def change():
+            for x in xrange(3):
+                gevent.sleep(0.001)
+                cond.acquire()
+                state.append(x)
+                cond.notify_all()
+                cond.release()
+
+        gevent.spawn(change)
+        cond.acquire()
+        assert cond.wait_for(lambda: len(state) == 3, 1)
+        assert not cond.wait_for(lambda: len(state) == 4, 0.01)
+        assert not cond.wait_for(lambda: False, 0)
+        cond.release()
+
+
+if __name__ == '__main__':
+    greentest.main()
@@ -0,0 +1,61 @@
+import gevent
+
+called = []
+
+
+def f(*args):
+    called.append(args)
+
+x = gevent.core.callback(f, 1)
+assert x.pending == 0, x.pending
+x.start()
+assert x.pending == 1, x.pending
+x.start()
+assert x.pending == 1, x.pending
+gevent.sleep(0)
+assert x.pending == 0, x.pending
+assert called == [(1, )], called
+
+# the same instance can be scheduled again
+x.start()
+assert x.pending == 1, x.pending
+gevent.sleep(0)
+assert x.pending == 0, x.pending
+assert called == [(1, ), (1, )], called
+
+x.start()
+x.cancel()
+assert x.pending == 0, x.pending
+gevent.sleep(0)
+assert called == [(1, ), (1, )], called
+
+hub = gevent.hub.get_hub()
+del called[:]
+first = hub.run_callback(f, 'first')
+second = hub.run_callback(f, 'second')
+third = hub.run_callback(f, 'third')
+assert first.pending and second.pending and third.pending
+second.cancel()
+assert not second.pending
+gevent.sleep(0)
+assert called == [('first', ), ('third', )], called
+assert not first.pending and not third.pending
+
+# a callback that keeps rescheduling itself must not starve the timers
+queue = gevent.core.callback_queue(5)
+timer_fired = []
+spins = []
+
+
+def spin():
+    spins.append(1)
+    if not timer_fired:
+        queue.append(spin, ())
+
+gevent.core.timer(0, timer_fired.append, 1)
+queue.append(spin, ())
+assert len(queue) == 1, len(queue)
+gevent.sleep(0.01)
+assert timer_fired == [1], timer_fired
+assert len(queue) == 0, len(queue)
+assert len(spins) > 1, spins
@@ -0,0 +1,178 @@
+import array
+import greentest
+import gevent
+from gevent import core, socket
+from errno import EBADF, EAGAIN, EWOULDBLOCK, ENOSYS
+from StringIO import StringIO
+
+
+class Test(greentest.TestCase):
+
+    switch_expected = False
+
+    def setUp(self):
+        greentest.TestCase.setUp(self)
+        self.reader, self.writer = socket.socketpair()
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        greentest.TestCase.tearDown(self)
+
+    def test_recv(self):
+        fileno = self.reader.fileno()
+        assert core.recv(fileno, 10) is None
+        self.writer.sendall('hello')
+        assert core.recv(fileno, 3) == 'hel'
+        assert core.recv(fileno, 10) == 'lo'
+        assert core.recv(fileno, 10) is None
+        self.writer.close()
+        assert core.recv(fileno, 10) == ''
+
+    def test_recv_into(self):
+        fileno = self.reader.fileno()
+        buf = bytearray(10)
+        assert core.recv_into(fileno, buf) is None
+        self.writer.sendall('hello')
+        assert core.recv_into(fileno, buf, 2) == 2
+        assert core.recv_into(fileno, memoryview(buf)[2:]) == 3
+        assert buf[:5] == 'hello', buf
+        self.writer.sendall('abc')
+        arr = array.array('c', 'xxxx')
+        assert core.recv_into(fileno, arr) == 3
+        assert arr.tostring() == 'abcx', arr
+        self.assertRaises(ValueError, core.recv_into, fileno, buf, 11)
+
+    def test_send(self):
+        fileno = self.writer.fileno()
+        assert core.send(fileno, 'hello') == 5
+        assert core.send(fileno, buffer('hello', 3)) == 2
+        assert core.send(fileno, memoryview('abc')[1:]) == 2
+        assert self.reader.recv(100) == 'hellolobc'
+        data = 'x' * 65536
+        total = 0
+        while True:
+            count = core.send(fileno, data)
+            if count is None:
+                break
+            total += count
+        assert total > 0, total
+
+    def test_sendv(self):
+        fileno = self.writer.fileno()
+        assert core.sendv(fileno, []) == 0
+        buffers = ['ab', buffer('xcd', 1), memoryview('ef'), bytearray('gh'), '']
+        assert core.sendv(fileno, buffers) == 8
+        assert core.sendv(fileno, ('i', 'j')) == 2
+        assert self.reader.recv(100) == 'abcdefghij'
+        self.assertRaises(TypeError, core.sendv, fileno, ['a', 1])
+        total = 0
+        while True:
+            count = core.sendv(fileno, ['x' * 1000] * 100)
+            if count is None:
+                break
+            total += count
+        assert total > 0, total
+
+    def test_sendfile(self):
+        fileno = self.writer.fileno()
+        file = open(__file__, 'rb')
+        try:
+            data = file.read()
+            try:
+                count = core.sendfile(fileno, file.fileno(), 5, 10)
+            except socket.error, ex:
+                if ex[0] != ENOSYS:
+                    raise
+                return
+            assert count == 10, count
+            assert self.reader.recv(100) == data[5:15]
+            assert file.tell() == len(data), file.tell()
+            assert core.sendfile(fileno, file.fileno(), len(data), 10) == 0
+            self.assertRaises(ValueError, core.sendfile, fileno, file.fileno(), -1, 10)
+        finally:
+            file.close()
+
+    def test_error(self):
+        try:
+            core.recv(-1, 10)
+        except socket.error, ex:
+            assert ex[0] == EBADF, ex
+        else:
+            raise AssertionError('must raise socket.error')
+
+    def test_nonblocking_socket(self):
+        self.reader.setblocking(0)
+        try:
+            self.reader.recv(10)
+        except socket.error, ex:
+            assert ex[0] in (EWOULDBLOCK, EAGAIN), ex
+        else:
+            raise AssertionError('must raise socket.error')
+        self.writer.sendall('x')
+        assert self.reader.recv(10) == 'x'
+
+
+class TestSendallIOV(greentest.TestCase):
+
+    def test_partial_writes(self):
+        reader, writer = socket.socketpair()
+        buffers = ['%s\n' % index * 1000 for index in xrange(300)] + [u'end']
+        expected = ''.join(buffers)
+        receiver = gevent.spawn(self._read_all, reader)
+        # more than the socket buffers hold, so sendall_iov has to wait and resume in the middle of a buffer
+        writer.sendall_iov(buffers)
+        writer.close()
+        assert receiver.get() == expected, len(receiver.value)
+
+    def test_many_buffers(self):
+        reader, writer = socket.socketpair()
+        buffers = [str(index % 10) for index in xrange(core.IOV_MAX * 3 + 1)]
+        receiver = gevent.spawn(self._read_all, reader)
+        writer.sendall_iov(buffers)
+        writer.close()
+        assert receiver.get() == ''.join(buffers)
+
+    def test_timeout(self):
+        reader, writer = socket.socketpair()
+        writer.settimeout(0.05)
+        self.assertRaises(socket.timeout, writer.sendall_iov, ['x' * 1000000, 'y'])
+
+    def test_nonblocking(self):
+        self.switch_expected = False
+        reader, writer = socket.socketpair()
+        writer.setblocking(0)
+        self.assertRaises(socket.error, writer.sendall_iov, ['x' * 1000000])
+
+    def test_sendfile(self):
+        reader, writer = socket.socketpair()
+        file = open(__file__, 'rb')
+        data = file.read()
+        receiver = gevent.spawn(self._read_all, reader)
+        assert writer.sendfile(file, 3) == len(data) - 3
+        assert writer.sendfile(file, 0, 10) == 10
+        assert file.tell() == 10, file.tell()
+        assert writer.sendfile(file, 0, 0) == 0
+        writer.close()
+        assert receiver.get() == data[3:] + data[:10]
+
+    def test_sendfile_fallback(self):
+        reader, writer = socket.socketpair()
+        file = StringIO('x' * 200000)
+        receiver = gevent.spawn(self._read_all, reader)
+        assert writer.sendfile(file, 5, 100000) == 100000
+        assert file.tell() == 100005, file.tell()
+        writer.close()
+        assert receiver.get() == 'x' * 100000
+
+    def _read_all(self, sock):
+        result = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return ''.join(result)
+            result.append(data)
+
+
+if __name__ == '__main__':
+    greentest.main()
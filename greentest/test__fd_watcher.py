@@ -0,0 +1,171 @@
+import greentest
+import gevent
+from gevent import core, socket
+DELAY = 0.05
+
+
+def _record(watcher, evtype, arg):
+    arg.append(evtype)
+
+
+class TestWatcher(greentest.TestCase):
+
+    def setUp(self):
+        greentest.TestCase.setUp(self)
+        self.reader, self.writer = socket.socketpair()
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        greentest.TestCase.tearDown(self)
+
+    def test_read_and_write(self):
+        watcher = core.fd_watcher(self.reader.fileno(), _record)
+        read, write = [], []
+        watcher.start(core.EV_READ, read)
+        watcher.start(core.EV_WRITE, write)
+        assert watcher.reading and watcher.writing, watcher
+        gevent.sleep(DELAY)
+        # a socket is writable at once, but there is nothing to read yet
+        assert write == [core.EV_WRITE], write
+        assert read == [], read
+        assert watcher.reading and not watcher.writing, watcher
+        self.writer.sendall('x')
+        gevent.sleep(DELAY)
+        assert read == [core.EV_READ], read
+        assert not watcher.pending, watcher
+
+    def test_already_waiting(self):
+        self.switch_expected = False
+        watcher = core.fd_watcher(self.reader.fileno(), _record)
+        watcher.start(core.EV_READ, [])
+        self.assertRaises(ValueError, watcher.start, core.EV_READ, [])
+        self.assertRaises(ValueError, watcher.start, core.EV_READ | core.EV_WRITE, [])
+        watcher.stop(core.EV_READ)
+        assert not watcher.pending, watcher
+
+    def test_timeout(self):
+        watcher = core.fd_watcher(self.reader.fileno(), _record)
+        short, long = [], []
+        watcher.start(core.EV_READ, short, DELAY)
+        watcher.start(core.EV_WRITE, long, 10)
+        watcher.stop(core.EV_WRITE)
+        gevent.sleep(DELAY * 2)
+        assert short == [core.EV_TIMEOUT], short
+        assert long == [], long
+        assert not watcher.pending, watcher
+
+    def test_joint(self):
+        watcher = core.fd_watcher(self.reader.fileno(), _record)
+        result = []
+        watcher.start(core.EV_READ | core.EV_WRITE, result)
+        gevent.sleep(DELAY)
+        assert result == [core.EV_WRITE], result
+        assert not watcher.reading and not watcher.writing, watcher
+        assert not watcher.pending, watcher
+
+
+class TestSocket(greentest.TestCase):
+
+    def test_one_watcher(self):
+        reader, writer = socket.socketpair()
+        assert reader._watcher is None, reader._watcher
+        receiver = gevent.spawn(reader.recv, 10)
+        gevent.sleep(0)
+        watcher = reader._watcher
+        assert watcher.reading, watcher
+        # the writes of a socket that is also being read from use the same watcher
+        reader.sendall('y')
+        assert writer.recv(10) == 'y'
+        writer.sendall('x')
+        assert receiver.get() == 'x', receiver.value
+        assert reader._watcher is watcher
+        assert not watcher.pending, watcher
+
+    def test_close_wakes_up_reader(self):
+        reader, writer = socket.socketpair()
+        receiver = gevent.spawn(reader.recv, 10)
+        gevent.sleep(0)
+        reader.close()
+        assert receiver.get(timeout=1) == '', receiver
+
+
+class TestPersistent(greentest.TestCase):
+
+    def setUp(self):
+        greentest.TestCase.setUp(self)
+        self.reader, self.writer = socket.socketpair()
+        self.reader.setpersistent(True)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        greentest.TestCase.tearDown(self)
+
+    def test_watcher(self):
+        watcher = core.fd_watcher(self.reader.fileno(), _record, persist=True)
+        result = []
+        watcher.start(core.EV_READ, result)
+        gevent.sleep(DELAY)
+        assert result == [], result
+        assert watcher.writable and not watcher.readable, watcher
+        self.writer.sendall('x')
+        gevent.sleep(DELAY)
+        assert result == [core.EV_READ], result
+        assert watcher.readable, watcher
+        # still registered, but does not reference itself without the waiters
+        assert watcher.pending, watcher
+        watcher.cancel()
+        assert not watcher.pending, watcher
+
+    def test_recv(self):
+        receiver = gevent.spawn(self.reader.recv, 10)
+        gevent.sleep(DELAY)
+        watcher = self.reader._watcher
+        assert watcher.persist, watcher
+        self.writer.sendall('hello')
+        assert receiver.get() == 'hello', receiver.value
+        for index in xrange(10):
+            receiver = gevent.spawn(self.reader.recv, 10)
+            gevent.sleep(0)
+            self.writer.sendall(str(index))
+            assert receiver.get() == str(index), (receiver.value, index)
+        assert self.reader._watcher is watcher
+        assert watcher.pending, watcher
+
+    def test_timeout(self):
+        self.reader.settimeout(DELAY)
+        self.assertRaises(socket.timeout, self.reader.recv, 10)
+        self.writer.sendall('x')
+        assert self.reader.recv(10) == 'x'
+        self.assertRaises(socket.timeout, self.reader.recv, 10)
+
+    def test_close_wakes_up_reader(self):
+        receiver = gevent.spawn(self.reader.recv, 10)
+        gevent.sleep(0)
+        watcher = self.reader._watcher
+        self.reader.close()
+        assert receiver.get(timeout=1) == '', receiver
+        assert not watcher.pending, watcher
+
+    def test_dup(self):
+        self.switch_expected = False
+        assert self.reader.dup().getpersistent()
+        fileobj = self.reader.makefile()
+        self.writer.sendall('line\n')
+        assert fileobj.readline() == 'line\n'
+        fileobj.close()
+
+    def test_setpersistent(self):
+        self.switch_expected = False
+        self.reader.setpersistent(False)
+        assert not self.reader.getpersistent()
+        self.writer.sendall('x')
+        assert self.reader.recv(10) == 'x'
+
+if not core.EV_ET:
+    del TestPersistent
+
+
+if __name__ == '__main__':
+    greentest.main()
@@ -519,6 +519,31 @@ class TestStr(greentest.TestCase):
         self.assertEqual(str_g, '<Greenlet at X: <bound method A.method of <module.A object at X>>>')
 
 
+class TestCompact(greentest.TestCase):
+
+    def test_lazy_links(self):
+        g = gevent.spawn(test_func)
+        assert g._links is None, g._links
+        g.unlink(lambda x: None)
+        g.join()
+        assert_ready(g)
+        assert g.args == () and g.kwargs == {}, (g.args, g.kwargs)
+
+    def test_subclass_run(self):
+
+        class MyGreenlet(gevent.Greenlet):
+            extra = None
+
+            def _run(self, value):
+                self.extra = value
+                return value
+
+        g = MyGreenlet.spawn(None, 5)
+        self.assertEqual(hexobj.sub('X', str(g)), '<MyGreenlet at X>')
+        assert g.get() == 5, g.value
+        assert g.extra == 5, g.extra
+
+
 class TestJoin(greentest.GenericWaitTestCase):
 
     def wait(self, timeout):
@@ -0,0 +1,141 @@
+import os
+import thread
+import time
+import greentest
+import gevent
+from gevent import core, socket
+from gevent.hub import get_hub
+DELAY = 0.1
+
+
+def run_in_thread(function, *args):
+    result = []
+    done = thread.allocate_lock()
+    done.acquire()
+
+    def wrapper():
+        try:
+            result.append(function(*args))
+        except Exception, ex:
+            result.append(ex)
+        done.release()
+
+    thread.start_new_thread(wrapper, ())
+    return result, done
+
+
+class Test(greentest.TestCase):
+
+    def test_own_hub(self):
+        self.switch_expected = False
+
+        def job():
+            hub = get_hub()
+            return hub, hub.loop, core.get_loop()
+
+        result, done = run_in_thread(job)
+        done.acquire()
+        hub, loop, current_loop = result[0]
+        assert hub is not get_hub(), hub
+        assert loop is current_loop, (loop, current_loop)
+        assert not loop.default, loop
+        assert get_hub().loop.default, get_hub().loop
+        assert core.get_loop() is get_hub().loop
+
+    def test_concurrent(self):
+        # the loops run at the same time: each of them releases the GIL while polling
+
+        def job():
+            reader, writer = socket.socketpair()
+            receiver = gevent.spawn(reader.recv, 10)
+            gevent.sleep(DELAY)
+            writer.sendall('hello')
+            return receiver.get(timeout=1)
+
+        start = time.time()
+        threads = [run_in_thread(job) for _ in xrange(3)]
+        gevent.sleep(DELAY)
+        for result, done in threads:
+            done.acquire()
+            assert result == ['hello'], result
+        delta = time.time() - start
+        assert delta < DELAY * 3, delta
+
+    def test_wrong_thread(self):
+        self.switch_expected = False
+        loop = get_hub().loop
+        result, done = run_in_thread(loop.loop, True)
+        done.acquire()
+        assert isinstance(result[0], RuntimeError), result
+
+    def test_dns_wrong_thread(self):
+        self.switch_expected = False
+        result, done = run_in_thread(core.dns_resolve_ipv4, 'localhost', 0, lambda *args: None)
+        done.acquire()
+        assert isinstance(result[0], RuntimeError), result
+
+    def test_thread_exit_releases_loop(self):
+        self.switch_expected = False
+        if not os.path.isdir('/proc/self/fd'):
+            return
+
+        def job():
+            reader, writer = socket.socketpair()
+            get_hub().call_in_hub(writer.sendall, 'x')
+            gevent.spawn_later(10, lambda: None)
+            result = reader.recv(1)
+            # the thread leaves its hub and a pending timer behind
+            return result, get_hub().loop
+
+        def count_fds():
+            # the descriptors are closed in the thread-exit hook, after the job has returned
+            time.sleep(DELAY)
+            return len(os.listdir('/proc/self/fd'))
+
+        loops = []
+        for index in xrange(30):
+            result, done = run_in_thread(job)
+            done.acquire()
+            assert result[0][0] == 'x', result
+            loops.append(result[0][1])
+            if index == 0:
+                before = count_fds()
+        after = count_fds()
+        assert after == before, (before, after)
+        for loop in loops:
+            assert loop.destroyed, loop
+
+    def test_destroy(self):
+        self.switch_expected = False
+
+        def job():
+            hub = get_hub()
+            loop = hub.loop
+            timer = core.timer(10, lambda: None)
+            hub.destroy()
+            assert loop.destroyed, loop
+            assert not timer.pending, timer
+            try:
+                hub.call_in_hub(lambda: None)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('call_in_hub() must fail after destroy()')
+            new_hub = get_hub()
+            assert new_hub is not hub, new_hub
+            assert new_hub.loop is core.get_loop(), (new_hub.loop, core.get_loop())
+            assert not new_hub.loop.destroyed, new_hub.loop
+            gevent.sleep(0.01)
+            return True
+
+        result, done = run_in_thread(job)
+        done.acquire()
+        assert result == [True], result
+
+    def test_destroy_default(self):
+        self.switch_expected = False
+        self.assertRaises(RuntimeError, get_hub().loop.destroy)
+
+
+if __name__ == '__main__':
+    greentest.main()
@@ -0,0 +1,85 @@
+import greentest
+import gevent
+from gevent.hub import _Links
+from gevent.coros import Semaphore
+from gevent.event import Event, AsyncResult
+
+
+class TestLinks(greentest.TestCase):
+
+    switch_expected = False
+
+    def test_order(self):
+        links = _Links()
+        for x in 'abcab':
+            links.append(x)
+        assert len(links) == 5, links
+        assert list(links) == list('abcab'), links
+        # removes the oldest link of the callback, like list.remove
+        assert links.remove('a')
+        assert list(links) == list('bcab'), links
+        assert links.popleft() == 'b'
+        assert links.popleft() == 'c'
+        assert 'b' in links and 'c' not in links, links
+        assert not links.remove('c')
+        assert list(links) == list('ab'), links
+        links.remove('b')
+        links.remove('a')
+        assert not links and len(links) == 0, links
+        self.assertRaises(IndexError, links.popleft)
+
+    def test_change_while_iterating(self):
+        links = _Links()
+        for x in range(5):
+            links.append(x)
+        seen = []
+        for x in links:
+            seen.append(x)
+            if x == 1:
+                links.remove(1)
+                links.remove(2)
+                links.append(5)
+        assert seen == [0, 1, 3, 4], seen
+        assert list(links) == [0, 3, 4, 5], links
+
+
+class TestFairness(greentest.TestCase):
+
+    def test_semaphore(self):
+        s = Semaphore(0)
+        order = []
+
+        def waiter(index):
+            s.acquire()
+            order.append(index)
+
+        greenlets = [gevent.spawn(waiter, index) for index in xrange(10)]
+        gevent.sleep(0)
+        greenlets[3].kill()
+        for _ in xrange(9):
+            s.release()
+        gevent.joinall(greenlets)
+        assert order == [0, 1, 2, 4, 5, 6, 7, 8, 9], order
+        assert not s._links, s._links
+
+    def test_event_many_waiters(self):
+        event = Event()
+        greenlets = [gevent.spawn(event.wait, 10) for _ in xrange(1000)]
+        gevent.sleep(0)
+        assert len(event._links) == 1000, len(event._links)
+        event.set()
+        gevent.joinall(greenlets)
+        assert not event._links, event._links
+
+    def test_asyncresult_order(self):
+        result = AsyncResult()
+        order = []
+        for index in xrange(5):
+            result.rawlink(lambda r, index=index: order.append(index))
+        result.set()
+        gevent.sleep(0)
+        assert order == range(5), order
+
+
+if __name__ == '__main__':
+    greentest.main()
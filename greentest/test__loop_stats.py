@@ -0,0 +1,78 @@
+import time
+import greentest
+import gevent
+from gevent.hub import get_hub
+DELAY = 0.05
+
+
+class TestStats(greentest.TestCase):
+
+    def tearDown(self):
+        get_hub().disable_stats()
+        greentest.TestCase.tearDown(self)
+
+    def test_stats(self):
+        hub = get_hub()
+        hub.enable_stats(16)
+        gevent.sleep(DELAY)
+        gevent.spawn(time.sleep, DELAY).join()
+        # only the finished iterations are recorded
+        gevent.sleep(DELAY)
+        gevent.sleep(DELAY)
+        stats = hub.get_stats()
+        assert 0 < len(stats) <= 16, stats
+        for started, polling, running, events, longest in stats:
+            assert started > 0, stats
+            assert polling >= 0 and running >= 0 and longest <= running, stats
+        # the iteration that ran time.sleep() spent its time in a callback, not polling
+        assert max(longest for _, _, _, _, longest in stats) >= DELAY * 0.9, stats
+        assert sum(events for _, _, _, events, _ in stats) > 0, stats
+
+    def test_ring_buffer(self):
+        hub = get_hub()
+        hub.enable_stats(2)
+        for _ in xrange(10):
+            gevent.sleep(0.001)
+        assert len(hub.get_stats()) == 2, hub.get_stats()
+
+    def test_disabled(self):
+        self.switch_expected = False
+        get_hub().disable_stats()
+        assert get_hub().get_stats() == []
+        self.assertRaises(ValueError, get_hub().enable_stats, 0)
+
+
+def block(seconds):
+    time.sleep(seconds)
+
+
+class TestWatchdog(greentest.TestCase):
+
+    def tearDown(self):
+        get_hub().stop_watchdog()
+        greentest.TestCase.tearDown(self)
+
+    def test_report(self):
+        reports = []
+        hub = get_hub()
+        hub.start_watchdog(DELAY, lambda *args: reports.append(args))
+        blocker = gevent.spawn(block, DELAY * 4)
+        blocker.join()
+        gevent.sleep(DELAY)
+        assert len(reports) == 1, reports
+        greenlet, seconds, stack = reports[0]
+        assert seconds >= DELAY, reports
+        assert 'in block' in stack, stack
+        if greenlet is not None:
+            assert greenlet is blocker, (greenlet, blocker)
+
+    def test_no_report(self):
+        reports = []
+        get_hub().start_watchdog(DELAY * 2, lambda *args: reports.append(args))
+        for _ in xrange(5):
+            gevent.sleep(DELAY)
+        assert reports == [], reports
+
+
+if __name__ == '__main__':
+    greentest.main()
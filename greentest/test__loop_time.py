@@ -0,0 +1,33 @@
+import time
+import gevent
+from gevent import core
+
+hub = gevent.hub.get_hub()
+
+# the clock is cached: it does not move until the loop runs another iteration
+now = hub.now()
+walltime = hub.walltime()
+time.sleep(0.02)
+assert hub.now() == now, (hub.now(), now)
+assert hub.walltime() == walltime, (hub.walltime(), walltime)
+assert abs(walltime - time.time()) < 1, (walltime, time.time())
+
+gevent.sleep(0.02)
+assert hub.now() - now >= 0.03, (hub.now(), now)
+assert hub.walltime() - walltime >= 0.03, (hub.walltime(), walltime)
+assert core.now() == hub.now()
+assert core.walltime() == hub.walltime()
+
+# a callback that runs in a later iteration sees the updated value
+seen = []
+core.timer(0.01, lambda: seen.append(core.now()))
+start = core.now()
+gevent.sleep(0.02)
+assert len(seen) == 1, seen
+assert seen[0] - start >= 0.005, (seen, start)
+
+# format_date_time caches the formatted value for the current second
+from gevent.pywsgi import format_date_time
+assert format_date_time(0) == 'Thu, 01 Jan 1970 00:00:00 GMT', format_date_time(0)
+assert format_date_time(0.5) == 'Thu, 01 Jan 1970 00:00:00 GMT', format_date_time(0.5)
+assert format_date_time(1) == 'Thu, 01 Jan 1970 00:00:01 GMT', format_date_time(1)
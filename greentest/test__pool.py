@@ -1,6 +1,7 @@
 from time import time
+import itertools
 import gevent
-from gevent import pool
+from gevent import core, pool
 from gevent.event import Event
 import greentest
 
@@ -182,6 +183,10 @@ def sqr(x, wait=0.0):
 TIMEOUT1, TIMEOUT2, TIMEOUT3 = 0.082, 0.035, 0.14
 
 
+class ExpectedError(Exception):
+    pass
+
+
 class TestPool(greentest.TestCase):
     size = 1
 
@@ -201,6 +206,22 @@ class TestPool(greentest.TestCase):
         self.assertEqual(pmap(sqr, range(10)), map(sqr, range(10)))
         self.assertEqual(pmap(sqr, range(100)), map(sqr, range(100)))
 
+    def test_map_chunksize(self):
+        pmap = self.pool.map
+        self.assertEqual(pmap(sqr, range(10), chunksize=3), map(sqr, range(10)))
+        self.assertEqual(pmap(sqr, xrange(100), chunksize=1), map(sqr, range(100)))
+        self.assertEqual(pmap(sqr, [], chunksize=10), [])
+        self.assertRaises(ValueError, pmap, sqr, range(10), chunksize=0)
+
+    def test_map_chunksize_error(self):
+        self.hook_stderr()
+
+        def divide(x):
+            return 10 / x
+
+        self.assertRaises(ZeroDivisionError, self.pool.map, divide, [5, 2, 0, 1] * 10, chunksize=4)
+        self.unhook_stderr()
+
     def test_async(self):
         res = self.pool.apply_async(sqr, (7, TIMEOUT1,))
         get = TimingWrapper(res.get)
@@ -243,6 +264,66 @@ class TestPool(greentest.TestCase):
         it = self.pool.imap_unordered(sqr, range(1000))
         self.assertEqual(sorted(it), map(sqr, range(1000)))
 
+    def test_imap_lazy(self):
+        consumed = []
+
+        def numbers():
+            for x in itertools.count():
+                consumed.append(x)
+                yield x
+
+        it = self.pool.imap(sqr, numbers(), maxsize=5)
+        self.assertEqual([it.next() for _ in range(10)], map(sqr, range(10)))
+        gevent.sleep(0.01)
+        # the results that were not consumed yet stop the input
+        assert len(consumed) <= 15, len(consumed)
+
+    def test_imap_infinite(self):
+        consumed = []
+
+        def numbers():
+            for x in itertools.count():
+                consumed.append(x)
+                yield x
+
+        it = self.pool.imap(sqr, numbers())
+        self.assertEqual([it.next() for _ in range(10)], map(sqr, range(10)))
+        gevent.sleep(0.01)
+        maxsize = self.size or pool.Group.imap_maxsize
+        assert len(consumed) <= maxsize + 10, len(consumed)
+        it.kill()
+
+    def test_imap_order(self):
+        delays = [0.05, 0.01, 0.03, 0.0, 0.02]
+        it = self.pool.imap(lambda x: sqr(x, delays[x]), range(5))
+        self.assertEqual(list(it), map(sqr, range(5)))
+
+    def test_imap_error(self):
+        self.hook_stderr()
+
+        def divide(x):
+            return 10 / x
+
+        it = self.pool.imap(divide, [5, 0, 2])
+        self.assertEqual(it.next(), 2)
+        self.assertRaises(ZeroDivisionError, it.next)
+        self.assertEqual(list(it), [5])
+        self.unhook_stderr()
+
+    def test_imap_unordered_error_in_input(self):
+
+        def numbers():
+            yield 1
+            yield 2
+            raise ExpectedError('expected')
+
+        self.hook_stderr()
+        it = self.pool.imap_unordered(sqr, numbers())
+        self.assertEqual(sorted([it.next(), it.next()]), [1, 4])
+        self.assertRaises(ExpectedError, it.next)
+        self.assertRaises(StopIteration, it.next)
+        self.unhook_stderr()
+
     def test_terminate(self):
         result = self.pool.map_async(gevent.sleep, [0.1] * 1000)
         kill = TimingWrapper(self.pool.kill)
@@ -266,6 +347,58 @@ class TestPoolUnlimit(TestPool):
     size = None
 
 
+class TestGroupImap(greentest.TestCase):
+
+    def test_imap_infinite(self):
+        consumed = []
+
+        def numbers():
+            for x in itertools.count():
+                consumed.append(x)
+                yield x
+
+        group = pool.Group()
+        for imap in (group.imap, group.imap_unordered):
+            del consumed[:]
+            it = imap(sqr, numbers())
+            it.next()
+            gevent.sleep(0.01)
+            assert len(consumed) <= group.imap_maxsize + 1, len(consumed)
+            it.kill()
+            group.kill()
+
+
+class TestSubmit(greentest.TestCase):
+
+    def test_priority(self):
+        p = pool.Pool(1)
+        started = []
+        p.spawn(gevent.sleep, 0.01)
+        for priority in [5, 1, 3, 1]:
+            gevent.spawn(p.submit, started.append, (priority, ), priority=priority)
+        gevent.sleep(0.05)
+        self.assertEqual(started, [1, 1, 3, 5])
+
+    def test_deadline(self):
+        p = pool.Pool(1)
+        started = []
+        p.spawn(gevent.sleep, 0.1)
+        deadline = core.now() + 0.02
+        self.assertEqual(p.submit(started.append, (1, ), deadline=deadline), None)
+        assert core.now() < deadline + 0.05, core.now() - deadline
+        self.assertEqual(p.submit(started.append, (2, ), deadline=core.now() - 1), None)
+        self.assertEqual(p.dropped, 2)
+        p.join()
+        self.assertEqual(started, [])
+
+    def test_unlimited(self):
+        p = pool.Pool()
+        greenlet = p.submit(sqr, (3, ), deadline=core.now() + 1)
+        self.assertEqual(greenlet.get(), 9)
+        self.assertEqual(p.submit(sqr, (3, ), deadline=core.now() - 1), None)
+        self.assertEqual(p.dropped, 1)
+
+
 class TestJoinSleep(greentest.GenericWaitTestCase):
 
     def wait(self, timeout):
@@ -22,9 +22,11 @@ from gevent import monkey
 monkey.patch_all(thread=False)
 
 import cgi
+from StringIO import StringIO
 import os
 import urllib2
 import sys
+import time
 try:
     from wsgiref.validate import validator
 except ImportError:
@@ -654,6 +656,69 @@ class TestEmptyWrite(TestEmptyYield):
         return []
 
 
+class TestAccessLog(TestCase):
+    validator = None
+
+    def init_server(self, application):
+        self.log = StringIO()
+        self.server = self.get_wsgi_module().WSGIServer(('127.0.0.1', 0), application, log=self.log)
+
+    @staticmethod
+    def application(env, start_response):
+        # busy for a while without yielding to the hub
+        end = time.time() + 0.05
+        while time.time() < end:
+            pass
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return ['hello']
+
+    def test_duration(self):
+        fd = self.connect().makefile(bufsize=1)
+        fd.write('GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+        read_http(fd, body='hello')
+        fd.close()
+        gevent.sleep(0.01)
+        duration = float(self.log.getvalue().split()[-1])
+        assert duration >= 0.04, self.log.getvalue()
+
+
+class TestFileWrapper(TestCase):
+    validator = None
+
+    @staticmethod
+    def application(env, start_response):
+        path = env['PATH_INFO']
+        headers = [('Content-Type', 'text/plain')]
+        if path == '/short':
+            headers.append(('Content-Length', '5'))
+        start_response('200 OK', headers)
+        if path == '/stringio':
+            filelike = StringIO('not a real file')
+        else:
+            filelike = open(__file__, 'rb')
+            filelike.seek(10)
+        return env['wsgi.file_wrapper'](filelike)
+
+    def expected(self):
+        data = open(__file__, 'rb').read()
+        return data[10:]
+
+    def test_file(self):
+        fd = self.connect().makefile(bufsize=1)
+        fd.write('GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        response = read_http(fd, body=self.expected())
+        response.assertHeader('Content-Length', str(len(self.expected())))
+        fd.write('GET /short HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        read_http(fd, body=self.expected()[:5])
+        fd.close()
+
+    def test_stringio(self):
+        fd = self.connect().makefile(bufsize=1)
+        fd.write('GET /stringio HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        read_http(fd, body='not a real file')
+        fd.close()
+
+
 class BadRequestTests(TestCase):
     validator = None
     # pywsgi checks content-length, but wsgi does not
@@ -2,7 +2,7 @@ from greentest import TestCase, main
 import gevent
 from gevent import util, core
 from gevent import queue
-from gevent.event import AsyncResult
+from gevent.event import AsyncResult, Event
 
 
 class TestQueue(TestCase):
@@ -188,6 +188,40 @@ class TestQueue(TestCase):
         self.assertEquals(q.get(), 'sent')
 
 
+    def test_getters_fifo(self):
+        q = queue.Queue()
+        order = []
+
+        def waiter(index):
+            order.append((index, q.get()))
+
+        greenlets = [gevent.spawn(waiter, index) for index in xrange(5)]
+        gevent.sleep(0)
+        greenlets[2].kill()
+        for item in 'abcd':
+            q.put(item)
+        gevent.joinall(greenlets)
+        self.assertEqual(order, [(0, 'a'), (1, 'b'), (3, 'c'), (4, 'd')])
+        assert not q.getters, q
+
+    def test_putters_fifo(self):
+        q = queue.Queue(1)
+        q.put(0)
+        greenlets = [gevent.spawn(q.put, index) for index in xrange(1, 5)]
+        gevent.sleep(0)
+        greenlets[1].kill()
+        self.assertEqual([q.get() for _ in xrange(4)], [0, 1, 3, 4])
+        gevent.joinall(greenlets)
+        assert not q.putters, q
+
+    def test_getter_timeout_removed(self):
+        q = queue.Queue()
+        self.assertRaises(queue.Empty, q.get, timeout=0.01)
+        assert not q.getters, q
+        q.put('x')
+        self.assertEqual(q.get(), 'x')
+
+
 class TestChannel(TestCase):
 
     def test_send(self):
@@ -232,6 +266,38 @@ class TestChannel(TestCase):
         self.assertEqual(['waiting', 'sending hello', 'hello', 'sending world', 'world', 'sent world'], events)
         g.get()
 
+    def test_get_from_blocked_putter(self):
+        channel = queue.Queue(0)
+        putter = gevent.spawn(channel.put, 'hello')
+        gevent.sleep(0)
+        assert channel.putters, channel
+        # the item is taken from the blocked putter right away
+        self.assertEqual(channel.get(block=False), 'hello')
+        assert not putter.ready(), putter
+        assert putter.get(timeout=1) is None
+        assert channel.empty() and not channel.putters, channel
+
+    def test_blocked_getter_served_first(self):
+        channel = queue.Queue(0)
+        first = gevent.spawn(channel.get)
+        gevent.sleep(0)
+        assert channel.getters, channel
+        putter = gevent.spawn(channel.put, 'item1')
+        second = gevent.spawn(channel.get)
+        gevent.sleep(0)
+        # the getter that came later does not take the item ahead of the one already waiting
+        self.assertEqual(first.get(timeout=1), 'item1')
+        assert not second.ready(), second
+        channel.put('item2')
+        self.assertEqual(second.get(timeout=1), 'item2')
+        assert putter.get(timeout=1) is None
+
+    def test_put_timeout(self):
+        channel = queue.Queue(0)
+        self.assertRaises(queue.Full, channel.put, 'hello', timeout=0.01)
+        assert not channel.putters, channel
+        self.assertRaises(queue.Empty, channel.get, block=False)
+
     def test_task_done(self):
         channel = queue.JoinableQueue(0)
         X = object()
@@ -320,6 +386,122 @@ class TestNoWait(TestCase):
         assert q.empty(), q
 
 
+class TestMany(TestCase):
+
+    def test_put_many(self):
+        self.switch_expected = False
+        q = queue.Queue()
+        q.put_many(xrange(5))
+        self.assertEqual(q.get_many(3), [0, 1, 2])
+        self.assertEqual(q.drain(), [3, 4])
+        self.assertEqual(q.drain(), [])
+        self.assertRaises(queue.Empty, q.get_many, 3, block=False)
+
+    def test_put_many_blocks(self):
+        q = queue.Queue(2)
+        putter = gevent.spawn(q.put_many, 'abcde')
+        gevent.sleep(0)
+        self.assertEqual(q.get_many(), ['a', 'b', 'c'])
+        self.assertEqual(q.get_many(1), ['d'])
+        self.assertEqual(q.get_many(), ['e'])
+        putter.get(timeout=1)
+
+    def test_put_many_timeout(self):
+        q = queue.Queue(2)
+        self.assertRaises(queue.Full, q.put_many, 'abc', timeout=0.01)
+        self.assertEqual(q.drain(), ['a', 'b'])
+        self.assertRaises(queue.Full, q.put_many, 'abc', block=False)
+
+    def test_get_many_wakes_up_once(self):
+        q = queue.Queue()
+        getter = gevent.spawn(q.get_many, 10)
+        gevent.sleep(0)
+        q.put_many(range(3))
+        self.assertEqual(getter.get(timeout=1), [0, 1, 2])
+
+    def test_get_many_timeout(self):
+        q = queue.Queue()
+        self.assertRaises(queue.Empty, q.get_many, 10, timeout=0.01)
+        self.assertRaises(ValueError, q.get_many, 0)
+
+    def test_task_done_count(self):
+        self.switch_expected = False
+        q = queue.JoinableQueue()
+        q.put_many('abc')
+        assert q.unfinished_tasks == 3, q
+        items = q.drain()
+        q.task_done(len(items))
+        assert q.unfinished_tasks == 0, q
+        q.join()
+        self.assertRaises(ValueError, q.task_done, 1)
+        q.put('d')
+        self.assertRaises(ValueError, q.task_done, 2)
+        self.assertRaises(ValueError, q.task_done, 0)
+
+
+class TestChoose(TestCase):
+
+    def test_ready_at_once(self):
+        self.switch_expected = False
+        q1, q2 = queue.Queue(), queue.Queue()
+        q2.put('x')
+        self.assertEqual(queue.choose([q1, q2]), (q2, 'x'))
+        event = Event()
+        event.set()
+        self.assertEqual(queue.choose([q1, event]), (event, None))
+        assert q2.empty(), q2
+
+    def test_one_queue_wins(self):
+        q1, q2, q3 = queue.Queue(), queue.Queue(), queue.Queue()
+        chooser = gevent.spawn(queue.choose, [q1, q2, q3])
+        gevent.sleep(0)
+        assert q1.getters and q2.getters and q3.getters
+        q3.put('c')
+        q2.put('b')
+        self.assertEqual(chooser.get(timeout=1), (q3, 'c'))
+        assert not q1.getters and not q2.getters and not q3.getters
+        self.assertEqual(q2.get_nowait(), 'b')
+
+    def test_channel(self):
+        channel = queue.Queue(0)
+        event = Event()
+        sender = gevent.spawn(channel.put, 'hello')
+        gevent.sleep(0)
+        self.assertEqual(queue.choose([event, channel]), (channel, 'hello'))
+        sender.get(timeout=1)
+        chooser = gevent.spawn(queue.choose, [event, channel])
+        gevent.sleep(0)
+        channel_sender = gevent.spawn(channel.put, 'world')
+        self.assertEqual(chooser.get(timeout=1), (channel, 'world'))
+        channel_sender.get(timeout=1)
+        assert not event._links, event
+
+    def test_generator(self):
+        q1, q2 = queue.Queue(), queue.Queue()
+        chooser = gevent.spawn(queue.choose, (q for q in (q1, q2)))
+        gevent.sleep(0)
+        q2.put('x')
+        self.assertEqual(chooser.get(timeout=1), (q2, 'x'))
+        assert not q1.getters and not q2.getters, (q1, q2)
+
+    def test_event_and_greenlet(self):
+        q = queue.Queue()
+        result = AsyncResult()
+        g = gevent.spawn(lambda: 5)
+        self.assertEqual(queue.choose([q, result, g]), (g, None))
+        gevent.spawn_later(0.01, result.set, 'done')
+        self.assertEqual(queue.choose([q, result]), (result, None))
+        assert not q.getters, q
+
+    def test_timeout(self):
+        q = queue.Queue()
+        event = Event()
+        assert queue.choose([q, event], timeout=0.01) is None
+        assert not q.getters and not event._links, (q, event)
+        q.put(1)
+        self.assertEqual(q.get_nowait(), 1)
+
+
 class TestJoinEmpty(TestCase):
 
     def test_issue_45(self):
@@ -0,0 +1,45 @@
+import gevent
+from gevent import core
+
+hub = gevent.hub.get_hub()
+log = []
+
+
+def yielder(name, count):
+    for index in xrange(count):
+        log.append((name, index))
+        gevent.sleep(0)
+
+# greenlets that yield with sleep(0) take turns in order
+a = gevent.spawn(yielder, 'a', 3)
+b = gevent.spawn(yielder, 'b', 3)
+gevent.joinall([a, b])
+assert log == [('a', 0), ('b', 0), ('a', 1), ('b', 1), ('a', 2), ('b', 2)], log
+assert len(hub._ready) == 0, len(hub._ready)
+
+# sleep(0) does not create a timer but still lets a due timer run before the greenlet resumes
+fired = []
+core.timer(0, fired.append, 'timer')
+gevent.sleep(0)
+assert fired == ['timer'], fired
+
+# a greenlet killed while waiting in the ready queue is not switched to again
+del log[:]
+
+
+def sleeper():
+    try:
+        while True:
+            gevent.sleep(0)
+    except gevent.GreenletExit:
+        log.append('killed')
+        gevent.sleep(0.01)
+        log.append('woke up')
+
+g = gevent.spawn(sleeper)
+gevent.sleep(0)
+assert len(hub._ready) == 1, len(hub._ready)
+g.kill(block=False)
+gevent.sleep(0.05)
+assert log == ['killed', 'woke up'], log
+assert len(hub._ready) == 0, len(hub._ready)
@@ -0,0 +1,115 @@
+import greentest
+import gevent
+from gevent.coros import RWLock
+DELAY = 0.01
+
+
+class TestRWLock(greentest.TestCase):
+
+    def test_readers_do_not_switch(self):
+        self.switch_expected = False
+        lock = RWLock()
+        for _ in xrange(3):
+            assert lock.acquire_read()
+        assert not lock.acquire_write(blocking=False)
+        for _ in xrange(3):
+            lock.release_read()
+        assert lock.acquire_write(blocking=False)
+        assert not lock.acquire_read(blocking=False)
+        assert not lock.acquire_write(blocking=False)
+        lock.release_write()
+        self.assertRaises(RuntimeError, lock.release_read)
+        self.assertRaises(RuntimeError, lock.release_write)
+
+    def test_writer_excludes_readers(self):
+        lock = RWLock()
+        log = []
+
+        def reader(index):
+            lock.reader.acquire()
+            log.append(('read', index))
+            gevent.sleep(DELAY)
+            lock.reader.release()
+
+        def writer():
+            lock.writer.acquire()
+            log.append('write start')
+            gevent.sleep(DELAY)
+            log.append('write end')
+            lock.writer.release()
+
+        w = gevent.spawn(writer)
+        gevent.sleep(0)
+        readers = [gevent.spawn(reader, index) for index in xrange(3)]
+        gevent.joinall([w] + readers)
+        self.assertEqual(log, ['write start', 'write end', ('read', 0), ('read', 1), ('read', 2)])
+
+    def _check_preference(self, prefer_writers):
+        lock = RWLock(prefer_writers=prefer_writers)
+        log = []
+
+        def reader(name):
+            lock.acquire_read()
+            log.append(name)
+            gevent.sleep(DELAY)
+            lock.release_read()
+
+        def writer(name):
+            lock.acquire_write()
+            log.append(name)
+            gevent.sleep(DELAY)
+            lock.release_write()
+
+        greenlets = [gevent.spawn(reader, 'r1')]
+        gevent.sleep(0)
+        greenlets.append(gevent.spawn(writer, 'w1'))
+        gevent.sleep(0)
+        greenlets.append(gevent.spawn(reader, 'r2'))
+        gevent.joinall(greenlets)
+        return log
+
+    def test_prefer_readers(self):
+        self.assertEqual(self._check_preference(False), ['r1', 'r2', 'w1'])
+
+    def test_prefer_writers(self):
+        self.assertEqual(self._check_preference(True), ['r1', 'w1', 'r2'])
+
+    def test_timeout(self):
+        lock = RWLock(prefer_writers=True)
+        lock.acquire_read()
+        assert not lock.acquire_write(timeout=DELAY)
+        assert not lock._write_waiters, lock
+        # the writer that gave up does not hold back the readers any more
+        assert lock.acquire_read(blocking=False)
+        lock.release_read()
+        lock.release_read()
+        assert lock.acquire_write(timeout=DELAY)
+        lock.release_write()
+
+    def test_handover(self):
+        lock = RWLock()
+        lock.acquire_write()
+        readers = [gevent.spawn(lock.acquire_read) for _ in xrange(3)]
+        gevent.sleep(0)
+        lock.release_write()
+        # the waiting readers own the lock before they run
+        assert lock._readers == 3, lock
+        assert not lock.acquire_write(blocking=False)
+        gevent.joinall(readers)
+        for _ in readers:
+            lock.release_read()
+        assert lock.acquire_write(blocking=False)
+
+    def test_with(self):
+        self.switch_expected = False
+        lock = RWLock()
+        lock.reader.__enter__()
+        lock.reader.__exit__(None, None, None)
+        lock.writer.__enter__()
+        assert lock._owner is gevent.getcurrent(), lock
+        lock.writer.__exit__(None, None, None)
+        assert lock._owner is None, lock
+
+
+if __name__ == '__main__':
+    greentest.main()
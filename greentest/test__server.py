@@ -288,7 +288,7 @@ class TestDefaultSpawn(TestCase):
 
 class TestRawSpawn(TestDefaultSpawn):
 
-    invalid_callback_message = 'Failed active_event...'
+    invalid_callback_message = 'Failed to execute callback...'
 
     def get_spawn(self):
         return gevent.spawn_raw
@@ -0,0 +1,117 @@
+import greentest
+import gevent
+from gevent import socket, core
+
+
+class TestMany(greentest.TestCase):
+
+    family = socket.AF_INET
+    host = '127.0.0.1'
+
+    def setUp(self):
+        greentest.TestCase.setUp(self)
+        self.receiver = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.receiver.bind((self.host, 0))
+        self.address = self.receiver.getsockname()
+        self.sender = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.sender.bind((self.host, 0))
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sender.close()
+        greentest.TestCase.tearDown(self)
+
+    def test_recv_many(self):
+        self.switch_expected = False
+        messages = [('message %s' % x, self.address) for x in xrange(10)]
+        assert self.sender.send_many(messages) == 10
+        result = self.receiver.recv_many(1024, 4)
+        assert [data for data, address in result] == ['message %s' % x for x in xrange(4)], result
+        assert result[0][1][:2] == self.sender.getsockname()[:2], (result[0][1], self.sender.getsockname())
+        result = self.receiver.recv_many(1024)
+        assert [data for data, address in result] == ['message %s' % x for x in xrange(4, 10)], result
+
+    def test_truncated(self):
+        self.switch_expected = False
+        self.sender.send_many([('x' * 100, self.address), (buffer('yy'), self.address)])
+        result = self.receiver.recv_many(10)
+        assert [data for data, address in result] == ['x' * 10, 'yy'], result
+
+    def test_wait(self):
+        receiver = gevent.spawn(self.receiver.recv_many, 1024)
+        gevent.sleep(0.01)
+        self.sender.sendto('hello', self.address)
+        assert [data for data, address in receiver.get()] == ['hello'], receiver.value
+
+    def test_timeout(self):
+        self.receiver.settimeout(0.05)
+        self.assertRaises(socket.timeout, self.receiver.recv_many, 1024)
+
+    def test_nonblocking(self):
+        self.switch_expected = False
+        self.receiver.setblocking(0)
+        self.assertRaises(socket.error, self.receiver.recv_many, 1024)
+
+    def test_connected(self):
+        self.switch_expected = False
+        self.sender.connect(self.address)
+        assert self.sender.send_many([('a', None), ('b', None)]) == 2
+        assert [data for data, address in self.receiver.recv_many(1024)] == ['a', 'b']
+
+    def test_hostname(self):
+        # not a numeric address: sent with sendto()
+        self.switch_expected = False
+        assert self.sender.send_many([('a', self.address), ('b', ('localhost', self.address[1]))]) == 2
+        assert [data for data, address in self.receiver.recv_many(1024)] == ['a', 'b']
+
+    def test_many(self):
+        self.switch_expected = False
+        # in rounds small enough for the receiver's socket buffer: datagrams that do not fit are dropped
+        for start in xrange(0, 1000, 200):
+            expected = [str(x) for x in xrange(start, start + 200)]
+            assert self.sender.send_many([(data, self.address) for data in expected]) == 200
+            result = []
+            while len(result) < 200:
+                result.extend([data for data, address in self.receiver.recv_many(64, 64)])
+            assert result == expected, (result, expected)
+
+
+class TestManyIPv6(TestMany):
+    family = socket.AF_INET6
+    host = '::1'
+
+    def test_hostname(self):
+        pass
+
+
+class TestFallback(greentest.TestCase):
+    # AF_UNIX sockets are served by a loop of recvfrom()/sendto() calls
+
+    switch_expected = False
+
+    def test(self):
+        one, two = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        assert one.send_many([('a', None), ('b', None), ('c', None)]) == 3
+        assert [data for data, address in two.recv_many(1024, 2)] == ['a', 'b']
+        assert [data for data, address in two.recv_many(1024, 2)] == ['c']
+
+
+class TestBuffer(greentest.TestCase):
+
+    switch_expected = False
+
+    def test_arguments(self):
+        self.assertRaises(ValueError, core.mmsgbuffer, socket.AF_UNIX)
+        self.assertRaises(ValueError, core.mmsgbuffer, socket.AF_INET, 0)
+        buffer = core.mmsgbuffer(socket.AF_INET, 10, 100)
+        assert (buffer.count, buffer.size) == (10, 100), buffer
+
+
+try:
+    socket.socket(socket.AF_INET6, socket.SOCK_DGRAM).bind(('::1', 0))
+except socket.error:
+    del TestManyIPv6
+
+
+if __name__ == '__main__':
+    greentest.main()
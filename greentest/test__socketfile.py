@@ -0,0 +1,116 @@
+import greentest
+import gevent
+from gevent import socket
+
+
+class Test(greentest.TestCase):
+
+    switch_expected = False
+
+    def setUp(self):
+        greentest.TestCase.setUp(self)
+        self.reader, self.writer = socket.socketpair()
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        greentest.TestCase.tearDown(self)
+
+    def test_readline(self):
+        fileobj = self.reader.makefile('rb', 16)
+        self.writer.sendall('first\n' + 'x' * 40 + '\nthird\nlast')
+        self.writer.close()
+        assert fileobj.readline() == 'first\n'
+        # longer than the buffer
+        assert fileobj.readline() == 'x' * 40 + '\n'
+        assert fileobj.readline(3) == 'thi'
+        assert fileobj.readline() == 'rd\n'
+        assert fileobj.readline() == 'last'
+        assert fileobj.readline() == ''
+
+    def test_iter(self):
+        fileobj = self.reader.makefile()
+        self.writer.sendall(''.join(['line %s\n' % x for x in xrange(1000)]))
+        self.writer.close()
+        assert list(fileobj) == ['line %s\n' % x for x in xrange(1000)]
+
+    def test_read(self):
+        fileobj = self.reader.makefile('rb', 16)
+        data = ''.join([str(x) for x in xrange(10000)])
+        self.writer.sendall(data)
+        self.writer.close()
+        assert fileobj.read(5) == data[:5]
+        assert fileobj.readline(10) == data[5:15]
+        assert fileobj.read(30000) == data[15:30015]
+        assert fileobj.read() == data[30015:]
+        assert fileobj.read() == ''
+
+    def test_readinto(self):
+        fileobj = self.reader.makefile('rb', 16)
+        self.writer.sendall('line\n' + 'x' * 100)
+        self.writer.close()
+        assert fileobj.readline() == 'line\n'
+        buf = bytearray(10)
+        assert fileobj.readinto(buf) == 10
+        assert buf == 'x' * 10, buf
+        buf = bytearray(200)
+        assert fileobj.readinto(buf) == 90
+        assert buf[:90] == 'x' * 90, buf
+        assert fileobj.readinto(buf) == 0
+
+    def test_unbuffered_readline(self):
+        fileobj = self.reader.makefile('rb', 0)
+        self.writer.sendall('line\nrest')
+        assert fileobj.readline() == 'line\n'
+        # nothing is received beyond the line
+        assert self.reader.recv(100) == 'rest'
+
+    def test_close_socket(self):
+        fileobj = self.reader.makefile()
+        self.reader.close()
+        self.writer.sendall('line\n')
+        assert fileobj.readline() == 'line\n'
+        fileobj.close()
+        assert fileobj.closed
+
+    def test_write(self):
+        fileobj = self.writer.makefile('wb')
+        fileobj.write('hello ')
+        fileobj.writelines(['world', '\n'])
+        assert self.reader.makefile('rb', 0)._rbuf.fill(self.reader.fileno()) is None
+        fileobj.flush()
+        assert self.reader.recv(100) == 'hello world\n'
+        fileobj.write('x' * 5000)
+        fileobj.writelines(['y' * 5000, 'z'])
+        fileobj.close()
+        self.writer.close()
+        assert self.reader.makefile().read() == 'x' * 5000 + 'y' * 5000 + 'z'
+
+    def test_line_buffered_write(self):
+        fileobj = self.writer.makefile('wb', 1)
+        fileobj.write('hello')
+        assert self.reader.makefile('rb', 0)._rbuf.fill(self.reader.fileno()) is None
+        fileobj.write(' world\n')
+        assert self.reader.recv(100) == 'hello world\n'
+
+    def test_timeout(self):
+        self.switch_expected = True
+        fileobj = self.reader.makefile()
+        # makefile() does not inherit the timeout
+        fileobj._sock.settimeout(0.05)
+        self.writer.sendall('partial')
+        self.assertRaises(socket.timeout, fileobj.readline)
+        self.writer.sendall(' line\n')
+        assert fileobj.readline() == 'partial line\n'
+
+    def test_wait(self):
+        self.switch_expected = True
+        fileobj = self.reader.makefile()
+        reader = gevent.spawn(fileobj.readline)
+        gevent.sleep(0.01)
+        self.writer.sendall('line\n')
+        assert reader.get() == 'line\n', reader
+
+
+if __name__ == '__main__':
+    greentest.main()
@@ -0,0 +1,82 @@
+import greentest
+import gevent
+from gevent.hub import get_hub, getcurrent
+
+
+def record(log):
+    log.append(getcurrent())
+
+
+class Test(greentest.TestCase):
+
+    def test_reuse(self):
+        log = []
+        first = gevent.spawn_pooled(record, log)
+        gevent.sleep(0)
+        assert log == [first], log
+        assert first in get_hub()._idle_workers
+        second = gevent.spawn_pooled(record, log)
+        assert second is first
+        gevent.sleep(0)
+        assert log == [first, first], log
+
+    def test_kwargs(self):
+        result = []
+        gevent.spawn_pooled(result.extend, [1, 2])
+        gevent.spawn_pooled(dict.update, {}, key='value')
+        gevent.sleep(0)
+        assert result == [1, 2], result
+
+    def test_error(self):
+        log = []
+        self.hook_stderr()
+        worker = gevent.spawn_pooled(lambda: 1 / 0)
+        gevent.sleep(0)
+        self.assert_stderr_traceback('ZeroDivisionError')
+        self.assert_stderr('Failed to execute')
+        assert gevent.spawn_pooled(record, log) is worker
+        gevent.sleep(0)
+        assert log == [worker], log
+
+    def test_kill(self):
+        log = []
+        worker = gevent.spawn_pooled(gevent.sleep, 10)
+        gevent.sleep(0)
+        gevent.kill(worker)
+        gevent.sleep(0)
+        assert not worker.dead, worker
+        assert gevent.spawn_pooled(record, log) is worker
+        gevent.sleep(0)
+        assert log == [worker], log
+
+    def test_handle_is_worker(self):
+        # the documented contract: the returned greenlet outlives the function and is
+        # handed to the next spawn_pooled() call, so killing it then hits the later function
+        log = []
+        first = gevent.spawn_pooled(record, log)
+        gevent.sleep(0)
+        assert not first.dead, first
+        second = gevent.spawn_pooled(gevent.sleep, 10)
+        assert second is first
+        gevent.sleep(0)
+        assert first not in get_hub()._idle_workers
+        gevent.kill(first)
+        gevent.sleep(0)
+        assert first in get_hub()._idle_workers
+        assert not first.dead, first
+
+    def test_bounded(self):
+        hub = get_hub()
+        hub.worker_pool_size = 2
+        try:
+            del hub._idle_workers[:]
+            workers = [gevent.spawn_pooled(gevent.sleep, 0.01) for _ in xrange(5)]
+            gevent.sleep(0.05)
+            assert len(hub._idle_workers) == 2, hub._idle_workers
+            assert len([x for x in workers if x.dead]) == 3, workers
+        finally:
+            del hub.worker_pool_size
+
+
+if __name__ == '__main__':
+    greentest.main()
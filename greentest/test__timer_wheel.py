@@ -0,0 +1,101 @@
+import time
+import greentest
+import gevent
+from gevent import core
+DELAY = 0.05
+
+
+class Test(greentest.TestCase):
+
+    def test_order(self):
+        wheel = core.timer_wheel(0.01)
+        called = []
+        wheel.start(DELAY * 2, called.append, 2)
+        wheel.start(DELAY, called.append, 1)
+        wheel.start(DELAY * 3, called.append, 3)
+        assert len(wheel) == 3, len(wheel)
+        gevent.sleep(DELAY * 4)
+        assert called == [1, 2, 3], called
+        assert len(wheel) == 0, len(wheel)
+
+    def test_never_early(self):
+        wheel = core.timer_wheel(0.01)
+        fired = []
+        start = time.time()
+        wheel.start(DELAY, lambda: fired.append(time.time() - start))
+        gevent.sleep(DELAY * 3)
+        assert len(fired) == 1, fired
+        assert fired[0] >= DELAY - 0.001, fired
+
+    def test_cancel(self):
+        wheel = core.timer_wheel(0.01)
+        called = []
+        x = wheel.start(DELAY, called.append, 1)
+        y = wheel.start(DELAY, called.append, 2)
+        assert x.pending and y.pending
+        x.cancel()
+        assert not x.pending
+        assert len(wheel) == 1, len(wheel)
+        gevent.sleep(DELAY * 2)
+        assert called == [2], called
+        assert not y.pending
+
+    def test_cancel_all(self):
+        wheel = core.timer_wheel(0.01)
+        called = []
+        timers = [wheel.start(DELAY, called.append, x) for x in xrange(10)]
+        for timer in timers:
+            timer.cancel()
+        assert len(wheel) == 0, len(wheel)
+        assert not wheel.pending
+        gevent.sleep(DELAY * 2)
+        assert called == [], called
+
+    def test_cancel_from_callback(self):
+        wheel = core.timer_wheel(0.01)
+        called = []
+        second = []
+
+        def first():
+            called.append('first')
+            second[0].cancel()
+
+        wheel.start(DELAY, first)
+        second.append(wheel.start(DELAY, called.append, 'second'))
+        gevent.sleep(DELAY * 2)
+        assert called == ['first'], called
+
+    def test_wraparound(self):
+        # timers further away than one revolution must wait for their own tick
+        wheel = core.timer_wheel(0.01, 4)
+        called = []
+        wheel.start(DELAY * 2, called.append, 'far')
+        wheel.start(0.01, called.append, 'near')
+        gevent.sleep(DELAY)
+        assert called == ['near'], called
+        gevent.sleep(DELAY * 2)
+        assert called == ['near', 'far'], called
+
+    def test_timeout(self):
+        timeout = gevent.Timeout(DELAY)
+        timeout.start()
+        assert isinstance(timeout.timer, core.wheel_timer), timeout.timer
+        try:
+            gevent.sleep(DELAY * 3)
+        except gevent.Timeout, ex:
+            assert ex is timeout, (ex, timeout)
+        else:
+            raise AssertionError('must raise Timeout')
+        assert not timeout.pending, timeout
+
+    def test_precise_timeout(self):
+        self.switch_expected = False
+        timeout = gevent.Timeout(DELAY, precise=True)
+        timeout.start()
+        assert isinstance(timeout.timer, core.timer), timeout.timer
+        timeout.cancel()
+        assert not timeout.pending, timeout
+
+
+if __name__ == '__main__':
+    greentest.main()
@@ -4,6 +4,8 @@ import test__pywsgi
 from test__pywsgi import *
 
 del TestHttps
+del TestFileWrapper
+del TestAccessLog
 test__pywsgi.server_implements_chunked = False
 test__pywsgi.server_implements_pipeline = False
 test__pywsgi.server_implements_100continue = False